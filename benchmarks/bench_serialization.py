@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""
+Serialization microbenchmark for scarf.
+
+Measures the CPU time spent turning event properties into request bodies,
+comparing the previous approach (``json.dumps`` with the static fields merged
+into every event, ``gzip.compress`` for batches) with ``EventEncoder``, using
+each JSON backend that is installed, and the cost a ``PayloadGuard`` adds
+to events that are within its limits.
+
+To run this benchmark:
+   python benchmarks/bench_serialization.py [--events 20000] [--batch-size 500] [--json]
+"""
+
+import argparse
+import gzip
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from scarf.guard import PayloadGuard
+from scarf.serialization import BACKENDS, EventEncoder, gzip_compress
+
+STATIC_PROPERTIES = {
+    'sdk': 'scarf-py',
+    'sdk_version': '0.2.1',
+    'platform': 'linux',
+    'arch': 'x86_64',
+    'python': '3.12.1',
+    'app': 'example-app',
+    'app_version': '4.2.0',
+}
+
+
+def make_event(i: int) -> Dict[str, Any]:
+    return {
+        'event': 'package_download',
+        'package': f'pkg-{i % 50}',
+        'version': '1.0.0',
+        'duration_ms': i % 997,
+        'cached': i % 3 == 0,
+        'details': {'mirror': 'eu-west', 'attempt': 1},
+    }
+
+
+def cpu_ns_per_item(fn: Callable[[], int], repeat: int = 5) -> float:
+    """Return the best CPU time per item over several runs, in nanoseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time_ns()
+        items = fn()
+        best = min(best, (time.process_time_ns() - start) / items)
+    return best
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    events = [make_event(i) for i in range(args.events)]
+    batches = [events[i:i + args.batch_size] for i in range(0, len(events), args.batch_size)]
+
+    def before_single() -> int:
+        for properties in events:
+            json.dumps({**STATIC_PROPERTIES, **properties}, separators=(',', ':')).encode('utf-8')
+        return len(events)
+
+    def before_batch() -> int:
+        for batch in batches:
+            records = [
+                json.dumps({**STATIC_PROPERTIES, **p}, separators=(',', ':')).encode('utf-8')
+                for p in batch
+            ]
+            gzip.compress(b'\n'.join(records) + b'\n', compresslevel=6)
+        return len(events)
+
+    report: Dict[str, Any] = {
+        "events": args.events,
+        "batch_size": args.batch_size,
+        "ns_per_event": {
+            "before": {
+                "single": round(cpu_ns_per_item(before_single)),
+                "batch_gzip": round(cpu_ns_per_item(before_batch)),
+            },
+        },
+    }
+
+    guard = PayloadGuard()
+    for backend in BACKENDS:
+        try:
+            encoder = EventEncoder(STATIC_PROPERTIES, backend=backend)
+        except ImportError:
+            continue
+
+        def after_single(encode=encoder.encode) -> int:
+            for properties in events:
+                encode(properties)
+            return len(events)
+
+        def after_batch(encoder=encoder) -> int:
+            for batch in batches:
+                body = encoder.encode_batch([encoder.encode(p) for p in batch])
+                gzip_compress(body, 6)
+            return len(events)
+
+        def after_guarded(encoder=encoder) -> int:
+            for properties in events:
+                guard.encode(properties, encoder)
+            return len(events)
+
+        report["ns_per_event"][backend] = {
+            "single": round(cpu_ns_per_item(after_single)),
+            "batch_gzip": round(cpu_ns_per_item(after_batch)),
+            "guarded": round(cpu_ns_per_item(after_guarded)),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"CPU ns per event ({args.events} events, batches of {args.batch_size}):")
+        print(f"  {'':<8} {'single':>8} {'batch+gzip':>11} {'guarded':>8}")
+        for name, result in report["ns_per_event"].items():
+            guarded = result.get('guarded', '')
+            print(f"  {name:<8} {result['single']:>8} {result['batch_gzip']:>11} {guarded:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
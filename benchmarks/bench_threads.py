@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Multi-threaded ingestion benchmark for scarf.
+
+Measures how many events per second a background logger accepts when
+``log_event`` is called from a growing number of threads at once, with a
+single shared queue lock (shards=1) and with sharded buffers. Events are
+discarded by a NullTransport, so only the ingestion path is measured. On
+CPython builds with the GIL, throughput can't grow with thread count; the
+benchmark shows what contention costs there, and the scaling on
+free-threaded builds.
+
+To run this benchmark:
+   python benchmarks/bench_threads.py [--events 20000] [--threads 1,2,4,8,16,32]
+       [--shards 16] [--json]
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+from scarf import ScarfEventLogger
+from scarf.transport import NullTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+def events_per_second(threads: int, events: int, shards: int) -> Dict[str, Any]:
+    """Log ``events`` events from each of ``threads`` threads and time it."""
+    logger = ScarfEventLogger(
+        ENDPOINT,
+        transport=NullTransport(),
+        background=True,
+        batch_size=500,
+        linger=0.05,
+        max_queue_size=threads * events + 1,
+        max_queue_bytes=None,
+        shards=shards,
+    )
+    start = threading.Barrier(threads + 1)
+
+    def log() -> None:
+        event = {'event': 'benchmark', 'package': 'scarf'}
+        start.wait()
+        for _ in range(events):
+            logger.log_event(event)
+
+    workers = [threading.Thread(target=log) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    began = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    logger.close()
+    return {
+        "events_per_sec": round(threads * events / elapsed),
+        "dropped": logger.stats()['events_dropped'],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--events", type=int, default=20000, help="events per thread")
+    parser.add_argument("--threads", default="1,2,4,8,16,32")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    report: Dict[str, Any] = {
+        "events_per_thread": args.events,
+        "gil": is_gil_enabled() if is_gil_enabled is not None else True,
+        "results": {},
+    }
+    for threads in map(int, args.threads.split(",")):
+        report["results"][threads] = {
+            "shared": events_per_second(threads, args.events, 1),
+            "sharded": events_per_second(threads, args.events, args.shards),
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Events accepted per second by log_event ({args.events} events per thread, "
+              f"{'GIL' if report['gil'] else 'free-threaded'}):")
+        print(f"  {'threads':>7} {'shared lock':>12} {f'{args.shards} shards':>12}")
+        for threads, result in report["results"].items():
+            print(f"  {threads:>7} {result['shared']['events_per_sec']:>12} "
+                  f"{result['sharded']['events_per_sec']:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Timing instrumentation microbenchmark for scarf.
+
+Measures the CPU time ``logger.timed`` adds to each call of a trivial function:
+when analytics are disabled by a config file, when the sampler skips the
+call, when the duration is folded into an aggregator, and when it is queued
+for a background logger.
+
+To run this benchmark:
+   python benchmarks/bench_timing.py [--calls 200000] [--json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from scarf import EventAggregator, Sampler, ScarfEventLogger
+from scarf.transport import NullTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+def cpu_ns_per_call(fn: Callable[[], None], calls: int, repeat: int = 5) -> float:
+    """Return the best CPU time per call over several runs, in nanoseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time_ns()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.process_time_ns() - start) / calls)
+    return best
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    config_dir = tempfile.TemporaryDirectory()
+    config_path = os.path.join(config_dir.name, 'scarf.json')
+    with open(config_path, 'w') as f:
+        json.dump({'enabled': False}, f)
+    disabled = ScarfEventLogger(ENDPOINT, transport=NullTransport(), config_path=config_path)
+    sampled_out = ScarfEventLogger(
+        ENDPOINT, transport=NullTransport(), sampler=Sampler(event_rates={'op': 0.0})
+    )
+    background = ScarfEventLogger(
+        ENDPOINT, transport=NullTransport(), background=True,
+        batch_size=500, max_queue_size=args.calls * 5 + 1,
+    )
+    aggregator = EventAggregator(background, flush_interval=3600)
+
+    def bare() -> None:
+        pass
+
+    variants = {
+        "disabled": disabled.timed('op', table='users')(bare),
+        "sampled_out": sampled_out.timed('op', table='users')(bare),
+        "aggregated": background.timed('op', aggregator=aggregator, table='users')(bare),
+        "background": background.timed('op', table='users')(bare),
+    }
+
+    baseline = cpu_ns_per_call(bare, args.calls)
+    report: Dict[str, Any] = {
+        "calls": args.calls,
+        "bare_call_ns": round(baseline),
+        "overhead_ns_per_call": {},
+    }
+    for name, fn in variants.items():
+        report["overhead_ns_per_call"][name] = round(cpu_ns_per_call(fn, args.calls) - baseline)
+
+    aggregator.close()
+    background.close()
+    config_dir.cleanup()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"CPU ns added per timed call ({args.calls} calls, "
+              f"{report['bare_call_ns']} ns per bare call):")
+        for name, overhead in report["overhead_ns_per_call"].items():
+            print(f"  {name:<12} {overhead:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Import-time benchmark for scarf.
+
+Runs `python -X importtime` in fresh interpreters and reports the cumulative
+time spent importing `scarf` (median of several runs), plus the slowest
+modules it pulled in.
+
+To run this benchmark:
+   python benchmarks/import_time.py [--runs 9] [--max-ms 30] [--json]
+
+With --max-ms the script exits with status 1 when the median import time
+exceeds the budget, so it can guard against regressions in CI.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+STATEMENT = "import scarf; scarf.ScarfEventLogger('https://scarf.sh/api/v1')"
+
+
+def measure_once(statement: str) -> Tuple[int, Dict[str, int]]:
+    """Return scarf's cumulative import time and each module's own time, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    modules: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # header line
+        modules[name.strip()] = self_us
+        if name.strip() == "scarf":
+            total = cumulative_us
+    return total, modules
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    measure_once(STATEMENT)  # warm the bytecode cache
+    totals = []
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total, modules = measure_once(STATEMENT)
+        totals.append(total)
+
+    median_ms = statistics.median(totals) / 1000
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]
+    report = {
+        "statement": STATEMENT,
+        "runs": args.runs,
+        "median_ms": round(median_ms, 3),
+        "min_ms": round(min(totals) / 1000, 3),
+        "modules_imported": len(modules),
+        "slowest_modules_us": dict(slowest),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import scarf: median {report['median_ms']}ms, min {report['min_ms']}ms "
+              f"over {args.runs} runs ({len(modules)} modules)")
+        for name, us in slowest:
+            print(f"  {us:>8}us  {name}")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"Import time {median_ms:.1f}ms exceeds budget of {args.max_ms}ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""
+A local stand-in for a Scarf endpoint, for benchmarks.
+
+Accepts single JSON and batched (optionally gzipped) NDJSON POSTs on any path,
+counts the events it receives, and can inject latency, server errors and 429
+responses. GET /stats returns the counters as JSON.
+
+To run the collector on its own:
+   python benchmarks/stub_collector.py [--port 8765] [--latency-ms 5] [--error-rate 0.01]
+       [--throttle-rate 0.01] [--retry-after 1]
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class StubCollector:
+    """An HTTP server that counts events and misbehaves on request.
+
+    Use as a context manager, or call start() and close().
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: Optional[float] = None,
+    ):
+        """Bind the server.
+
+        Args:
+            host: Interface to listen on (default: '127.0.0.1')
+            port: Port to listen on, 0 for any free port (default: 0)
+            latency: Seconds to wait before answering each request (default: 0.0)
+            error_rate: Fraction of requests answered with 503 (default: 0.0)
+            throttle_rate: Fraction of requests answered with 429 (default: 0.0)
+            retry_after: Retry-After value sent with 429 responses (optional)
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'events': 0, 'errors': 0, 'throttled': 0, 'bytes': 0}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/events"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def start(self) -> 'StubCollector':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'StubCollector':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _respond_to(self, headers, body: bytes) -> int:
+        """Count a request and pick the status to answer it with."""
+        if self.latency:
+            time.sleep(self.latency)
+        roll = random.random()
+        with self._lock:
+            stats = self._stats
+            stats['requests'] += 1
+            stats['bytes'] += len(body)
+            if roll < self.throttle_rate:
+                stats['throttled'] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                stats['errors'] += 1
+                return 503
+        if headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if headers.get('Content-Type') == 'application/x-ndjson':
+            events = body.count(b'\n')
+        else:
+            events = 1
+        with self._lock:
+            self._stats['events'] += events
+        return 200
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                status = stub._respond_to(self.headers, body)
+                self.send_response(status)
+                if status == 429 and stub.retry_after is not None:
+                    self.send_header('Retry-After', f"{stub.retry_after:g}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):
+                body = json.dumps(stub.stats()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    collector = StubCollector(
+        args.host,
+        args.port,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+    )
+    print(f"Stub collector listening on {collector.url}", flush=True)
+    try:
+        collector._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector._server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
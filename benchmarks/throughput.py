@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+"""
+Throughput and latency benchmark for scarf.
+
+Starts a local stub collector (see stub_collector.py), then drives each logger
+mode against it in a fresh interpreter, at a fixed rate or as fast as
+possible. For every mode it reports events/sec, caller-side p50/p99 latency,
+CPU time per event and peak RSS, plus how many events the collector received.
+
+To run this benchmark:
+   python benchmarks/throughput.py [--events 5000] [--rate 0] [--scenarios sync,batched]
+       [--transport requests|http.client|null] [--latency-ms 0] [--error-rate 0]
+       [--throttle-rate 0] [--retries 1] [--json] [--output results.json]
+       [--baseline previous.json --tolerance 0.2]
+
+With --baseline the script exits with status 1 when a mode's throughput drops,
+or its CPU time per event grows, by more than --tolerance against an earlier
+--output file, so it can guard against regressions before a release.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from stub_collector import StubCollector
+
+SCENARIOS = ('sync', 'background', 'batched', 'adaptive', 'async')
+BATCH_SIZE = 500
+
+
+def make_event(i: int) -> Dict[str, Any]:
+    return {'event': 'benchmark', 'package': f'pkg-{i % 50}', 'seq': i, 'cached': i % 3 == 0}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def peak_rss_kib() -> int:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def make_transport(name: str):
+    from scarf.transport import HTTPClientTransport, NullTransport, RequestsTransport
+
+    if name == 'http.client':
+        return HTTPClientTransport()
+    if name == 'null':
+        return NullTransport()
+    return RequestsTransport()
+
+
+def make_logger(scenario: str, url: str, args: argparse.Namespace):
+    from scarf import AsyncScarfEventLogger, RetryPolicy, ScarfEventLogger
+
+    retry_policy = RetryPolicy(max_attempts=args.retries, initial_backoff=0.01)
+    if scenario == 'async':
+        return AsyncScarfEventLogger(url, retry_policy=retry_policy)
+    options: Dict[str, Any] = {}
+    if scenario in ('background', 'batched', 'adaptive'):
+        options['background'] = True
+        options['max_queue_size'] = max(args.events, 1)
+    if scenario == 'batched':
+        options.update(batch_size=BATCH_SIZE, linger=0.05)
+    if scenario == 'adaptive':
+        from scarf.adaptive import AdaptiveController
+
+        options['adaptive'] = AdaptiveController(max_batch_size=BATCH_SIZE, max_linger=0.05)
+    return ScarfEventLogger(
+        url, transport=make_transport(args.transport), retry_policy=retry_policy, **options
+    )
+
+
+def paced(rate: float) -> Callable[[int], float]:
+    """Return a function giving the number of seconds to wait before event ``i``."""
+    start = time.perf_counter()
+    if not rate:
+        return lambda i: 0.0
+    return lambda i: start + i / rate - time.perf_counter()
+
+
+def drive_sync(logger, args: argparse.Namespace) -> Dict[str, Any]:
+    """Log every event, then close the logger; returns latencies in nanoseconds."""
+    latencies, errors = [], 0
+    delay = paced(args.rate)
+    for i in range(args.events):
+        wait = delay(i)
+        if wait > 0:
+            time.sleep(wait)
+        start = time.perf_counter_ns()
+        try:
+            if not logger.log_event(make_event(i)):
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter_ns() - start)
+    logged = time.perf_counter()
+    logger.close(timeout=60)
+    return {'latencies': latencies, 'errors': errors, 'logged': logged}
+
+
+def drive_async(logger, args: argparse.Namespace) -> Dict[str, Any]:
+    """Like drive_sync for AsyncScarfEventLogger, with one task per event."""
+    latencies, errors = [], 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter_ns()
+        try:
+            if not await logger.log_event(make_event(i)):
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter_ns() - start)
+
+    async def run() -> float:
+        delay = paced(args.rate)
+        tasks = []
+        for i in range(args.events):
+            wait = delay(i)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            tasks.append(asyncio.ensure_future(one(i)))
+        await asyncio.gather(*tasks)
+        logged = time.perf_counter()
+        await logger.aclose()  # on the loop that owns its connections
+        return logged
+
+    logged = asyncio.run(run())
+    return {'latencies': latencies, 'errors': errors, 'logged': logged}
+
+
+def run_scenario(scenario: str, url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive one logger mode in this process and measure it."""
+    logger = make_logger(scenario, url, args)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    drive = drive_async if scenario == 'async' else drive_sync
+    result = drive(logger, args)
+    logged = result['logged']
+    wall_end = time.perf_counter()
+    cpu = time.process_time() - cpu_start
+
+    latencies = sorted(result['latencies'])
+    return {
+        'scenario': scenario,
+        'events': args.events,
+        'caller_errors': result['errors'],
+        'log_seconds': round(logged - wall_start, 4),
+        'drain_seconds': round(wall_end - logged, 4),
+        'events_per_sec': round(args.events / (wall_end - wall_start), 1),
+        'caller_events_per_sec': round(args.events / max(logged - wall_start, 1e-9), 1),
+        'latency_us': {
+            'p50': round(percentile(latencies, 0.50) / 1000, 1),
+            'p99': round(percentile(latencies, 0.99) / 1000, 1),
+            'max': round(latencies[-1] / 1000, 1) if latencies else 0.0,
+        },
+        'cpu_us_per_event': round(cpu / args.events * 1e6, 2),
+        'peak_rss_kib': peak_rss_kib(),
+    }
+
+
+def run_in_subprocess(scenario: str, url: str, argv: List[str]) -> Dict[str, Any]:
+    """Run a scenario in a fresh interpreter so CPU time and RSS are its own."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *argv, '--child', scenario, '--url', url],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {r['scenario']: r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get(result['scenario'])
+        if before is None:
+            continue
+        if result['events_per_sec'] < before['events_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: events/sec {before['events_per_sec']} "
+                               f"-> {result['events_per_sec']}")
+        if result['cpu_us_per_event'] > before['cpu_us_per_event'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: CPU us/event "
+                               f"{before['cpu_us_per_event']} -> {result['cpu_us_per_event']}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="events per second, 0 for as fast as possible")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--transport", choices=("requests", "http.client", "null"),
+                        default="requests")
+    parser.add_argument("--retries", type=int, default=1, help="attempts per request")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.url, args)))
+        return 0
+
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    collector = StubCollector(
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=0,
+    )
+    results = []
+    with collector:
+        for scenario in scenarios:
+            before = collector.stats()
+            result = run_in_subprocess(scenario, collector.url, argv)
+            after = collector.stats()
+            result['collector'] = {name: after[name] - before[name] for name in after}
+            results.append(result)
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'config': {name: value for name, value in vars(args).items()
+                   if name not in ('child', 'url', 'json', 'output', 'baseline')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.events} events per mode, transport={args.transport}, "
+              f"rate={args.rate or 'max'}")
+        print(f"  {'mode':<11} {'events/s':>9} {'p50 us':>8} {'p99 us':>9} "
+              f"{'cpu us/ev':>9} {'rss MiB':>8} {'received':>8}")
+        for r in results:
+            print(f"  {r['scenario']:<11} {r['events_per_sec']:>9} "
+                  f"{r['latency_us']['p50']:>8} {r['latency_us']['p99']:>9} "
+                  f"{r['cpu_us_per_event']:>9} {r['peak_rss_kib'] / 1024:>8.1f} "
+                  f"{r['collector']['events']:>8}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
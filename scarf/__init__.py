@@ -1,6 +1,55 @@
 """Python bindings for Scarf telemetry."""
 
 from .event_logger import ScarfEventLogger
+from .exceptions import CircuitOpenError, HTTPStatusError, ScarfError, TransportError
+from .registry import get_logger
 from .version import __version__
 
-__all__ = ["ScarfEventLogger", "__version__"]
+# Less commonly used parts of the API are imported on first access so that
+# `import scarf` stays cheap (no asyncio, ssl or random at import time).
+_LAZY_EXPORTS = {
+    "AsyncScarfEventLogger": ".async_event_logger",
+    "CircuitBreaker": ".retry",
+    "EventAggregator": ".aggregation",
+    "FanoutEventLogger": ".fanout",
+    "Hooks": ".metrics",
+    "PayloadGuard": ".guard",
+    "RetryPolicy": ".retry",
+    "Sampler": ".sampling",
+    "ScarfLoggingHandler": ".log_handler",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
+
+
+__all__ = [
+    "AsyncScarfEventLogger",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "EventAggregator",
+    "FanoutEventLogger",
+    "HTTPStatusError",
+    "Hooks",
+    "PayloadGuard",
+    "RetryPolicy",
+    "Sampler",
+    "ScarfError",
+    "ScarfEventLogger",
+    "ScarfLoggingHandler",
+    "TransportError",
+    "__version__",
+    "get_logger",
+]
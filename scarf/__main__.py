@@ -0,0 +1,6 @@
+"""Run the ``scarf`` command line tool with ``python -m scarf``."""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,192 @@
+"""Adaptive tuning of batching and concurrency from observed endpoint behaviour."""
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .retry import _status_and_headers, is_transient
+
+if TYPE_CHECKING:
+    from .dispatcher import BackgroundDispatcher
+
+
+class AdaptiveController:
+    """Tune a background logger's batch size, linger and concurrency at runtime.
+
+    The controller follows additive increase, multiplicative decrease (AIMD),
+    the way TCP congestion control does. After every request it looks at the
+    request's latency and outcome:
+
+    - A 429 response halves the number of requests in flight and doubles the
+      batch size and linger, so the same events go out in fewer requests.
+    - A transient failure (timeout, connection error, 5xx) or a latency above
+      ``target_latency`` halves the requests in flight and the batch size.
+    - A fast, successful request while events are backing up in the queue
+      raises the requests in flight by about one per round trip, grows the
+      batch size by a quarter and halves the linger, since full batches don't
+      need to wait. When the queue keeps up, the linger grows back towards
+      ``max_linger`` so that low traffic is sent in fewer, larger requests.
+
+    Decreases take effect at most once per ``target_latency``, so that the
+    requests already in flight when the endpoint slowed down don't cut the
+    settings several times over. Every value stays within its bounds.
+    ``state()`` returns the current decisions and the signals behind them.
+    """
+
+    DEFAULT_TARGET_LATENCY = 0.5  # 500 milliseconds
+    EWMA_WEIGHT = 0.2  # weight of the newest request in the moving averages
+
+    def __init__(
+        self,
+        min_batch_size: int = 1,
+        max_batch_size: int = 1000,
+        min_linger: float = 0.0,
+        max_linger: float = 1.0,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+    ):
+        """Initialize the controller.
+
+        Args:
+            min_batch_size: Smallest batch size used (optional, default: 1)
+            max_batch_size: Largest batch size used (optional, default: 1000)
+            min_linger: Shortest linger in seconds (optional, default: 0.0)
+            max_linger: Longest linger in seconds (optional, default: 1.0)
+            min_concurrency: Fewest requests allowed in flight (optional, default: 1)
+            max_concurrency: Most requests allowed in flight (optional, default: 8)
+            target_latency: Request latency in seconds above which the endpoint
+                is considered overloaded (optional, default: 0.5)
+
+        Raises:
+            ValueError: If a minimum exceeds its maximum, a batch size or
+                concurrency is less than 1, a linger is negative, or
+                target_latency is not positive
+        """
+        if not 1 <= min_batch_size <= max_batch_size:
+            raise ValueError("batch sizes must satisfy 1 <= min_batch_size <= max_batch_size")
+        if not 0 <= min_linger <= max_linger:
+            raise ValueError("lingers must satisfy 0 <= min_linger <= max_linger")
+        if not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(
+                "concurrency must satisfy 1 <= min_concurrency <= max_concurrency"
+            )
+        if target_latency <= 0:
+            raise ValueError("target_latency must be positive")
+
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.min_linger = min_linger
+        self.max_linger = max_linger
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+
+        self.batch_size = min_batch_size
+        self.linger = max_linger
+        self.concurrency = min_concurrency
+        self.latency: Optional[float] = None  # moving average, in seconds
+        self.error_rate = 0.0  # moving average of transient failures
+        self.throttled = 0  # 429 responses seen
+        self.increases = 0
+        self.decreases = 0
+        self._credit = 0.0  # progress towards the next concurrency increase
+        self._last_decrease = float('-inf')
+        self._dispatcher: Optional['BackgroundDispatcher'] = None
+        self._lock = threading.Lock()
+
+    def attach(self, dispatcher: 'BackgroundDispatcher') -> None:
+        """Start tuning ``dispatcher``, from its current settings within the bounds."""
+        with self._lock:
+            self._dispatcher = dispatcher
+            self.batch_size = _clamp(
+                dispatcher.batch_size, self.min_batch_size, self.max_batch_size
+            )
+            self.linger = _clamp(dispatcher.linger, self.min_linger, self.max_linger)
+            self.concurrency = _clamp(
+                dispatcher.concurrency, self.min_concurrency, self.max_concurrency
+            )
+            self._apply()
+
+    def record(self, seconds: float, error: Optional[BaseException] = None) -> None:
+        """Take the outcome of one request into account.
+
+        Args:
+            seconds: How long the request took
+            error: The exception the request raised, if it failed
+        """
+        status = _status_and_headers(error)[0] if error is not None else None
+        throttled = status == 429
+        failed = error is not None and not throttled and is_transient(error)
+        weight = self.EWMA_WEIGHT
+
+        with self._lock:
+            if error is None or failed:
+                latency = self.latency
+                if latency is None:
+                    self.latency = seconds
+                else:
+                    self.latency = latency + weight * (seconds - latency)
+            self.error_rate += weight * ((1.0 if failed else 0.0) - self.error_rate)
+            if throttled:
+                self.throttled += 1
+
+            if throttled or failed or (error is None and seconds > self.target_latency):
+                now = time.monotonic()
+                if now - self._last_decrease < self.target_latency:
+                    return
+                self._last_decrease = now
+                self.decreases += 1
+                self._credit = 0.0
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                if throttled:
+                    self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                    self.linger = min(self.max_linger, max(self.linger * 2, 0.01))
+                else:
+                    self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            elif error is None:
+                dispatcher = self._dispatcher
+                backlog = len(dispatcher) if dispatcher is not None else 0
+                if backlog >= self.batch_size:
+                    self.increases += 1
+                    self._credit += 1.0 / self.concurrency
+                    if self._credit >= 1.0:
+                        self._credit = 0.0
+                        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    self.batch_size = min(
+                        self.max_batch_size, self.batch_size + max(1, self.batch_size // 4)
+                    )
+                    self.linger = max(self.min_linger, self.linger / 2)
+                else:
+                    self.linger = min(self.max_linger, max(self.linger * 2, 0.01))
+            else:
+                return  # the request itself was at fault; says nothing about load
+            self._apply()
+
+    def state(self) -> Dict[str, Any]:
+        """Return the current settings and the signals they are based on."""
+        with self._lock:
+            return {
+                'batch_size': self.batch_size,
+                'linger': self.linger,
+                'concurrency': self.concurrency,
+                'latency': self.latency,
+                'error_rate': self.error_rate,
+                'throttled': self.throttled,
+                'increases': self.increases,
+                'decreases': self.decreases,
+            }
+
+    def _apply(self) -> None:
+        # Called with the lock held. The dispatcher reads these on every batch.
+        dispatcher = self._dispatcher
+        if dispatcher is not None:
+            dispatcher.batch_size = self.batch_size
+            dispatcher.linger = self.linger
+            dispatcher.concurrency = self.concurrency
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
@@ -0,0 +1,201 @@
+"""In-process aggregation of counter and measurement events."""
+import threading
+import time
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+from . import fork
+from .event_logger import ScarfEventLogger
+
+_Key = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+
+class _Summary:
+    __slots__ = ('count', 'total', 'minimum', 'maximum')
+
+    def __init__(self, value: float):
+        self.count = 1
+        self.total = value
+        self.minimum = value
+        self.maximum = value
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+
+class EventAggregator:
+    """Fold counter and measurement events in memory and send periodic summaries.
+
+    ``increment`` and ``observe`` only update an in-memory table keyed by event
+    name and dimensions. Every ``flush_interval`` seconds a background thread
+    sends one summary event per key through ``logger.log_event``:
+
+    - counters: ``{'event': name, **dims, 'aggregate': 'counter', 'count': n}``
+    - observations: ``{'event': name, **dims, 'aggregate': 'summary', 'count': n,
+      'sum': s, 'min': lo, 'max': hi}``
+
+    At most ``max_keys`` distinct keys are tracked per interval. Calls for
+    further keys are folded into one ``OVERFLOW_EVENT`` counter without
+    dimensions, which counts them, so the table never holds more than
+    ``max_keys + 1`` keys. Folded calls are also counted in ``overflowed``.
+
+    Dimension values must be hashable, and are sent as-is.
+    """
+
+    DEFAULT_FLUSH_INTERVAL = 60.0  # 1 minute
+    DEFAULT_MAX_KEYS = 1000
+    OVERFLOW_EVENT = 'overflow'
+
+    def __init__(
+        self,
+        logger: ScarfEventLogger,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_keys: int = DEFAULT_MAX_KEYS,
+    ):
+        """Initialize the aggregator.
+
+        Args:
+            logger: Logger used to send summary events; a background logger keeps
+                flushes off the aggregating threads entirely
+            flush_interval: Seconds between summary flushes (optional, default: 60.0)
+            max_keys: Maximum number of distinct keys per interval (optional, default: 1000)
+
+        Raises:
+            ValueError: If flush_interval is not positive or max_keys is less than 1
+        """
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive")
+        if max_keys < 1:
+            raise ValueError("max_keys must be at least 1")
+
+        self.logger = logger
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.overflowed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, int] = {}
+        self._summaries: Dict[_Key, _Summary] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        fork.register(self)
+
+    def increment(
+        self,
+        name: str,
+        dims: Optional[Mapping[str, Hashable]] = None,
+        n: int = 1,
+    ) -> None:
+        """Add ``n`` to the counter for ``name`` with the given dimensions."""
+        key = (name, tuple(sorted(dims.items())) if dims else ())
+        with self._lock:
+            counters = self._counters
+            if key not in counters and not self._has_room():
+                self._fold()
+            else:
+                counters[key] = counters.get(key, 0) + n
+            if self._thread is None:
+                self._start()
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        dims: Optional[Mapping[str, Hashable]] = None,
+    ) -> None:
+        """Record a measurement for ``name`` with the given dimensions."""
+        key = (name, tuple(sorted(dims.items())) if dims else ())
+        with self._lock:
+            summaries = self._summaries
+            summary = summaries.get(key)
+            if summary is not None:
+                summary.add(value)
+            elif self._has_room():
+                summaries[key] = _Summary(value)
+            else:
+                self._fold()
+            if self._thread is None:
+                self._start()
+
+    def flush(self) -> int:
+        """Send a summary event for every key recorded since the last flush.
+
+        Send failures are counted in ``failed`` rather than raised.
+
+        Returns:
+            The number of summary events handed to the logger
+        """
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            summaries, self._summaries = self._summaries, {}
+
+        sent = 0
+        for (name, dims), count in counters.items():
+            sent += self._log({'event': name, **dict(dims), 'aggregate': 'counter', 'count': count})
+        for (name, dims), summary in summaries.items():
+            sent += self._log({
+                'event': name,
+                **dict(dims),
+                'aggregate': 'summary',
+                'count': summary.count,
+                'sum': summary.total,
+                'min': summary.minimum,
+                'max': summary.maximum,
+            })
+        return sent
+
+    def close(self) -> int:
+        """Stop the flush thread and send any remaining summaries.
+
+        Returns:
+            The number of summary events handed to the logger by the final flush
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.flush()
+
+    def _after_fork_in_child(self) -> None:
+        # The parent reports what was recorded before the fork.
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+        stopped = self._stopped.is_set()
+        self._stopped = threading.Event()
+        if stopped:
+            self._stopped.set()
+        self._thread = None
+
+    def _has_room(self) -> bool:
+        return len(self._counters) + len(self._summaries) < self.max_keys
+
+    def _fold(self) -> None:
+        self.overflowed += 1
+        key = (self.OVERFLOW_EVENT, ())
+        self._counters[key] = self._counters.get(key, 0) + 1
+
+    def _log(self, properties: Dict[str, Any]) -> int:
+        try:
+            return 1 if self.logger.log_event(properties) else 0
+        except Exception as e:
+            self.failed += 1
+            if self.logger.verbose:
+                print(f"\nFailed to send aggregate {properties.get('event')!r}:")
+                print(f"  {type(e).__name__}: {str(e)}")
+            return 0
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="scarf-aggregator", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stopped.wait(max(0.0, next_flush - time.monotonic())):
+            next_flush += self.flush_interval
+            self.flush()
@@ -0,0 +1,383 @@
+"""An asyncio client for sending telemetry events to Scarf."""
+import asyncio
+import os
+import ssl
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .dedup import DedupCache
+from .event_logger import ScarfEventLogger, build_user_agent
+from .exceptions import CircuitOpenError, HTTPStatusError, TransportError
+from .guard import PayloadGuard
+from .metrics import ClientMetrics, Hooks
+from .retry import CircuitBreaker, RetryPolicy, is_transient
+from .sampling import Sampler
+from .serialization import EventEncoder
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class _AsyncConnectionPool:
+    """Keep-alive HTTP/1.1 connections to a single origin."""
+
+    def __init__(self, endpoint_url: str, max_connections: int):
+        parts = urlsplit(endpoint_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme!r}")
+
+        self.host = parts.hostname or ''
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        default_port = 443 if parts.scheme == 'https' else 80
+        self.host_header = self.host if self.port == default_port else f"{self.host}:{self.port}"
+        self.max_connections = max_connections
+        self._ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self._idle: Deque[_Connection] = deque()
+
+    async def request(
+        self,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """POST body to the endpoint and return (status, headers, body) of the response."""
+        head = [f"POST {self.path} HTTP/1.1", f"Host: {self.host_header}"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        head.append(f"Content-Length: {len(body)}")
+        request = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+        while True:
+            conn, reused = await self._acquire()
+            reusable = False
+            try:
+                reader, writer = conn
+                writer.write(request)
+                await writer.drain()
+                status, response_headers, response_body, reusable = await _read_response(
+                    reader
+                )
+                return status, response_headers, response_body
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server may have closed an idle keep-alive connection; retry
+                # once on a fresh one. Failures on fresh connections propagate.
+                if reused:
+                    continue
+                raise
+            finally:
+                self._release(conn, reusable)
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.popleft()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def _acquire(self) -> Tuple[_Connection, bool]:
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+        conn = await asyncio.open_connection(
+            self.host,
+            self.port,
+            ssl=self._ssl,
+            server_hostname=self.host if self._ssl else None,
+        )
+        return conn, False
+
+    def _release(self, conn: _Connection, reusable: bool) -> None:
+        if reusable and len(self._idle) < self.max_connections:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+
+async def _read_response(
+    reader: asyncio.StreamReader,
+) -> Tuple[int, Dict[str, str], bytes, bool]:
+    status_line = await reader.readuntil(b'\r\n')
+    version, status, *_ = status_line.decode('latin-1').split(' ', 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b'\r\n')
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';', 1)[0], 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line.
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    return int(status), headers, body, keep_alive
+
+
+class AsyncScarfEventLogger:
+    """An asyncio client for sending telemetry events to Scarf.
+
+    Events are sent over a pool of keep-alive connections, with at most
+    ``max_concurrency`` requests in flight at once. Instances must be used
+    from a single event loop.
+    """
+
+    DEFAULT_TIMEOUT = ScarfEventLogger.DEFAULT_TIMEOUT
+    DEFAULT_MAX_CONCURRENCY = 10
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        timeout: Optional[float] = None,
+        verbose: Optional[bool] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        sampler: Optional[Sampler] = None,
+        static_properties: Optional[Dict[str, Any]] = None,
+        hooks: Optional[Hooks] = None,
+        dedup: Optional[DedupCache] = None,
+        guard: Optional[PayloadGuard] = None,
+    ):
+        """Initialize the async Scarf event logger.
+
+        Args:
+            endpoint_url: The endpoint URL for the Scarf API
+            timeout: Default timeout in seconds for API calls (optional, default: 3.0)
+            verbose: Enable verbose logging (optional, defaults to SCARF_VERBOSE env var)
+            max_concurrency: Maximum number of requests in flight at once, which is
+                also the size of the connection pool (optional, default: 10)
+            retry_policy: Policy for retrying transient failures with backoff
+                (optional, default: no retries)
+            circuit_breaker: Breaker that fails sends immediately while the endpoint
+                keeps failing (optional, default: none)
+            sampler: Sampling and rate limiting applied before an event is encoded
+                or queued (optional, default: send every event)
+            static_properties: Properties added to every event, encoded once up
+                front; properties of an event override them (optional)
+            hooks: ``scarf.metrics.Hooks`` called before and after each request,
+                on the event loop (optional)
+            dedup: ``scarf.dedup.DedupCache`` that suppresses repeats of identical
+                events, checked after sampling (optional, default: send every event)
+            guard: ``scarf.guard.PayloadGuard`` that truncates or rejects events
+                over its limits before they are sent (optional, default: no limits)
+
+        Raises:
+            ValueError: If endpoint_url is not provided or is empty, uses a scheme
+                other than http or https, or max_concurrency is less than 1
+        """
+        if not endpoint_url:
+            raise ValueError("endpoint_url must be provided")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.timeout = timeout if timeout is not None else self.DEFAULT_TIMEOUT
+        self.verbose = (
+            verbose if verbose is not None
+            else os.environ.get('SCARF_VERBOSE', '').lower() in ('1', 'true')
+        )
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.sampler = sampler
+        self.dedup = dedup
+        self.guard = guard
+        self.encoder = EventEncoder(static_properties)
+        self.hooks = hooks
+        self.metrics = ClientMetrics()
+        self.headers = {
+            'User-Agent': build_user_agent(),
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+        }
+        self._pool = _AsyncConnectionPool(self.endpoint_url, max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        if self.verbose:
+            print("Scarf Async Logger Configuration:")
+            print(f"  Endpoint URL: {self.endpoint_url}")
+            print(f"  Timeout: {self.timeout}s")
+            print(f"  Max concurrency: {self.max_concurrency}")
+            print(f"  User-Agent: {self.headers['User-Agent']}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the logger's counters; see ``ScarfEventLogger.stats``."""
+        return self.metrics.snapshot()
+
+    async def __aenter__(self) -> 'AsyncScarfEventLogger':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def log_event(
+        self,
+        properties: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Log a telemetry event to Scarf.
+
+        Args:
+            properties: JSON-serializable properties to include with the event.
+                Nested structures are allowed.
+            timeout: Optional timeout in seconds for this specific API call,
+                not counting time spent waiting for a free connection.
+                Overrides the default timeout set in the constructor.
+
+        Returns:
+            True if the event was sent successfully, False if analytics are disabled,
+            the sampler or dedup cache dropped the event or the payload guard
+            rejected it
+
+        Raises:
+            HTTPStatusError: If the endpoint answers with a non-success status,
+                after any retries allowed by the retry policy
+            TransportError: If the request fails or times out, after any retries
+            CircuitOpenError: If the circuit breaker is open
+        """
+        if ScarfEventLogger._check_do_not_track():
+            if self.verbose:
+                print("Analytics are disabled via environment variables")
+            return False
+
+        if self.sampler is not None:
+            properties = self.sampler.apply(properties)
+            if properties is None:
+                self.metrics.add('events_sampled_out')
+                return False
+
+        if self.guard is None:
+            body = self.encoder.encode(properties)
+        else:
+            body, changed = self.guard.encode(properties, self.encoder)
+            if changed:
+                self.metrics.add('events_truncated')
+            if body is None:
+                self.metrics.add('events_rejected')
+                if self.verbose:
+                    print("Event rejected: over the payload guard's limits")
+                return False
+
+        if self.dedup is not None and not self.dedup.check(properties):
+            self.metrics.add('events_deduplicated')
+            return False
+
+        timeout = timeout if timeout is not None else self.timeout
+        if self.verbose:
+            print("\nSending event:")
+            print(f"  Properties: {properties}")
+            print(f"  Timeout: {timeout}s")
+
+        start_time = time.time()
+        try:
+            status, response_body = await self._post_with_retries(body, timeout)
+
+            if self.verbose:
+                elapsed = time.time() - start_time
+                print(f"\nResponse received in {elapsed:.3f}s:")
+                print(f"  Status: {status}")
+                if response_body:
+                    print(f"  Body: {response_body[:1000].decode('utf-8', 'replace')}")
+
+            return True
+
+        except Exception as e:
+            if self.dedup is not None:
+                self.dedup.forget(properties)  # let a retry through
+            if self.verbose:
+                elapsed = time.time() - start_time
+                print(f"\nError after {elapsed:.3f}s:")
+                print(f"  {type(e).__name__}: {str(e)}")
+            raise
+
+    async def _post(self, body: bytes, timeout: float) -> Tuple[int, bytes]:
+        async with self._semaphore:
+            try:
+                status, headers, response_body = await asyncio.wait_for(
+                    self._pool.request(self.headers, body), timeout
+                )
+            except asyncio.TimeoutError as e:
+                raise TransportError(f"Request timed out after {timeout}s") from e
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                raise TransportError(str(e) or type(e).__name__) from e
+
+        if not 200 <= status < 300:
+            raise HTTPStatusError(status, headers, response_body)
+        return status, response_body
+
+    async def _post_with_retries(self, body: bytes, timeout: float) -> Tuple[int, bytes]:
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.before_send(1, len(body))
+        self.metrics.request_started()
+        start = time.perf_counter()
+        try:
+            result = await self._call_with_retries(body, timeout)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            self.metrics.request_finished(1, len(body), elapsed, ok=False)
+            if hooks is not None:
+                hooks.on_error(1, e, elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        self.metrics.request_finished(1, len(body), elapsed, ok=True)
+        if hooks is not None:
+            hooks.after_send(1, len(body), elapsed)
+        return result
+
+    async def _call_with_retries(self, body: bytes, timeout: float) -> Tuple[int, bytes]:
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            raise CircuitOpenError("Circuit breaker is open; not sending to Scarf")
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._post(body, timeout)
+            except Exception as e:
+                policy = self.retry_policy
+                if policy is not None and policy.should_retry(e, attempt):
+                    self.metrics.add('retries')
+                    await asyncio.sleep(policy.backoff(attempt, e))
+                    continue
+                if breaker is not None:
+                    if is_transient(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    async def aclose(self) -> None:
+        """Close all pooled connections and save the dedup index, if any."""
+        await self._pool.close()
+        if self.dedup is not None:
+            try:
+                self.dedup.save()
+            except OSError as e:
+                if self.verbose:
+                    print(f"\nFailed to save the dedup index: {e}")
@@ -0,0 +1,355 @@
+"""The ``scarf`` command line tool.
+
+``scarf send`` replays a file of newline-delimited JSON events, for example to
+backfill events that were recorded offline::
+
+    scarf send --endpoint https://your-scarf-endpoint.com events.ndjson \\
+        --concurrency 8 --checkpoint events.ckpt --failed events.failed
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from .event_logger import ScarfEventLogger
+from .retry import RetryPolicy
+from .version import __version__
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+READ_BUFFER_SIZE = 1024 * 1024  # 1 MiB
+CHECKPOINT_INTERVAL = 1.0  # seconds between checkpoint and progress updates
+
+# (offset of the first line, offset after the last line, lines)
+Batch = Tuple[int, int, List[bytes]]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='scarf', description="Scarf telemetry tools.")
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    send = commands.add_parser(
+        'send',
+        help="send the events in an NDJSON file",
+        description=(
+            "Send the events in a newline-delimited JSON file in parallel batches. "
+            "The endpoint must accept batched NDJSON bodies."
+        ),
+    )
+    send.add_argument('file', help="NDJSON file with one event object per line, or - for stdin")
+    send.add_argument('--endpoint', required=True, help="endpoint URL for the Scarf API")
+    send.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                      help=f"events per request (default: {DEFAULT_BATCH_SIZE})")
+    send.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                      help=f"requests in flight at once (default: {DEFAULT_CONCURRENCY})")
+    send.add_argument('--timeout', type=float, default=ScarfEventLogger.DEFAULT_TIMEOUT,
+                      help="timeout in seconds per request (default: %(default)s)")
+    send.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                      help=f"attempts per request (default: {DEFAULT_RETRIES})")
+    send.add_argument('--checkpoint', metavar='PATH',
+                      help="file recording progress; an interrupted run resumes from it")
+    send.add_argument('--failed', metavar='PATH',
+                      help="file the lines that were invalid or failed to send are appended to")
+    send.add_argument('--no-compress', action='store_true', help="don't gzip request bodies")
+    send.add_argument('--quiet', action='store_true', help="don't report progress")
+    send.add_argument('--verbose', action='store_true', help="log every request")
+
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.concurrency < 1 or args.retries < 1:
+        parser.error("--batch-size, --concurrency and --retries must be at least 1")
+    if args.file == '-' and args.checkpoint:
+        parser.error("--checkpoint requires a file, not stdin")
+    return send_file(args)
+
+
+def send_file(args: argparse.Namespace) -> int:
+    """Run ``scarf send``; returns the exit status."""
+    if ScarfEventLogger._check_do_not_track():
+        print("Analytics are disabled via environment variables", file=sys.stderr)
+        return 0
+
+    try:
+        checkpoint = Checkpoint(args.checkpoint, args.file) if args.checkpoint else None
+    except ValueError as e:
+        print(f"scarf send: {e}", file=sys.stderr)
+        return 2
+
+    logger = ScarfEventLogger(
+        args.endpoint,
+        timeout=args.timeout,
+        verbose=args.verbose,
+        compress=not args.no_compress,
+        retry_policy=RetryPolicy(max_attempts=args.retries),
+    )
+    start_offset = checkpoint.offset if checkpoint is not None else 0
+    progress = Progress(
+        None if args.quiet else sys.stderr,
+        _size(args.file),
+        start_offset,
+        checkpoint.sent + checkpoint.failed if checkpoint is not None else 0,
+    )
+    replay = Replay(logger, args.concurrency, checkpoint, args.failed, progress)
+
+    if args.file == '-':
+        source = sys.stdin.buffer
+    else:
+        source = open(args.file, 'rb', buffering=READ_BUFFER_SIZE)
+        source.seek(start_offset)
+    try:
+        replay.run(read_batches(source, start_offset, args.batch_size, logger.batch_max_bytes))
+    except KeyboardInterrupt:
+        replay.interrupted = True
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        replay.finish()
+        logger.close()
+
+    progress.done(replay.sent, replay.failed)
+    if replay.interrupted:
+        if checkpoint is not None:
+            print(f"Interrupted; rerun to resume from byte {checkpoint.offset}", file=sys.stderr)
+        return 130
+    return 1 if replay.failed else 0
+
+
+def read_batches(
+    source: BinaryIO,
+    offset: int,
+    batch_size: int,
+    max_bytes: int,
+) -> Iterator[Batch]:
+    """Read lines from ``source`` in batches, tracking byte offsets.
+
+    The file is read through a large buffer, one line at a time, so it is
+    never held in memory as a whole. Blank lines are skipped.
+    """
+    lines: List[bytes] = []
+    size = 0
+    start = offset
+    for line in source:
+        offset += len(line)
+        line = line.strip()
+        if not line:
+            if not lines:
+                start = offset
+            continue
+        lines.append(line)
+        size += len(line) + 1
+        if len(lines) >= batch_size or size >= max_bytes:
+            yield start, offset, lines
+            lines = []
+            size = 0
+            start = offset
+    if lines:
+        yield start, offset, lines
+
+
+class Replay:
+    """Send batches on a thread pool, keeping at most two per thread queued.
+
+    Tracks which byte ranges are done, sent or recorded as failed, so the
+    checkpoint always points just past a prefix of the file that needs no
+    resending.
+    """
+
+    def __init__(
+        self,
+        logger: ScarfEventLogger,
+        concurrency: int,
+        checkpoint: Optional['Checkpoint'],
+        failed_path: Optional[str],
+        progress: 'Progress',
+    ):
+        self.logger = logger
+        self.concurrency = concurrency
+        self.checkpoint = checkpoint
+        self.failed_path = failed_path
+        self.progress = progress
+        self.sent = checkpoint.sent if checkpoint is not None else 0
+        self.failed = checkpoint.failed if checkpoint is not None else 0
+        self.interrupted = False
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix='scarf-send')
+        self._pending: 'OrderedDict[int, Optional[int]]' = OrderedDict()  # start -> end once done
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(2 * concurrency)
+        self._failed_file: Optional[BinaryIO] = None
+        self._last_update = time.monotonic()
+
+    def run(self, batches: Iterator[Batch]) -> None:
+        for start, end, lines in batches:
+            records = []
+            invalid = []
+            for line in lines:
+                (records if _is_event(line) else invalid).append(line)
+            self._slots.acquire()
+            with self._lock:
+                self._pending[start] = None
+                self._record_failed(invalid)
+            self._executor.submit(self._send, start, end, records)
+            self._maybe_update()
+        self._executor.shutdown(wait=True)
+
+    def finish(self) -> None:
+        """Wait for batches in flight, then save the checkpoint and close files."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._save()
+            if self._failed_file is not None:
+                self._failed_file.close()
+
+    def _send(self, start: int, end: int, records: List[bytes]) -> None:
+        ok = True
+        try:
+            if records:
+                self.logger._send_records(records, None)
+        except Exception as e:
+            ok = False
+            if self.logger.verbose:
+                print(f"\nFailed to send {len(records)} events: {type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                if ok:
+                    self.sent += len(records)
+                else:
+                    self._record_failed(records)
+                self._pending[start] = end
+                self._advance()
+            self._slots.release()
+
+    def _record_failed(self, lines: List[bytes]) -> None:
+        # Called with the lock held.
+        if not lines:
+            return
+        self.failed += len(lines)
+        if self.failed_path is None:
+            return
+        if self._failed_file is None:
+            self._failed_file = open(self.failed_path, 'ab')
+        self._failed_file.write(b''.join(line + b'\n' for line in lines))
+
+    def _advance(self) -> None:
+        # Called with the lock held: move the checkpoint past finished batches.
+        pending = self._pending
+        while pending:
+            start, end = next(iter(pending.items()))
+            if end is None:
+                break
+            pending.popitem(last=False)
+            self.progress.offset = end
+
+    def _maybe_update(self) -> None:
+        now = time.monotonic()
+        if now - self._last_update < CHECKPOINT_INTERVAL:
+            return
+        self._last_update = now
+        with self._lock:
+            self._save()
+        self.progress.update(self.sent, self.failed)
+
+    def _save(self) -> None:
+        # Called with the lock held. Failed lines must be on disk before the
+        # checkpoint moves past them.
+        if self.checkpoint is None:
+            return
+        if self._failed_file is not None:
+            self._failed_file.flush()
+        self.checkpoint.save(self.progress.offset, self.sent, self.failed)
+
+
+class Checkpoint:
+    """The byte offset up to which a file has been replayed, kept in a small JSON file."""
+
+    def __init__(self, path: str, source: str):
+        """Load the checkpoint at ``path``, if any.
+
+        Raises:
+            ValueError: If the checkpoint belongs to another file
+        """
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.offset = 0
+        self.sent = 0
+        self.failed = 0
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        if state.get('source') != self.source:
+            raise ValueError(f"checkpoint {path} belongs to {state.get('source')}")
+        self.offset = state['offset']
+        self.sent = state.get('sent', 0)
+        self.failed = state.get('failed', 0)
+
+    def save(self, offset: int, sent: int, failed: int) -> None:
+        self.offset = offset
+        state = {'source': self.source, 'offset': offset, 'sent': sent, 'failed': failed}
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+class Progress:
+    """Report events sent, the send rate and how far through the file we are."""
+
+    def __init__(
+        self,
+        stream,
+        total_bytes: Optional[int],
+        offset: int = 0,
+        start_count: int = 0,
+    ):
+        self.stream = stream
+        self.total_bytes = total_bytes
+        self.offset = offset
+        self._start = time.monotonic()
+        self._start_count = start_count  # events done by earlier, interrupted runs
+
+    def update(self, sent: int, failed: int) -> None:
+        if self.stream is None:
+            return
+        self.stream.write('\r' + self._line(sent, failed))
+        self.stream.flush()
+
+    def done(self, sent: int, failed: int) -> None:
+        if self.stream is None:
+            return
+        self.stream.write('\r' + self._line(sent, failed) + '\n')
+        self.stream.flush()
+
+    def _line(self, sent: int, failed: int) -> str:
+        elapsed = max(time.monotonic() - self._start, 1e-9)
+        rate = (sent + failed - self._start_count) / elapsed
+        line = f"{sent} sent, {failed} failed, {rate:,.0f} events/s"
+        if self.total_bytes:
+            line += f", {100 * self.offset / self.total_bytes:.1f}%"
+        return line
+
+
+def _is_event(line: bytes) -> bool:
+    try:
+        return isinstance(json.loads(line), dict)
+    except ValueError:
+        return False
+
+
+def _size(path: str) -> Optional[int]:
+    if path == '-':
+        return None
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""A per-host collector process that sends events on behalf of local workers.
+
+Pre-fork servers run many worker processes per host. Instead of each worker
+keeping its own connections to Scarf, workers create their logger with
+``collector_socket=path`` and hand every event to one collector process over
+a Unix socket, as newline-delimited JSON. The collector batches the events and sends them
+upstream through a single background ``ScarfEventLogger``::
+
+    from scarf.collector import spawn_collector
+
+    # In the server's master process, before forking workers
+    spawn_collector('/tmp/scarf.sock', 'https://your-scarf-endpoint.com', batch_size=500)
+
+    # In each worker
+    logger = ScarfEventLogger('https://your-scarf-endpoint.com',
+                              collector_socket='/tmp/scarf.sock')
+
+Workers never wait long on the collector: events are dropped when the collector
+is down or has fallen so far behind that the socket stays full for
+``ScarfEventLogger.COLLECTOR_SEND_TIMEOUT`` seconds.
+"""
+import json
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .event_logger import ScarfEventLogger
+
+
+class ScarfCollector:
+    """Receive NDJSON events on a Unix stream socket and log them with ``logger``."""
+
+    READ_SIZE = 256 * 1024
+    POLL_INTERVAL = 0.5  # seconds between checks for close()
+
+    def __init__(self, socket_path: str, logger: ScarfEventLogger):
+        """Bind and listen on the collector socket, replacing a stale socket file.
+
+        Args:
+            socket_path: Filesystem path of the Unix socket
+            logger: Logger that sends received events upstream; normally a
+                background logger with batching enabled
+        """
+        self.socket_path = socket_path
+        self.logger = logger
+        self.received = 0
+        self.invalid = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Listen on a temporary path and move the socket into place, so the
+        # file at socket_path only ever appears once it accepts connections.
+        tmp_path = f'{socket_path}.{os.getpid()}'
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.bind(tmp_path)
+            self._socket.listen(128)
+            os.replace(tmp_path, socket_path)
+        except OSError:
+            self._socket.close()
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._socket.setblocking(False)
+
+    def serve_forever(self) -> None:
+        """Receive and log events until close() is called."""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._socket, selectors.EVENT_READ)
+            # Partial line left over from the previous read, per connection
+            pending: Dict[socket.socket, bytes] = {}
+            try:
+                while not self._stopped.is_set():
+                    for key, _ in selector.select(self.POLL_INTERVAL):
+                        conn = key.fileobj
+                        if conn is self._socket:
+                            self._accept(selector, pending)
+                            continue
+                        try:
+                            data = conn.recv(self.READ_SIZE)
+                        except (BlockingIOError, InterruptedError):
+                            continue
+                        except OSError:
+                            data = b''
+                        if not data:
+                            # A worker that died mid-write leaves a partial line; drop it.
+                            selector.unregister(conn)
+                            conn.close()
+                            del pending[conn]
+                            continue
+                        lines = (pending[conn] + data).split(b'\n')
+                        pending[conn] = lines.pop()
+                        for line in lines:
+                            self._handle(line)
+            finally:
+                for conn in pending:
+                    conn.close()
+
+    def start(self) -> threading.Thread:
+        """Run serve_forever() on a daemon thread and return the thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="scarf-collector", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Stop receiving, remove the socket file and close the logger.
+
+        Args:
+            timeout: Maximum number of seconds to wait for queued events to be sent
+
+        Returns:
+            True if all events were sent before the timeout
+        """
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._socket.close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        return self.logger.close(timeout)
+
+    def _accept(self, selector: selectors.BaseSelector, pending: Dict[socket.socket, bytes]):
+        try:
+            conn, _ = self._socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        conn.setblocking(False)
+        selector.register(conn, selectors.EVENT_READ)
+        pending[conn] = b''
+
+    def _handle(self, line: bytes) -> None:
+        try:
+            properties = json.loads(line)
+        except ValueError:
+            self.invalid += 1
+            return
+        self.received += 1
+        try:
+            self.logger.log_event(properties)
+        except Exception as e:
+            if self.logger.verbose:
+                print(f"\nCollector failed to log event: {type(e).__name__}: {e}")
+
+
+def run_collector(socket_path: str, endpoint_url: str, **logger_options: Any) -> None:
+    """Run a collector in the current process until it receives SIGTERM or SIGINT.
+
+    Args:
+        socket_path: Filesystem path of the Unix socket
+        endpoint_url: The endpoint URL for the Scarf API
+        **logger_options: Further ``ScarfEventLogger`` options; background
+            delivery is always enabled
+    """
+    logger = ScarfEventLogger(endpoint_url, background=True, **logger_options)
+    collector = ScarfCollector(socket_path, logger)
+
+    def stop(signum, frame):
+        collector._stopped.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    collector.serve_forever()
+    collector.close(timeout=logger.timeout)
+
+
+def spawn_collector(
+    socket_path: str,
+    endpoint_url: str,
+    startup_timeout: float = 5.0,
+    **logger_options: Any,
+) -> multiprocessing.Process:
+    """Start a collector in a child process and wait until it accepts connections.
+
+    Args:
+        socket_path: Filesystem path of the Unix socket
+        endpoint_url: The endpoint URL for the Scarf API
+        startup_timeout: Maximum number of seconds to wait for the socket (default: 5.0)
+        **logger_options: Further ``ScarfEventLogger`` options for the collector
+
+    Returns:
+        The collector process; terminate() it to flush and stop the collector
+
+    Raises:
+        RuntimeError: If the collector did not create its socket in time
+    """
+    try:
+        os.unlink(socket_path)  # so a stale socket isn't mistaken for the new one
+    except FileNotFoundError:
+        pass
+    process = multiprocessing.Process(
+        target=run_collector,
+        args=(socket_path, endpoint_url),
+        kwargs=logger_options,
+        name="scarf-collector",
+        daemon=True,
+    )
+    process.start()
+    deadline = time.monotonic() + startup_timeout
+    while not os.path.exists(socket_path):
+        if not process.is_alive() or time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError(f"Scarf collector did not start on {socket_path}")
+        time.sleep(0.01)
+    return process
@@ -0,0 +1,184 @@
+"""Runtime settings of a logger, resolved once and reloadable without a restart."""
+import json
+import os
+import signal
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .event_logger import ScarfEventLogger
+    from .sampling import Sampler
+
+# Keys of a config file, and the type of their values
+FILE_KEYS: Dict[str, Tuple[type, ...]] = {
+    'enabled': (bool,),
+    'verbose': (bool,),
+    'endpoint_url': (str,),
+    'timeout': (int, float),
+    'sampling': (dict,),
+}
+
+_TRUE = ('1', 'true')
+
+
+class Config:
+    """An immutable snapshot of the settings a logger reads for every event.
+
+    A logger holds one snapshot at a time and replaces it as a whole on
+    reload, so an event never sees half of an old and half of a new
+    configuration, and reading a setting costs one attribute lookup.
+    """
+
+    __slots__ = ('enabled', 'verbose', 'endpoint_url', 'timeout', 'sampler')
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        timeout: float,
+        verbose: bool = False,
+        enabled: bool = True,
+        sampler: Optional['Sampler'] = None,
+    ):
+        self.enabled = enabled
+        self.verbose = verbose
+        self.endpoint_url = endpoint_url
+        self.timeout = timeout
+        self.sampler = sampler
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'Config({fields})'
+
+    def replace(self, **changes: Any) -> 'Config':
+        """Return a copy of the snapshot with some settings changed."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Config(**values)
+
+
+def analytics_disabled(environ: Mapping[str, str] = os.environ) -> bool:
+    """Return True if DO_NOT_TRACK or SCARF_NO_ANALYTICS disables analytics."""
+    return (
+        environ.get('DO_NOT_TRACK', '').lower() in _TRUE or
+        environ.get('SCARF_NO_ANALYTICS', '').lower() in _TRUE
+    )
+
+
+def load_file(path: str) -> Dict[str, Any]:
+    """Read the settings in a JSON config file; a missing file holds none.
+
+    The file holds an object with any of the keys ``enabled``, ``verbose``,
+    ``endpoint_url``, ``timeout`` and ``sampling``, the latter holding
+    ``scarf.Sampler`` arguments, e.g.::
+
+        {"enabled": true, "timeout": 2.0, "sampling": {"rate": 0.1}}
+
+    Raises:
+        ValueError: If the file is not valid JSON, or holds an unknown key or
+            a value of the wrong type
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(settings, dict):
+        raise ValueError(f"config file {path} must hold a JSON object")
+    for key, value in settings.items():
+        types = FILE_KEYS.get(key)
+        if types is None:
+            raise ValueError(f"unknown key {key!r} in config file {path}")
+        if not isinstance(value, types) or (bool not in types and isinstance(value, bool)):
+            raise ValueError(f"invalid value for {key!r} in config file {path}: {value!r}")
+    return settings
+
+
+def resolve(
+    endpoint_url: str,
+    timeout: float,
+    verbose: Optional[bool],
+    sampler: Optional['Sampler'],
+    path: Optional[str] = None,
+) -> Config:
+    """Combine a logger's own settings with its config file and the environment.
+
+    Settings in the config file take precedence over the logger's own, so
+    operators can change them without touching code. DO_NOT_TRACK and
+    SCARF_NO_ANALYTICS always disable analytics, whatever the file says.
+    SCARF_VERBOSE applies when neither the logger nor the file sets ``verbose``.
+
+    Raises:
+        ValueError: If the config file is invalid
+    """
+    settings = load_file(path) if path is not None else {}
+    if 'verbose' in settings:
+        verbose = settings['verbose']
+    elif verbose is None:
+        verbose = os.environ.get('SCARF_VERBOSE', '').lower() in _TRUE
+    if 'sampling' in settings:
+        from .sampling import Sampler
+
+        try:
+            sampler = Sampler(**settings['sampling'])
+        except TypeError as e:
+            raise ValueError(f"invalid sampling settings in config file {path}: {e}") from e
+    return Config(
+        endpoint_url=settings.get('endpoint_url', endpoint_url).rstrip('/'),
+        timeout=settings.get('timeout', timeout),
+        verbose=verbose,
+        enabled=settings.get('enabled', True) and not analytics_disabled(),
+        sampler=sampler,
+    )
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Return what identifies a version of a file, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+_sighup_loggers: 'weakref.WeakSet[ScarfEventLogger]' = weakref.WeakSet()
+_previous_sighup_handler = None
+_sighup_installed = False
+
+
+def reload_on_sighup(logger: 'ScarfEventLogger') -> bool:
+    """Reload ``logger``'s configuration whenever the process receives SIGHUP.
+
+    Loggers are held weakly. The handler is installed on first use, from the
+    main thread only, and defers to the previous handler unless that was the
+    default one, which would terminate the process.
+
+    Returns:
+        True if the handler is installed
+    """
+    global _previous_sighup_handler, _sighup_installed
+    _sighup_loggers.add(logger)
+    if _sighup_installed:
+        return True
+    if not hasattr(signal, 'SIGHUP'):
+        return False  # Windows
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    _previous_sighup_handler = signal.signal(signal.SIGHUP, _on_sighup)
+    _sighup_installed = True
+    return True
+
+
+def reload_all() -> None:
+    """Reload every logger registered for SIGHUP, keeping the old configuration on errors."""
+    for logger in list(_sighup_loggers):
+        logger._reload_quietly()
+
+
+def _on_sighup(signum, frame) -> None:
+    # Reload off the signal handler: it may have interrupted the main thread
+    # while it held one of the locks a reload takes.
+    threading.Thread(target=reload_all, name="scarf-reload", daemon=True).start()
+    previous = _previous_sighup_handler
+    if callable(previous):
+        previous(signum, frame)
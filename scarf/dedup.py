@@ -0,0 +1,146 @@
+"""Suppression of repeated identical events within a time window."""
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Sequence
+
+_MAGIC = b'SCARFDD1'
+_ENTRY = struct.Struct('<16sd')  # digest, expiry as a Unix timestamp
+_DIGEST_SIZE = 16
+
+_canonical = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=repr).encode
+
+
+class DedupCache:
+    """Remember recently sent events and report repeats within ``ttl`` seconds.
+
+    Events are identified by a 128-bit BLAKE2b digest of their canonical JSON
+    (sorted keys, no whitespace), taken over all properties or only over
+    ``keys``. Digests are kept in a bounded LRU map: lookups take constant time
+    and, once ``max_entries`` is reached, the least recently seen event is
+    forgotten. An event is suppressed until ``ttl`` seconds after it was first
+    let through; it is then sent once more and the window starts again.
+
+    With a ``path``, the digests are loaded from that file on creation and
+    written back by ``save()``, which the logger calls on close and at exit, so
+    repeats are also suppressed across process restarts. The file holds 24 bytes per entry.
+    """
+
+    DEFAULT_TTL = 24 * 60 * 60.0  # 1 day
+    DEFAULT_MAX_ENTRIES = 10000
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        keys: Optional[Sequence[str]] = None,
+        path: Optional[str] = None,
+    ):
+        """Initialize the cache, loading the entries saved at ``path`` if it exists.
+
+        Args:
+            ttl: Number of seconds during which repeats of an event are suppressed
+                (optional, default: 1 day)
+            max_entries: Maximum number of events remembered (optional, default: 10000)
+            keys: Properties that identify an event; others are ignored when
+                comparing events (optional, default: all properties)
+            path: File in which entries are kept across processes (optional)
+
+        Raises:
+            ValueError: If ttl is not positive or max_entries is less than 1
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.keys = tuple(keys) if keys is not None else None
+        self.path = path
+        self._lock = threading.Lock()
+        # digest -> monotonic expiry time, least recently seen first
+        self._entries: 'OrderedDict[bytes, float]' = OrderedDict()
+        if path is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def digest(self, properties: Mapping[str, Any]) -> bytes:
+        """Return the digest identifying an event."""
+        if self.keys is not None:
+            properties = {key: properties[key] for key in self.keys if key in properties}
+        data = _canonical(properties).encode('utf-8')
+        return hashlib.blake2b(data, digest_size=_DIGEST_SIZE).digest()
+
+    def check(self, properties: Mapping[str, Any]) -> bool:
+        """Record an event and decide whether to send it.
+
+        Returns:
+            True if the event should be sent, False if it repeats an event
+            let through less than ``ttl`` seconds ago
+        """
+        digest = self.digest(properties)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries
+            expiry = entries.get(digest)
+            if expiry is not None and expiry > now:
+                entries.move_to_end(digest)
+                return False
+            entries[digest] = now + self.ttl
+            entries.move_to_end(digest)
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            return True
+
+    def forget(self, properties: Mapping[str, Any]) -> None:
+        """Forget an event, e.g. because sending it failed, so it is not suppressed."""
+        digest = self.digest(properties)
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def save(self) -> None:
+        """Write unexpired entries to ``path``, atomically replacing the file.
+
+        Does nothing without a path.
+        """
+        if self.path is None:
+            return
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            entries = [(d, e - now + wall) for d, e in self._entries.items() if e > now]
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(b''.join(_ENTRY.pack(digest, expiry) for digest, expiry in entries))
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        if not data.startswith(_MAGIC):
+            return  # not an index written by this class; it is replaced on save
+        now, wall = time.monotonic(), time.time()
+        body = memoryview(data)[len(_MAGIC):]
+        body = body[:len(body) - len(body) % _ENTRY.size]
+        for digest, expiry in _ENTRY.iter_unpack(body):
+            if expiry > wall:
+                self._entries[digest] = expiry - wall + now
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
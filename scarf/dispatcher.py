@@ -0,0 +1,496 @@
+"""Background delivery of telemetry events."""
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class _Shard:
+    """A buffer of submitted items with its own lock, shared by few threads."""
+
+    __slots__ = ('lock', 'items', 'sizes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items: Deque[Any] = deque()
+        self.sizes: Deque[int] = deque()
+
+
+class BackgroundDispatcher:
+    """A bounded in-memory queue drained by a background worker thread.
+
+    Items submitted to the dispatcher are handed to ``send`` on a daemon thread,
+    so the submitting thread never waits on network I/O. The queue holds at
+    most ``max_queue_size`` items and, with ``max_queue_bytes``, at most that
+    many bytes as measured by ``item_size``. Bytes are released once an item's
+    batch has been sent, so the budget also covers batches being sent.
+
+    What happens to an item that doesn't fit is up to ``overflow``:
+
+    - ``'drop_newest'`` (the default) drops the new item.
+    - ``'drop_oldest'`` evicts the oldest queued items to make room and passes
+      them to ``on_evict``.
+    - ``'block'`` makes ``submit`` wait up to ``block_timeout`` seconds for room,
+      then drops the new item.
+
+    Every dropped or evicted item is counted in ``dropped``.
+
+    ``send`` always receives a list of items. With ``batch_size`` greater than one
+    the worker collects up to that many items per call, waiting at most ``linger``
+    seconds after the first item arrives for the batch to fill up.
+
+    With ``concurrency`` greater than one, up to that many batches are sent at
+    once from separate worker threads, started as the queue backs up, and
+    ``send`` must be thread-safe. Batches then no longer arrive in submission
+    order. ``batch_size``, ``linger`` and ``concurrency`` may be changed while
+    the dispatcher runs, e.g. by ``scarf.adaptive.AdaptiveController``.
+
+    With ``shards`` greater than one, submitting threads don't share the queue's
+    lock. Each thread is assigned one of ``shards`` buffers, round robin, and
+    appends to it under that buffer's own lock; the workers merge the buffers
+    into the queue as they assemble batches. A thread whose buffer holds
+    SHARD_CAPACITY items moves them to the queue itself, and the overflow
+    policy applies then. Buffered items count towards ``len()`` but not the
+    queue's limits, so up to ``shards * SHARD_CAPACITY`` of them wait on top of
+    those. Items are still sent in order per thread, but not across threads.
+    """
+
+    DEFAULT_MAX_QUEUE_SIZE = 10000
+    DEFAULT_BLOCK_TIMEOUT = 0.1  # 100 milliseconds
+    SHARD_CAPACITY = 64  # items buffered per shard before they are moved to the queue
+
+    def __init__(
+        self,
+        send: Callable[[List[Any]], None],
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        batch_size: int = 1,
+        linger: float = 0.0,
+        concurrency: int = 1,
+        max_queue_bytes: Optional[int] = None,
+        item_size: Callable[[Any], int] = len,
+        overflow: str = DROP_NEWEST,
+        block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+        on_evict: Optional[Callable[[List[Any]], None]] = None,
+        shards: int = 1,
+    ):
+        """Initialize the dispatcher.
+
+        Args:
+            send: Callable invoked on the worker thread with each batch of queued items
+            max_queue_size: Maximum number of items waiting to be sent (default: 10000)
+            on_error: Optional callable invoked with any exception raised by ``send``
+            batch_size: Maximum number of items passed to a single ``send`` call (default: 1)
+            linger: Maximum number of seconds to wait for a batch to fill up (default: 0)
+            concurrency: Maximum number of batches being sent at once (default: 1)
+            max_queue_bytes: Maximum total size of the items queued or being sent
+                (optional, default: no limit)
+            item_size: Callable returning the size of an item in bytes (default: len)
+            overflow: What to do with an item that doesn't fit: 'drop_newest',
+                'drop_oldest' or 'block' (default: 'drop_newest')
+            block_timeout: Maximum number of seconds ``submit`` waits for room with
+                the 'block' policy (default: 0.1)
+            on_evict: Optional callable invoked with the items evicted by the
+                'drop_oldest' policy, on the submitting thread
+            shards: Number of buffers submitting threads write to instead of
+                the queue itself; 1 submits to the queue directly (default: 1)
+
+        Raises:
+            ValueError: If max_queue_size, max_queue_bytes, batch_size,
+                concurrency or shards is less than 1, linger or block_timeout
+                is negative, or overflow is not a known policy
+        """
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if linger < 0:
+            raise ValueError("linger must not be negative")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if max_queue_bytes is not None and max_queue_bytes < 1:
+            raise ValueError("max_queue_bytes must be at least 1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        if block_timeout < 0:
+            raise ValueError("block_timeout must not be negative")
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+
+        self.max_queue_size = max_queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.linger = linger
+        self.concurrency = concurrency
+        self.dropped = 0
+        self._send = send
+        self._on_error = on_error
+        self._on_evict = on_evict
+        self._item_size = item_size
+        self._queue: Deque[Any] = deque()
+        self._sizes: Deque[int] = deque()  # size of each queued item, with a byte budget
+        self._queued_bytes = 0
+        self._sending_bytes = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0  # items handed to send and not yet done
+        self._sending = 0  # send calls in progress
+        self._flush_waiters = 0
+        self._waiting = 0  # workers waiting for items, which submitters to shards wake
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        self._shards: List[_Shard] = [_Shard() for _ in range(shards)] if shards > 1 else []
+        self._local = threading.local()  # the shard of each submitting thread
+        self._next_shard = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._queue) + self._buffered()
+
+    @property
+    def queued_bytes(self) -> int:
+        """Total size of the items queued or being sent; 0 without a byte budget."""
+        return self._queued_bytes + self._sending_bytes
+
+    def submit(self, item: Any) -> bool:
+        """Queue an item for delivery.
+
+        Never blocks unless the overflow policy is 'block' and the queue is full.
+
+        Returns:
+            True if the item was queued, False if it was dropped because it
+            doesn't fit in the queue or the dispatcher has been closed
+        """
+        size = self._item_size(item) if self.max_queue_bytes is not None else 0
+        if self._shards:
+            return self._submit_to_shard(item, size)
+        evicted: List[Any] = []
+        with self._lock:
+            if not self._fits(size) and not self._closed:
+                if self.overflow == DROP_OLDEST:
+                    evicted = self._evict(size)
+                elif self.overflow == BLOCK:
+                    self._wait_for_room(size, time.monotonic() + self.block_timeout)
+            if self._closed or not self._fits(size):
+                self.dropped += 1
+                return False
+            self._queue.append(item)
+            if self.max_queue_bytes is not None:
+                self._sizes.append(size)
+                self._queued_bytes += size
+            self._wake_worker()
+        if evicted and self._on_evict is not None:
+            self._on_evict(evicted)
+        return True
+
+    def _submit_to_shard(self, item: Any, size: int) -> bool:
+        # Locks are taken in one order: the queue's lock, then a shard's.
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._local.shard = self._shards[next(self._next_shard) % len(self._shards)]
+        max_bytes = self.max_queue_bytes
+        evicted: List[Any] = []
+        accepted = wake = handed_off = False
+        # An item that would never fit is dropped; it would hold up the shard for good.
+        if max_bytes is None or size <= max_bytes:
+            while True:
+                with shard.lock:
+                    if self._closed:
+                        break
+                    items = shard.items
+                    if len(items) < self.SHARD_CAPACITY:
+                        items.append(item)
+                        if max_bytes is not None:
+                            shard.sizes.append(size)
+                        accepted = True
+                        # The first item since the workers last looked wakes one up.
+                        wake = len(items) == 1 and (self._waiting > 0 or not self._threads)
+                        break
+                if handed_off:
+                    break
+                evicted = self._hand_off(shard)
+                handed_off = True
+        if wake or not accepted:
+            with self._lock:
+                if accepted:
+                    self._wake_worker()
+                else:
+                    self.dropped += 1
+        if evicted and self._on_evict is not None:
+            self._on_evict(evicted)
+        return accepted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued item has been handed to ``send``.
+
+        Args:
+            timeout: Maximum number of seconds to wait (optional, default: wait forever)
+
+        Returns:
+            True if the queue was drained, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            # Tell lingering workers to send what they have instead of waiting.
+            self._flush_waiters += 1
+            self._not_empty.notify_all()
+            try:
+                while self._queue or self._in_flight or self._buffered():
+                    if deadline is None:
+                        self._idle.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._idle.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting items, drain the queue and stop the worker thread.
+
+        Args:
+            timeout: Maximum number of seconds to wait for the queue to drain
+                (optional, default: wait forever)
+
+        Returns:
+            True if every queued item was delivered, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        while True:
+            # Workers may still start more workers while they drain the queue.
+            with self._lock:
+                threads = [thread for thread in self._threads if thread.is_alive()]
+            if not threads:
+                break
+            for thread in threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        with self._lock:
+            return not self._queue and not self._in_flight and not self._buffered()
+
+    def drain_pending(self) -> List[Any]:
+        """Remove and return every item still waiting in the queue."""
+        with self._lock:
+            items = list(self._queue)
+            for shard in self._shards:
+                with shard.lock:
+                    items.extend(shard.items)
+                    shard.items.clear()
+                    shard.sizes.clear()
+            self._queue.clear()
+            self._sizes.clear()
+            self._queued_bytes = 0
+            self._not_full.notify_all()
+            if not self._in_flight:
+                self._idle.notify_all()
+        return items
+
+    def _after_fork_in_child(self) -> None:
+        """Start over with an empty queue; the parent still delivers what it queued."""
+        self._queue.clear()
+        self._sizes.clear()
+        self._queued_bytes = 0
+        self._sending_bytes = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._sending = 0
+        self._flush_waiters = 0
+        self._waiting = 0
+        self._threads = []
+        self._shards = [_Shard() for _ in self._shards]
+        self._local = threading.local()
+
+    def _start_worker(self) -> None:
+        # Called with the lock held.
+        thread = threading.Thread(target=self._run, name="scarf-dispatcher", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                # Workers beyond the current concurrency wait until it rises again.
+                while True:
+                    # Registered as waiting before looking at the shards, so an
+                    # item buffered after this look wakes the worker up.
+                    self._waiting += 1
+                    try:
+                        self._collect()
+                        if self._queue and self._sending < self.concurrency:
+                            break
+                        if self._closed and not self._queue and not self._buffered():
+                            return
+                        self._not_empty.wait()
+                    finally:
+                        self._waiting -= 1
+                if self.linger and len(self._queue) < self.batch_size:
+                    self._wait_for_batch()
+                    self._collect()
+                    if not self._queue:
+                        continue  # another worker took the items
+                count = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(count)]
+                size = 0
+                if self._sizes:
+                    size = sum([self._sizes.popleft() for _ in range(count)])
+                    self._queued_bytes -= size
+                    self._sending_bytes += size
+                self._not_full.notify_all()
+                self._in_flight += count
+                self._sending += 1
+                if self._queue and len(self._threads) < self.concurrency:
+                    self._start_worker()
+            try:
+                self._send(batch)
+            except Exception as e:
+                if self._on_error is not None:
+                    self._on_error(e)
+            finally:
+                with self._lock:
+                    self._in_flight -= count
+                    self._sending -= 1
+                    if size:
+                        self._sending_bytes -= size
+                        self._not_full.notify_all()
+                    buffered = self._buffered()
+                    if not self._queue and not self._in_flight and not buffered:
+                        self._idle.notify_all()
+                    elif self._queue or buffered:
+                        self._not_empty.notify()
+
+    def _wait_for_batch(self) -> None:
+        # Called with the lock held and at least one item queued.
+        # Submitters to shards don't wake lingering workers, so buffered items
+        # join the batch when it is full or the linger time is up.
+        deadline = time.monotonic() + self.linger
+        while (
+            len(self._queue) + self._buffered() < self.batch_size
+            and not self._closed
+            and not self._flush_waiters
+        ):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._not_empty.wait(remaining)
+
+    def _wake_worker(self) -> None:
+        # Called with the lock held.
+        if len(self._threads) < min(self.concurrency, self._sending + 1):
+            self._start_worker()
+        self._not_empty.notify()
+
+    def _buffered(self) -> int:
+        """Number of items waiting in shards."""
+        return sum([len(shard.items) for shard in self._shards]) if self._shards else 0
+
+    def _collect(self) -> None:
+        # Called with the lock held.
+        for shard in self._shards:
+            if shard.items:
+                self._drain_shard(shard)
+
+    def _drain_shard(self, shard: _Shard) -> Optional[int]:
+        # Called with the lock held. Moves the shard's items to the queue, in
+        # order, until one doesn't fit, and returns the size of that one.
+        with shard.lock:
+            items, sizes = shard.items, shard.sizes
+            if len(self._queue) + len(items) <= self.max_queue_size:
+                size = sum(sizes)
+                max_bytes = self.max_queue_bytes
+                used = self._queued_bytes + self._sending_bytes
+                if max_bytes is None or used + size <= max_bytes:
+                    self._queue.extend(items)
+                    items.clear()
+                    if sizes:
+                        self._sizes.extend(sizes)
+                        self._queued_bytes += size
+                        sizes.clear()
+                    return None
+            while items:
+                size = sizes[0] if sizes else 0
+                if not self._fits(size):
+                    return size
+                self._queue.append(items.popleft())
+                if sizes:
+                    self._sizes.append(sizes.popleft())
+                    self._queued_bytes += size
+        return None
+
+    def _hand_off(self, shard: _Shard) -> List[Any]:
+        """Move the items of a full shard to the queue, applying the overflow policy.
+
+        Returns:
+            The queued items evicted to make room
+        """
+        evicted: List[Any] = []
+        deadline = time.monotonic() + self.block_timeout
+        with self._lock:
+            while not self._closed:
+                size = self._drain_shard(shard)
+                if size is None:
+                    break
+                if self.overflow == DROP_OLDEST:
+                    more = self._evict(size)
+                    if not more:
+                        break
+                    evicted.extend(more)
+                elif self.overflow == BLOCK:
+                    self._wait_for_room(size, deadline)
+                    if not self._fits(size):
+                        break
+                else:
+                    break
+            self._wake_worker()
+        return evicted
+
+    def _fits(self, size: int) -> bool:
+        # Called with the lock held.
+        if len(self._queue) >= self.max_queue_size:
+            return False
+        max_bytes = self.max_queue_bytes
+        return max_bytes is None or self._queued_bytes + self._sending_bytes + size <= max_bytes
+
+    def _evict(self, size: int) -> List[Any]:
+        # Called with the lock held. Batches being sent can't be evicted, so
+        # an item that wouldn't fit even in an empty queue is dropped instead.
+        max_bytes = self.max_queue_bytes
+        if max_bytes is not None and self._sending_bytes + size > max_bytes:
+            return []
+        evicted = []
+        while self._queue and not self._fits(size):
+            evicted.append(self._queue.popleft())
+            if self._sizes:
+                self._queued_bytes -= self._sizes.popleft()
+        self.dropped += len(evicted)
+        return evicted
+
+    def _wait_for_room(self, size: int, deadline: float) -> None:
+        # Called with the lock held.
+        max_bytes = self.max_queue_bytes
+        if max_bytes is not None and size > max_bytes:
+            return  # it never will fit
+        while not self._closed and not self._fits(size):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._not_full.wait(remaining)
@@ -1,22 +1,187 @@
-import os
+import functools
+import threading
 import time
-from typing import Any, Dict, Optional
-
-import requests
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
+from . import fork, shutdown
+from .config import Config, analytics_disabled, file_signature, reload_on_sighup, resolve
+from .dispatcher import DROP_NEWEST, OVERFLOW_POLICIES, BackgroundDispatcher
+from .exceptions import CircuitOpenError
+from .metrics import (
+    DROP_CLOSED,
+    DROP_COLLECTOR_UNAVAILABLE,
+    DROP_EVICTED,
+    DROP_QUEUE_FULL,
+    DROP_SEND_FAILED,
+    DROP_SHUTDOWN,
+    ClientMetrics,
+)
+from .retry import is_transient
+from .serialization import EventEncoder, gzip_compress
+from .timing import Timer
+from .transport import RequestsTransport
 from .version import __version__
 
+# Imported lazily so that `import scarf` stays cheap; see benchmarks/import_time.py
+if TYPE_CHECKING:
+    import socket
+
+    import requests
+
+    from .adaptive import AdaptiveController
+    from .aggregation import EventAggregator
+    from .dedup import DedupCache
+    from .guard import PayloadGuard
+    from .metrics import Hooks
+    from .retry import CircuitBreaker, RetryPolicy
+    from .sampling import Sampler
+    from .spool import DiskSpool
+    from .transport import Transport
+
+T = TypeVar('T')
+
+SPILL = 'spill'
+
+
+class QueuedEvent:
+    """An event waiting in the background queue, already encoded."""
+
+    __slots__ = ('record', 'timeout')
+
+    # Approximate memory taken by a queued event besides its encoded bytes:
+    # this object, the bytes object header and the queue entries.
+    OVERHEAD = 128
+
+    def __init__(self, record: bytes, timeout: Optional[float]):
+        self.record = record
+        self.timeout = timeout
+
+    def size(self) -> int:
+        return len(self.record) + self.OVERHEAD
+
+
+def _setting(name: str, doc: str) -> property:
+    """A logger attribute kept in its configuration snapshot."""
+    def get(self):
+        return getattr(self.config, name)
+
+    def set(self, value):
+        self._set(name, value)
+
+    return property(get, set, doc=doc)
+
+
+@functools.lru_cache(maxsize=None)
+def build_user_agent() -> str:
+    """Build the extended User-Agent with platform, arch, and Python version.
+
+    Computed once per process and shared by every logger.
+    """
+    try:
+        import platform as _platform
+        import sys as _sys
+
+        system = _platform.system()
+        if system == 'Darwin':
+            platform_name = 'macOS'
+        elif system == 'Linux':
+            platform_name = 'linux'
+        elif system == 'Windows':
+            platform_name = 'windows'
+        else:
+            platform_name = system.lower() or 'unknown'
+
+        arch = _platform.machine() or 'unknown'
+        pyver = _platform.python_version() if hasattr(_platform, 'python_version') else (
+            f"{_sys.version_info.major}.{_sys.version_info.minor}.{_sys.version_info.micro}"
+        )
+
+        extra = f" (platform={platform_name}; arch={arch}; python={pyver})"
+    except Exception:
+        # In case of any unexpected failure retrieving platform info,
+        # fall back to just the base user agent string.
+        extra = ""
+
+    return f'scarf-py/{__version__}' + extra
+
 
 class ScarfEventLogger:
-    """A client for sending telemetry events to Scarf."""
+    """A client for sending telemetry events to Scarf.
+
+    The endpoint, timeout, verbosity, sampler and whether analytics are enabled
+    at all are kept in a ``scarf.config.Config`` snapshot, resolved from the
+    constructor arguments, an optional config file and the environment when
+    the logger is created and again on ``reload()``. While analytics are
+    disabled, logging an event costs little more than a method call.
+
+    A logger is thread-safe and meant to be shared. In background mode only
+    the worker threads send, and with ``shards`` the threads logging events
+    don't contend for the queue's lock either.
+
+    Loggers survive ``os.fork()``: the child gets a fresh connection pool,
+    an empty queue and its own worker thread, while events queued before the
+    fork are delivered by the parent. A spool stays with the parent process.
+    """
 
     DEFAULT_TIMEOUT = 3.0  # 3 seconds
+    DEFAULT_BATCH_MAX_BYTES = 1024 * 1024  # 1 MiB of uncompressed NDJSON
+    DEFAULT_MAX_QUEUE_BYTES = 8 * 1024 * 1024  # 8 MiB
+    DEFAULT_LINGER = 1.0  # 1 second
+    GZIP_LEVEL = 6
+    SPOOL_REPLAY_INTERVAL = 5.0  # 5 seconds
+    COLLECTOR_SEND_TIMEOUT = 0.05  # 50 milliseconds
+    DEFAULT_SHUTDOWN_TIMEOUT = 0.2  # 200 milliseconds
+    SHUTDOWN_CONCURRENCY = 8  # requests sent at once by shutdown()
+
+    endpoint_url = _setting('endpoint_url', "The endpoint URL for the Scarf API.")
+    timeout = _setting('timeout', "Default timeout in seconds for API calls.")
+    verbose = _setting('verbose', "Whether verbose logging is enabled.")
+    sampler = _setting('sampler', "Sampling and rate limiting applied to events, if any.")
 
     def __init__(
         self,
         endpoint_url: str,
         timeout: Optional[float] = None,
         verbose: Optional[bool] = None,
+        background: bool = False,
+        max_queue_size: int = BackgroundDispatcher.DEFAULT_MAX_QUEUE_SIZE,
+        batch_size: int = 1,
+        batch_max_bytes: int = DEFAULT_BATCH_MAX_BYTES,
+        linger: float = DEFAULT_LINGER,
+        compress: bool = True,
+        spool: Optional['DiskSpool'] = None,
+        retry_policy: Optional['RetryPolicy'] = None,
+        circuit_breaker: Optional['CircuitBreaker'] = None,
+        sampler: Optional['Sampler'] = None,
+        collector_socket: Optional[str] = None,
+        transport: Optional['Transport'] = None,
+        static_properties: Optional[Dict[str, Any]] = None,
+        hooks: Optional['Hooks'] = None,
+        shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+        handle_sigterm: bool = False,
+        dedup: Optional['DedupCache'] = None,
+        adaptive: Optional['AdaptiveController'] = None,
+        max_queue_bytes: Optional[int] = DEFAULT_MAX_QUEUE_BYTES,
+        overflow: Optional[str] = None,
+        block_timeout: float = BackgroundDispatcher.DEFAULT_BLOCK_TIMEOUT,
+        config_path: Optional[str] = None,
+        watch_interval: Optional[float] = None,
+        handle_sighup: bool = False,
+        guard: Optional['PayloadGuard'] = None,
+        shards: int = 1,
     ):
         """Initialize the Scarf event logger.
 
@@ -24,70 +189,281 @@ class ScarfEventLogger:
             endpoint_url: The endpoint URL for the Scarf API
             timeout: Default timeout in seconds for API calls (optional, default: 3.0)
             verbose: Enable verbose logging (optional, defaults to SCARF_VERBOSE env var)
+            background: Queue events and send them from a background thread instead
+                of blocking the caller (optional, default: False)
+            max_queue_size: Maximum number of events waiting to be sent in background
+                mode (optional, default: 10000)
+            batch_size: Maximum number of events sent in one request in background
+                mode; values above 1 enable batching (optional, default: 1)
+            batch_max_bytes: Maximum uncompressed size in bytes of a batched request
+                body (optional, default: 1 MiB)
+            linger: Maximum number of seconds a partial batch waits for more events
+                before it is sent (optional, default: 1.0)
+            compress: Gzip batched request bodies (optional, default: True)
+            spool: Disk spool that keeps events which failed to send or overflowed
+                the queue, and replays them from a background thread every
+                SPOOL_REPLAY_INTERVAL seconds (optional, requires background mode)
+            retry_policy: Policy for retrying transient failures with backoff
+                (optional, default: no retries)
+            circuit_breaker: Breaker that fails sends immediately while the endpoint
+                keeps failing (optional, default: none)
+            sampler: Sampling and rate limiting applied before an event is encoded
+                or queued (optional, default: send every event)
+            collector_socket: Path of a ``scarf.collector.ScarfCollector`` socket.
+                Events are handed to that local process, which sends them on,
+                instead of being sent over HTTP by this one (optional)
+            transport: ``scarf.transport.Transport`` that performs the HTTP requests
+                (optional, default: a ``RequestsTransport``)
+            static_properties: Properties added to every event, such as an app
+                name or SDK version. They are encoded once, up front; properties
+                of an event override them (optional)
+            hooks: ``scarf.metrics.Hooks`` called before and after each request
+                and when events are dropped, e.g. to export metrics (optional)
+            shutdown_timeout: Time budget in seconds of ``shutdown()``, which runs
+                at exit and when leaving a ``with`` block (optional, default: 0.2)
+            handle_sigterm: Also run ``shutdown()`` on SIGTERM before the previous
+                SIGTERM handler; takes effect when created on the main thread
+                (optional, default: False)
+            dedup: ``scarf.dedup.DedupCache`` that suppresses repeats of identical
+                events, checked after sampling (optional, default: send every event)
+            adaptive: ``scarf.adaptive.AdaptiveController`` that tunes the batch
+                size, linger and number of requests in flight from the latency
+                and errors of each request. Queued events are always sent as
+                NDJSON batches (optional, requires background mode)
+            max_queue_bytes: Memory in bytes that events queued or being sent in
+                background mode may take, or None for no limit (optional,
+                default: 8 MiB)
+            overflow: What happens to an event that doesn't fit in the queue:
+                'drop_newest' drops it, 'drop_oldest' drops the oldest queued
+                events to make room, 'block' waits up to ``block_timeout`` for
+                room and then drops it, and 'spill' writes it to the spool
+                (optional, default: 'spill' with a spool, 'drop_newest' otherwise)
+            block_timeout: Maximum number of seconds ``log_event`` waits for room
+                in the queue with the 'block' policy (optional, default: 0.1)
+            config_path: JSON file whose settings override ``enabled``,
+                ``verbose``, ``endpoint_url``, ``timeout`` and the sampler; see
+                ``scarf.config.load_file``. A missing file overrides nothing
+                (optional)
+            watch_interval: Check ``config_path`` for changes every this many
+                seconds and reload when it changes (optional, default: only
+                on ``reload()``)
+            handle_sighup: Reload on SIGHUP; takes effect when created on the
+                main thread (optional, default: False)
+            guard: ``scarf.guard.PayloadGuard`` that truncates or rejects events
+                over its depth, key count, string length and size limits before
+                they are queued or sent (optional, default: no limits)
+            shards: Number of buffers that logging threads append events to in
+                background mode, each under its own lock, before the workers
+                merge them into the queue. Raise it to about the number of
+                cores when many threads log at once (optional, default: 1,
+                events go straight to the queue)
 
         Raises:
-            ValueError: If endpoint_url is not provided or is empty
+            ValueError: If endpoint_url is not provided or is empty, if batching,
+                shards, a spool or an adaptive controller is requested without background
+                mode, if collector_socket is combined with background mode, or if
+                overflow is not a known policy or is 'spill' without a spool,
+                if watch_interval is not positive or given without config_path,
+                or if the config file is invalid
         """
         if not endpoint_url:
             raise ValueError("endpoint_url must be provided")
+        if batch_size > 1 and not background:
+            raise ValueError("batch_size requires background=True")
+        if shards > 1 and not background:
+            raise ValueError("shards requires background=True")
+        if spool is not None and not background:
+            raise ValueError("spool requires background=True")
+        if adaptive is not None and not background:
+            raise ValueError("adaptive requires background=True")
+        if collector_socket is not None and background:
+            raise ValueError("collector_socket cannot be combined with background=True")
+        if shutdown_timeout < 0:
+            raise ValueError("shutdown_timeout must not be negative")
+        if overflow is None:
+            overflow = SPILL if spool is not None else DROP_NEWEST
+        if overflow not in (*OVERFLOW_POLICIES, SPILL):
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, {SPILL}")
+        if overflow == SPILL and spool is None:
+            raise ValueError("overflow='spill' requires a spool")
+        if watch_interval is not None and config_path is None:
+            raise ValueError("watch_interval requires config_path")
+        if watch_interval is not None and watch_interval <= 0:
+            raise ValueError("watch_interval must be positive")
 
-        self.endpoint_url = endpoint_url.rstrip('/')
-        self.timeout = timeout if timeout is not None else self.DEFAULT_TIMEOUT
-        self.verbose = (
-            verbose if verbose is not None
-            else os.environ.get('SCARF_VERBOSE', '').lower() in ('1', 'true')
-        )
-        self.session = requests.Session()
-        # Build extended User-Agent with platform, arch, and Python version
-        try:
-            import platform as _platform
-            import sys as _sys
-
-            system = _platform.system()
-            if system == 'Darwin':
-                platform_name = 'macOS'
-            elif system == 'Linux':
-                platform_name = 'linux'
-            elif system == 'Windows':
-                platform_name = 'windows'
-            else:
-                platform_name = system.lower() or 'unknown'
+        # The logger's own settings, which reloads start from.
+        self._settings: Dict[str, Any] = {
+            'endpoint_url': endpoint_url,
+            'timeout': timeout if timeout is not None else self.DEFAULT_TIMEOUT,
+            'verbose': verbose,
+            'sampler': sampler,
+        }
+        self.config_path = config_path
+        self._config_signature = file_signature(config_path) if config_path else None
+        self.config: Config = resolve(**self._settings, path=config_path)
+        self._reload_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.batch_max_bytes = batch_max_bytes
+        self.compress = compress
+        self.spool = spool
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.dedup = dedup
+        self.adaptive = adaptive
+        self.overflow = overflow
+        self.guard = guard
+        self.collector_socket = collector_socket
+        self._collector: Optional['socket.socket'] = None
+        self._collector_lock = threading.Lock()
+        self.user_agent = build_user_agent()
+        self.transport = transport if transport is not None else RequestsTransport(self.user_agent)
+        self.encoder = EventEncoder(static_properties)
+        self.hooks = hooks
+        self.metrics = ClientMetrics()
+        self.shutdown_timeout = shutdown_timeout
+        self._json_headers = {'User-Agent': self.user_agent, 'Content-Type': 'application/json'}
 
-            arch = _platform.machine() or 'unknown'
-            pyver = _platform.python_version() if hasattr(_platform, 'python_version') else (
-                f"{_sys.version_info.major}.{_sys.version_info.minor}.{_sys.version_info.micro}"
+        self._dispatcher: Optional[BackgroundDispatcher] = None
+        if background:
+            self._dispatcher = BackgroundDispatcher(
+                self._send_queued,
+                max_queue_size=max_queue_size,
+                batch_size=batch_size,
+                linger=linger,
+                max_queue_bytes=max_queue_bytes,
+                item_size=QueuedEvent.size,
+                overflow=DROP_NEWEST if overflow == SPILL else overflow,
+                block_timeout=block_timeout,
+                on_evict=self._evicted,
+                shards=shards,
             )
+            if adaptive is not None:
+                adaptive.attach(self._dispatcher)
 
-            extra = f" (platform={platform_name}; arch={arch}; python={pyver})"
-        except Exception:
-            # In case of any unexpected failure retrieving platform info,
-            # fall back to just the base user agent string.
-            extra = ""
+        self._closed = threading.Event()
+        self._replayer: Optional[threading.Thread] = None
+        if spool is not None:
+            self._replayer = threading.Thread(
+                target=self._replay_spool_periodically, name="scarf-spool", daemon=True
+            )
+            self._replayer.start()
 
-        self.session.headers.update({
-            'User-Agent': f'scarf-py/{__version__}' + extra
-        })
+        self._watch_interval = watch_interval
+        self._watcher: Optional[threading.Thread] = None
+        if watch_interval is not None:
+            self._start_watcher()
+        if handle_sighup:
+            reload_on_sighup(self)
+
+        fork.register(self)
+        # A dedup index is only written on close, so it needs the exit hook too.
+        if background or handle_sigterm or (dedup is not None and dedup.path is not None):
+            shutdown.register(self, handle_sigterm)
 
         if self.verbose:
             print("Scarf Logger Configuration:")
             print(f"  Endpoint URL: {self.endpoint_url}")
             print(f"  Timeout: {self.timeout}s")
-            print(f"  User-Agent: {self.session.headers['User-Agent']}")
+            if config_path is not None:
+                print(f"  Config file: {config_path} (watch_interval={watch_interval})")
+            if not self.config.enabled:
+                print("  Analytics: disabled")
+            print(f"  User-Agent: {self.user_agent}")
+            print(f"  Transport: {type(self.transport).__name__}")
+            print(f"  JSON encoder: {self.encoder.backend}")
+            if background:
+                print(
+                    f"  Background delivery: max_queue_size={max_queue_size}, "
+                    f"max_queue_bytes={max_queue_bytes}, overflow={overflow}, "
+                    f"shards={shards}"
+                )
+            if batch_size > 1:
+                print(
+                    f"  Batching: batch_size={batch_size}, "
+                    f"batch_max_bytes={batch_max_bytes}, linger={linger}s, "
+                    f"compress={compress}"
+                )
+            if spool is not None:
+                print(f"  Spool: {spool.directory} (max {spool.max_bytes} bytes)")
+            if collector_socket is not None:
+                print(f"  Collector socket: {collector_socket}")
+            if dedup is not None:
+                print(f"  Dedup: ttl={dedup.ttl}s, max_entries={dedup.max_entries}")
+            if adaptive is not None:
+                print(
+                    f"  Adaptive: batch_size={adaptive.min_batch_size}-{adaptive.max_batch_size}, "
+                    f"linger={adaptive.min_linger}-{adaptive.max_linger}s, "
+                    f"concurrency={adaptive.min_concurrency}-{adaptive.max_concurrency}"
+                )
+
+    @property
+    def session(self) -> 'requests.Session':
+        """The requests session used to send events, created on first use.
+
+        Only available with a ``RequestsTransport``.
+        """
+        return self.transport.session
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the logger's counters.
+
+        Counts are totals since the logger was created (or since a fork, in the
+        child): events sent, failed, dropped, sampled out, deduplicated,
+        truncated or rejected by the payload guard, spooled and forwarded to a
+        collector, requests sent and failed, retries, and bytes sent. Also
+        included are the current ``in_flight`` requests, ``queue_depth``,
+        ``queue_bytes`` and ``spool_bytes``, and a ``send_latency`` histogram in
+        seconds with cumulative bucket counts keyed by upper bound. With an
+        adaptive controller, ``adaptive`` holds its current decisions.
+        """
+        stats = self.metrics.snapshot()
+        dispatcher = self._dispatcher
+        stats['queue_depth'] = len(dispatcher) if dispatcher is not None else 0
+        stats['queue_bytes'] = dispatcher.queued_bytes if dispatcher is not None else 0
+        stats['spool_bytes'] = self.spool.size if self.spool is not None else 0
+        if self.adaptive is not None:
+            stats['adaptive'] = self.adaptive.state()
+        return stats
+
+    def __enter__(self) -> 'ScarfEventLogger':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
 
     @staticmethod
     def _check_do_not_track() -> bool:
         """Check if analytics are disabled via environment variables.
 
+        Loggers check this when their configuration is resolved, not per event.
+
         Returns:
             bool: True if analytics should be disabled, False otherwise
         """
-        dnt = os.environ.get('DO_NOT_TRACK', '').lower()
-        scarf_no_analytics = os.environ.get('SCARF_NO_ANALYTICS', '').lower()
+        return analytics_disabled()
 
-        return (
-            dnt in ('1', 'true') or
-            scarf_no_analytics in ('1', 'true')
-        )
+    def reload(self) -> Config:
+        """Resolve the configuration again and swap it in.
+
+        Picks up changes to the config file and to the DO_NOT_TRACK,
+        SCARF_NO_ANALYTICS and SCARF_VERBOSE environment variables. Events
+        logged concurrently see either the old or the new configuration.
+
+        Returns:
+            The new configuration
+
+        Raises:
+            ValueError: If the config file is invalid; the current
+                configuration stays in place
+        """
+        with self._reload_lock:
+            if self.config_path is not None:
+                self._config_signature = file_signature(self.config_path)
+            config = resolve(**self._settings, path=self.config_path)
+            self.config = config
+        if config.verbose:
+            print(f"\nReloaded configuration: {config}")
+        return config
 
     def log_event(
         self,
@@ -104,29 +480,655 @@ class ScarfEventLogger:
                 Overrides the default timeout set in the constructor.
 
         Returns:
-            True if the event was sent successfully, False if analytics are disabled
+            True if the event was sent successfully, False if analytics are disabled,
+            the sampler or dedup cache dropped the event or the payload guard
+            rejected it. In background mode, True means the
+            event was queued (or spooled to disk when the queue is full, depending on
+            ``overflow``) and False that it was dropped because the queue is full or
+            the logger has been closed.
+            With a collector socket, True means the collector accepted the event.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails or times out,
+                after any retries allowed by the retry policy. Transports other
+                than ``RequestsTransport`` raise ``TransportError`` instead.
+            CircuitOpenError: If the circuit breaker is open.
+            Neither is raised in background mode, where failures are only reported
+            in verbose output or spooled.
+            TypeError: If properties is not JSON-serializable; in background mode
+                too, where events are encoded before they are queued.
+            ValueError: If properties hold NaN or Infinity, which JSON can't
+                represent; in background mode too.
+        """
+        config = self.config
+        if not config.enabled:
+            if config.verbose:
+                print("Analytics are disabled")
+            return False
+
+        sampler = config.sampler
+        if sampler is not None:
+            properties = sampler.apply(properties)
+            if properties is None:
+                self.metrics.add('events_sampled_out')
+                return False
+
+        return self._log_sampled(properties, timeout)
+
+    def log_events(
+        self,
+        events: Sequence[Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Log several telemetry events to Scarf in batched requests.
+
+        Events are encoded as newline-delimited JSON and sent in as few requests
+        as ``batch_max_bytes`` allows, gzip-compressed unless ``compress`` is False.
+        The endpoint must accept batched NDJSON bodies.
+
+        Args:
+            events: JSON-serializable property dictionaries, one per event
+            timeout: Optional timeout in seconds for each request.
+                Overrides the default timeout set in the constructor.
+
+        Returns:
+            True if the events were sent successfully (including when the sampler
+            or dedup cache dropped all of them), False if analytics are disabled
 
         Raises:
-            requests.exceptions.RequestException: If the request fails or times out
+            requests.exceptions.RequestException: If a request fails or times out,
+                after any retries allowed by the retry policy (``TransportError``
+                with transports other than ``RequestsTransport``)
+            CircuitOpenError: If the circuit breaker is open
+        """
+        config = self.config
+        if not config.enabled:
+            if config.verbose:
+                print("Analytics are disabled")
+            return False
+
+        sampler = config.sampler
+        if sampler is not None:
+            sampled = [p for p in map(sampler.apply, events) if p is not None]
+            if len(sampled) < len(events):
+                self.metrics.add('events_sampled_out', len(events) - len(sampled))
+            events = sampled
+
+        # Encoded before the dedup check, as in log_event, so events the guard
+        # rejects aren't recorded as seen.
+        if self.guard is None:
+            records = [self.encoder.encode(properties) for properties in events]
+        else:
+            encoded = list(map(self._encode, events))
+            events = [p for p, record in zip(events, encoded) if record is not None]
+            records = [record for record in encoded if record is not None]
+
+        dedup = self.dedup
+        if dedup is not None:
+            unique = [i for i, properties in enumerate(events) if dedup.check(properties)]
+            if len(unique) < len(events):
+                self.metrics.add('events_deduplicated', len(events) - len(unique))
+                events = [events[i] for i in unique]
+                records = [records[i] for i in unique]
+
+        sent = 0
+        try:
+            for chunk in self._chunk_records(records):
+                self._send_records(chunk, timeout)
+                sent += len(chunk)
+        except Exception:
+            if dedup is not None:
+                for properties in events[sent:]:
+                    dedup.forget(properties)  # let a retry through
+            raise
+        return True
+
+    def timed(
+        self,
+        name: str,
+        aggregator: Optional['EventAggregator'] = None,
+        **properties: Any,
+    ) -> Timer:
+        """Time a block or function and log its duration.
+
+        Usable as a decorator of plain and ``async`` functions, and as a
+        context manager with ``with`` and ``async with``. Each timed call logs
+        ``{'event': name, **properties, 'duration_ms': ms}``, plus ``'error'``
+        with the exception type name when the call raised. The exception itself
+        is not caught. Durations are measured with ``time.perf_counter_ns``.
+
+        Sampling is decided before timing starts, so calls the sampler drops
+        cost little more than the sampling decision. Durations go through the
+        usual path, which only queues them in background mode; with an
+        ``aggregator`` they are instead folded into periodic summaries of
+        ``name`` with the properties as dimensions.
+
+        Args:
+            name: Event name of the duration events
+            aggregator: Aggregator that receives the durations instead of the
+                logger (optional)
+            **properties: Properties added to every duration event
+
+        Returns:
+            A ``scarf.timing.Timer``
+
+        Example:
+            @logger.timed('db.query', table='users')
+            def load_users(): ...
+
+            with logger.timed('export', format='csv'):
+                export()
+        """
+        return Timer(self, name, properties, aggregator)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued events have been sent.
+
+        Args:
+            timeout: Maximum number of seconds to wait (optional, default: wait forever)
+
+        Returns:
+            True if all queued events were sent, False if the timeout expired first.
+            Always True when background mode is disabled.
         """
-        if self._check_do_not_track():
+        if self._dispatcher is None:
+            return True
+        return self._dispatcher.flush(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Send any queued events, stop the background worker and release connections.
+
+        Events logged after close are dropped in background mode. With a spool,
+        events still queued when the timeout expires are written to the spool
+        so a later process can send them.
+
+        Args:
+            timeout: Maximum number of seconds to wait for queued events and
+                a spool replay in progress, in total (optional, default: wait
+                forever)
+
+        Returns:
+            True if all queued events were sent, False if the timeout expired first
+        """
+        drained = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._closed.set()
+        shutdown.unregister(self)
+        if self._replayer is not None:
+            self._replayer.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if self._dispatcher is not None:
+            drained = self._dispatcher.close(
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+        if self.spool is not None:
+            leftover = self._dispatcher.drain_pending()
+            self.spool.append(item.record for item in leftover)
+            self.metrics.add('events_spooled', len(leftover))
+            self.spool.close()
+        with self._collector_lock:
+            if self._collector is not None:
+                self._collector.close()
+                self._collector = None
+        if self.dedup is not None:
+            try:
+                self.dedup.save()
+            except OSError as e:
+                if self.verbose:
+                    print(f"\nFailed to save the dedup index: {e}")
+        self.transport.close()
+        return drained
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Close the logger, spending at most ``timeout`` seconds on queued events.
+
+        Queued events are sent concurrently, without retries, with request
+        timeouts cut to the remaining budget. Whatever is not sent when the
+        budget runs out is written to the spool if there is one and dropped
+        otherwise; requests still in flight are abandoned. Runs automatically
+        at exit for background loggers.
+
+        Args:
+            timeout: Time budget in seconds (optional, default: shutdown_timeout)
+
+        Returns:
+            True if every queued event was sent within the budget
+        """
+        budget = self.shutdown_timeout if timeout is None else timeout
+        deadline = time.monotonic() + budget
+        if self._dispatcher is None or self._closed.is_set():
+            return self.close(budget)
+
+        self._closed.set()
+        self._dispatcher.close(0)  # stop accepting; the worker finishes its batch
+        unsent = self._send_before(self._dispatcher.drain_pending(), deadline)
+        if unsent:
+            if self.spool is not None:
+                self.spool.append(unsent)
+                self.metrics.add('events_spooled', len(unsent))
+            else:
+                self._dropped(len(unsent), DROP_SHUTDOWN)
+                if self.verbose:
+                    print(f"Dropped {len(unsent)} events at shutdown")
+        return self.close(max(0.0, deadline - time.monotonic())) and not unsent
+
+    def _log_sampled(self, properties: Dict[str, Any], timeout: Optional[float]) -> bool:
+        """Log an event that already passed the do-not-track and sampling checks."""
+        # Encoded up front, before any state changes: bytes take a fraction of
+        # the memory of the properties when queued, and later mutations by the
+        # caller can't leak in.
+        record = self._encode(properties)
+        if record is None:
+            return False
+
+        if self.dedup is not None and not self.dedup.check(properties):
+            self.metrics.add('events_deduplicated')
+            return False
+
+        if self.collector_socket is not None:
+            if self._send_to_collector(record):
+                return True
+            if self.dedup is not None:
+                self.dedup.forget(properties)  # let a retry through
+            return False
+
+        if self._dispatcher is not None:
+            if self._dispatcher.submit(QueuedEvent(record, timeout)):
+                return True
+            closed = self._closed.is_set()
+            if self.overflow == SPILL and self.spool is not None and not closed:
+                self.spool.append([record])
+                self.metrics.add('events_spooled')
+                return True
+            self._dropped(1, DROP_CLOSED if closed else DROP_QUEUE_FULL)
+            if self.dedup is not None:
+                self.dedup.forget(properties)  # let a retry through
             if self.verbose:
-                print("Analytics are disabled via environment variables")
+                print("Event dropped: background queue is full or closed")
             return False
 
         if self.verbose:
             print("\nSending event:")
             print(f"  Properties: {properties}")
+        if self.dedup is None:
+            return self._send_record(record, timeout)
+        try:
+            return self._send_record(record, timeout)
+        except Exception:
+            self.dedup.forget(properties)  # let a retry through
+            raise
+
+    def _encode(self, properties: Mapping[str, Any]) -> Optional[bytes]:
+        """Encode an event, applying the payload guard if there is one.
+
+        Returns:
+            The encoded event, or None if the guard rejected it
+        """
+        guard = self.guard
+        if guard is None:
+            return self.encoder.encode(properties)
+        record, changed = guard.encode(properties, self.encoder)
+        if changed:
+            self.metrics.add('events_truncated')
+        if record is None:
+            self.metrics.add('events_rejected')
+            if self.verbose:
+                print("Event rejected: over the payload guard's limits")
+        return record
+
+    def _set(self, name: str, value: Any) -> None:
+        # Assigning a setting changes the logger's own settings, which later
+        # reloads start from, and swaps in a snapshot with the new value.
+        with self._reload_lock:
+            self._settings[name] = value
+            if name == 'endpoint_url':
+                value = value.rstrip('/')
+            self.config = self.config.replace(**{name: value})
+
+    def _reload_quietly(self) -> None:
+        """Reload, keeping the current configuration if the config file is invalid."""
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            if self.verbose:
+                print(f"\nFailed to reload the configuration: {e}")
+
+    def _start_watcher(self) -> None:
+        self._watcher = threading.Thread(
+            target=self._watch_config, name="scarf-config", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_config(self) -> None:
+        while not self._closed.wait(self._watch_interval):
+            if file_signature(self.config_path) != self._config_signature:
+                self._reload_quietly()
+
+    def _send_to_collector(self, record: bytes) -> bool:
+        line = record + b'\n'
+        with self._collector_lock:
+            try:
+                if self._collector is None:
+                    import socket
+
+                    self._collector = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self._collector.settimeout(self.COLLECTOR_SEND_TIMEOUT)
+                    self._collector.connect(self.collector_socket)
+                self._collector.sendall(line)
+                self.metrics.add('events_forwarded')
+                return True
+            except OSError as e:
+                # Collector missing or too far behind. A timed out sendall may have
+                # written part of the line, so start over on a new connection; the
+                # collector discards the partial line when this one closes.
+                if self._collector is not None:
+                    self._collector.close()
+                    self._collector = None
+                if self.verbose:
+                    print(f"Event dropped: collector unavailable ({type(e).__name__}: {e})")
+        self._dropped(1, DROP_COLLECTOR_UNAVAILABLE)
+        return False
+
+    def _before_fork(self) -> None:
+        if self.spool is not None:
+            self.spool._before_fork()
+
+    def _after_fork_in_child(self) -> None:
+        # Connections, locks and threads inherited from the parent may be in use
+        # there or mid-operation; replace them instead of sharing them. The
+        # transport resets its own connections.
+        closed = self._closed.is_set()
+        self._closed = threading.Event()
+        if closed:
+            self._closed.set()
+        if self._dispatcher is not None:
+            self._dispatcher._after_fork_in_child()
+        if self.spool is not None:
+            self.spool._abandon()
+            self.spool = None
+            self._replayer = None
+            if self.overflow == SPILL:
+                self.overflow = DROP_NEWEST
+        if self.circuit_breaker is not None:
+            self.circuit_breaker._after_fork_in_child()
+        if self.sampler is not None:
+            self.sampler._after_fork_in_child()
+        self._reload_lock = threading.Lock()
+        if self._watcher is not None and not closed:
+            self._start_watcher()
+        if self.dedup is not None:
+            self.dedup._after_fork_in_child()
+        if self.adaptive is not None:
+            self.adaptive._after_fork_in_child()
+        self._collector_lock = threading.Lock()
+        if self._collector is not None:
+            # The parent keeps using its connection; closing our copy of the
+            # descriptor leaves it open there.
+            self._collector.close()
+            self._collector = None
+        self.metrics._after_fork_in_child()
+
+    def _dropped(self, count: int, reason: str) -> None:
+        self.metrics.add('events_dropped', count)
+        if self.hooks is not None:
+            self.hooks.on_drop(count, reason)
+
+    def _evicted(self, items: List[QueuedEvent]) -> None:
+        self._dropped(len(items), DROP_EVICTED)
+        if self.verbose:
+            print(f"Dropped {len(items)} queued events to make room for newer ones")
+
+    def _send_queued(self, items: List[QueuedEvent]) -> None:
+        if self.batch_size == 1 and self.adaptive is None:
+            item = items[0]
+            if self.verbose:
+                print("\nSending event:")
+                print(f"  Properties: {item.record.decode('utf-8', 'replace')}")
+            try:
+                self._send_record(item.record, item.timeout)
+            except Exception:
+                if self.spool is None:
+                    raise
+                self.spool.append([item.record])
+                self.metrics.add('events_spooled')
+            return
+
+        records = [item.record for item in items]
+        chunks = list(self._chunk_records(records))
+        for i, chunk in enumerate(chunks):
+            try:
+                self._send_records(chunk, None)
+            except Exception:
+                # Don't wait out another timeout per chunk while the endpoint is down.
+                if self.spool is None:
+                    # The failed chunk is counted in events_failed; the rest were never tried.
+                    untried = sum(len(chunk) for chunk in chunks[i + 1:])
+                    if untried:
+                        self._dropped(untried, DROP_SEND_FAILED)
+                    raise
+                unsent = [record for chunk in chunks[i:] for record in chunk]
+                self.spool.append(unsent)
+                self.metrics.add('events_spooled', len(unsent))
+                return
+
+    def _send_before(self, items: List[QueuedEvent], deadline: float) -> List[bytes]:
+        """Send queued items on up to SHUTDOWN_CONCURRENCY threads until the deadline.
+
+        Returns:
+            The encoded events that were not sent
+        """
+        records = [item.record for item in items]
+        if self.batch_size > 1:
+            chunks = deque(
+                chunk
+                for i in range(0, len(records), self.batch_size)
+                for chunk in self._chunk_records(records[i:i + self.batch_size])
+            )
+        else:
+            chunks = deque([record] for record in records)
+        failed: List[bytes] = []
+        lock = threading.Lock()
+        stopped = False
+
+        def send_chunks() -> None:
+            while True:
+                remaining = deadline - time.monotonic()
+                with lock:
+                    if stopped or remaining <= 0 or not chunks:
+                        return
+                    chunk = chunks.popleft()
+                if self.batch_size > 1:
+                    body, headers = self._batch_body(chunk)
+                else:
+                    body, headers = chunk[0], self._json_headers
+                try:
+                    self._deliver(body, headers, remaining, len(chunk), retry=False)
+                except Exception:
+                    failed.extend(chunk)
+
+        threads = []
+        for _ in range(min(len(chunks), self.SHUTDOWN_CONCURRENCY)):
+            thread = threading.Thread(target=send_chunks, name="scarf-shutdown", daemon=True)
+            try:
+                thread.start()
+            except RuntimeError:
+                break  # no new threads during interpreter shutdown on Python 3.12+
+            threads.append(thread)
+        if not threads:
+            send_chunks()
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with lock:
+            stopped = True
+            # Chunks still being sent by abandoned threads count as neither.
+            return failed + [record for chunk in chunks for record in chunk]
+
+    def _replay_spool_periodically(self) -> None:
+        while not self._closed.wait(self.SPOOL_REPLAY_INTERVAL):
+            self._replay_spool()
+
+    def _replay_spool(self) -> int:
+        """Send spooled events until the spool is empty or a send fails."""
+        try:
+            if self.batch_size > 1:
+                delivered = self.spool.replay(self._send_spooled_batch, self.batch_size)
+            else:
+                delivered = self.spool.replay(self._send_spooled_events, 1)
+        except Exception:
+            return 0  # still offline; try again on the next tick
+        if delivered and self.verbose:
+            print(f"\nReplayed {delivered} spooled events")
+        return delivered
+
+    def _post(self, body: bytes, headers: Dict[str, str], timeout: float) -> Any:
+        adaptive = self.adaptive
+        if adaptive is None:
+            return self.transport.send(self.endpoint_url, body, headers, timeout)
+        # Every attempt counts, so retried 429s and timeouts are seen as well.
+        start = time.perf_counter()
+        try:
+            response = self.transport.send(self.endpoint_url, body, headers, timeout)
+        except Exception as e:
+            adaptive.record(time.perf_counter() - start, e)
+            raise
+        adaptive.record(time.perf_counter() - start)
+        return response
+
+    def _deliver(
+        self,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: float,
+        count: int,
+        retry: bool = True,
+    ) -> Any:
+        """Send one request body of ``count`` events, with retries, metrics and hooks."""
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.before_send(count, len(body))
+        self.metrics.request_started()
+        start = time.perf_counter()
+        try:
+            if retry:
+                response = self._call_with_retries(lambda: self._post(body, headers, timeout))
+            else:
+                response = self._post(body, headers, timeout)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            self.metrics.request_finished(count, len(body), elapsed, ok=False)
+            if hooks is not None:
+                hooks.on_error(count, e, elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        self.metrics.request_finished(count, len(body), elapsed, ok=True)
+        if hooks is not None:
+            hooks.after_send(count, len(body), elapsed)
+        return response
+
+    def _call_with_retries(self, send: Callable[[], T]) -> T:
+        """Call ``send`` under the retry policy and circuit breaker."""
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            raise CircuitOpenError("Circuit breaker is open; not sending to Scarf")
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = send()
+            except Exception as e:
+                policy = self.retry_policy
+                if policy is not None and policy.should_retry(e, attempt):
+                    delay = policy.backoff(attempt, e)
+                    self.metrics.add('retries')
+                    if self.verbose:
+                        print(f"\nAttempt {attempt} failed ({type(e).__name__}), "
+                              f"retrying in {delay:.3f}s")
+                    time.sleep(delay)
+                    continue
+                if breaker is not None:
+                    if is_transient(e):
+                        breaker.record_failure()
+                    else:
+                        # The endpoint answered; the request itself was at fault.
+                        breaker.record_success()
+                raise
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    def _send_spooled_batch(self, records: List[bytes]) -> None:
+        for chunk in self._chunk_records(records):
+            self._send_records(chunk, None)
+
+    def _send_spooled_events(self, records: List[bytes]) -> None:
+        for record in records:
+            self._send_record(record, None)
+
+    def _chunk_records(self, records: List[bytes]) -> Iterator[List[bytes]]:
+        """Split encoded records into chunks whose NDJSON body fits batch_max_bytes.
+
+        A single record larger than the limit is still sent on its own.
+        """
+        chunk: List[bytes] = []
+        size = 0
+        for record in records:
+            record_size = len(record) + 1  # trailing newline
+            if chunk and size + record_size > self.batch_max_bytes:
+                yield chunk
+                chunk = []
+                size = 0
+            chunk.append(record)
+            size += record_size
+        if chunk:
+            yield chunk
+
+    def _batch_body(self, records: List[bytes]) -> Tuple[bytes, Dict[str, str]]:
+        body = self.encoder.encode_batch(records)
+        headers = {'User-Agent': self.user_agent, 'Content-Type': 'application/x-ndjson'}
+        if self.compress:
+            body = gzip_compress(body, self.GZIP_LEVEL)
+            headers['Content-Encoding'] = 'gzip'
+        return body, headers
+
+    def _send_records(self, records: List[bytes], timeout: Optional[float]) -> None:
+        body, headers = self._batch_body(records)
+
+        if self.verbose:
+            print(f"\nSending batch of {len(records)} events ({len(body)} bytes)")
+
+        start_time = time.time()
+        try:
+            response = self._deliver(
+                body,
+                headers,
+                timeout if timeout is not None else self.timeout,
+                len(records),
+            )
+
+            if self.verbose:
+                elapsed = time.time() - start_time
+                print(f"\nBatch response received in {elapsed:.3f}s:")
+                print(f"  Status: {response.status_code}")
+
+        except Exception as e:
+            if self.verbose:
+                elapsed = time.time() - start_time
+                print(f"\nError after {elapsed:.3f}s:")
+                print(f"  {type(e).__name__}: {str(e)}")
+            raise
+
+    def _send_record(self, body: bytes, timeout: Optional[float]) -> bool:
+        if self.verbose:
             print(f"  Timeout: {timeout if timeout is not None else self.timeout}s")
 
         start_time = time.time()
         try:
-            response = self.session.post(
-                self.endpoint_url,
-                json=properties,
-                timeout=timeout if timeout is not None else self.timeout
+            response = self._deliver(
+                body,
+                self._json_headers,
+                timeout if timeout is not None else self.timeout,
+                1,
             )
-            response.raise_for_status()
 
             if self.verbose:
                 elapsed = time.time() - start_time
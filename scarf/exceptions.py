@@ -0,0 +1,29 @@
+"""Exceptions raised by the Scarf clients."""
+from typing import Mapping, Optional
+
+
+class ScarfError(Exception):
+    """Base class for errors raised by scarf."""
+
+
+class TransportError(ScarfError):
+    """A request could not be completed because of a connection failure or timeout."""
+
+
+class HTTPStatusError(TransportError):
+    """The endpoint answered with a non-success HTTP status."""
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Optional[Mapping[str, str]] = None,
+        body: bytes = b'',
+    ):
+        super().__init__(f"HTTP {status_code} from Scarf endpoint")
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        self.body = body
+
+
+class CircuitOpenError(ScarfError):
+    """The circuit breaker is open, so the event was not sent."""
@@ -0,0 +1,235 @@
+"""Send events to several Scarf endpoints at once."""
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from . import fork
+from .event_logger import ScarfEventLogger, build_user_agent
+from .transport import RequestsTransport
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from .transport import Transport
+
+Predicate = Callable[[Mapping[str, Any]], bool]
+Result = Union[bool, Exception]
+# (endpoint URL, logger method, events passed to it)
+_Call = Tuple[str, Callable[[Any, Optional[float]], bool], Any]
+
+
+class Endpoint:
+    """An endpoint events are fanned out to, and which events it receives."""
+
+    __slots__ = ('url', 'timeout', 'predicate')
+
+    def __init__(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        predicate: Optional[Predicate] = None,
+    ):
+        """Initialize the endpoint.
+
+        Args:
+            url: The endpoint URL for the Scarf API
+            timeout: Timeout in seconds for requests to this endpoint
+                (optional, default: the fan-out logger's timeout)
+            predicate: Function of an event's properties returning whether the
+                event is sent to this endpoint (optional, default: every event)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.predicate = predicate
+
+    def __repr__(self) -> str:
+        return f'Endpoint({self.url!r})'
+
+
+class FanoutEventLogger:
+    """Send each event to every endpoint whose predicate accepts it, concurrently.
+
+    Each endpoint gets its own ``ScarfEventLogger``; they share one transport,
+    and so one connection pool, unless ``transport`` says otherwise. Sends to
+    different endpoints run at the same time on a bounded thread pool shared by
+    all endpoints, with the caller's thread taking one of them, so a call takes
+    as long as the slowest endpoint rather than the sum of all of them.
+
+    Results are reported per endpoint: a dict mapping the URL of every endpoint
+    the event was routed to to True, False (analytics disabled or event
+    sampled out) or the exception its send raised. Failures at one endpoint
+    never affect the others.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Union[str, Endpoint]],
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        transport: Optional['Transport'] = None,
+        **options: Any,
+    ):
+        """Initialize the fan-out logger.
+
+        Args:
+            endpoints: Endpoint URLs or ``Endpoint`` objects
+            timeout: Default timeout in seconds for API calls (optional, default: 3.0)
+            max_workers: Maximum number of threads sending at once, besides the
+                caller's (optional, default: one per endpoint but the first)
+            transport: ``scarf.transport.Transport`` shared by all endpoints
+                (optional, default: a ``RequestsTransport``)
+            **options: Further ``ScarfEventLogger`` options, applied to every endpoint
+
+        Raises:
+            ValueError: If no endpoints are given, an endpoint URL appears twice,
+                or max_workers is less than 1
+        """
+        endpoints = [e if isinstance(e, Endpoint) else Endpoint(e) for e in endpoints]
+        if not endpoints:
+            raise ValueError("at least one endpoint must be provided")
+        urls = [endpoint.url.rstrip('/') for endpoint in endpoints]
+        if len(set(urls)) != len(urls):
+            raise ValueError("endpoint URLs must be unique")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.endpoints = endpoints
+        self.max_workers = max_workers if max_workers is not None else max(1, len(endpoints) - 1)
+        if transport is None:
+            transport = RequestsTransport(build_user_agent())
+        self.transport = transport
+        self.loggers: Dict[str, ScarfEventLogger] = {
+            url: ScarfEventLogger(
+                url,
+                timeout=endpoint.timeout if endpoint.timeout is not None else timeout,
+                transport=transport,
+                **options,
+            )
+            for url, endpoint in zip(urls, endpoints)
+        }
+        self._routes: List[Tuple[str, ScarfEventLogger, Optional[Predicate]]] = [
+            (url, self.loggers[url], endpoint.predicate)
+            for url, endpoint in zip(urls, endpoints)
+        ]
+        self._executor: Optional['ThreadPoolExecutor'] = None
+        self._executor_lock = threading.Lock()
+        fork.register(self)
+
+    def __enter__(self) -> 'FanoutEventLogger':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def log_event(
+        self,
+        properties: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Result]:
+        """Log an event to every endpoint it is routed to.
+
+        Args:
+            properties: JSON-serializable properties to include with the event
+            timeout: Timeout in seconds for this call, overriding the timeouts of
+                all endpoints (optional)
+
+        Returns:
+            The result of each endpoint the event was routed to, keyed by URL
+        """
+        calls: List[_Call] = [
+            (url, logger.log_event, properties)
+            for url, logger, predicate in self._routes
+            if predicate is None or predicate(properties)
+        ]
+        return self._run(calls, timeout)
+
+    def log_events(
+        self,
+        events: Sequence[Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Result]:
+        """Log several events, sending each endpoint the events routed to it in batches.
+
+        The endpoints must accept batched NDJSON bodies; see
+        ``ScarfEventLogger.log_events``.
+
+        Returns:
+            The result of each endpoint at least one event was routed to, keyed by URL
+        """
+        calls: List[_Call] = []
+        for url, logger, predicate in self._routes:
+            routed = events if predicate is None else [p for p in events if predicate(p)]
+            if routed:
+                calls.append((url, logger.log_events, routed))
+        return self._run(calls, timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every background logger has sent its queued events."""
+        return all([logger.flush(timeout) for logger in self.loggers.values()])
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Close every endpoint's logger and stop the worker threads.
+
+        Returns:
+            True if every logger sent all of its queued events
+        """
+        drained = all([logger.close(timeout) for logger in self.loggers.values()])
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        return drained
+
+    def _run(self, calls: List[_Call], timeout: Optional[float]) -> Dict[str, Result]:
+        if not calls:
+            return {}
+        # The caller's thread sends to the first endpoint while the pool sends
+        # to the others, so a single endpoint never pays for a thread handoff.
+        futures: List[Tuple[str, 'Future']] = []
+        if len(calls) > 1:
+            executor = self._get_executor()
+            futures = [(url, executor.submit(send, arg, timeout)) for url, send, arg in calls[1:]]
+
+        results: Dict[str, Result] = {}
+        url, send, arg = calls[0]
+        try:
+            results[url] = send(arg, timeout)
+        except Exception as e:
+            results[url] = e
+        for url, future in futures:
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                results[url] = e
+        return results
+
+    def _get_executor(self) -> 'ThreadPoolExecutor':
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                executor = self._executor
+                if executor is None:
+                    # Imported lazily so that `import scarf` stays cheap.
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    executor = self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix='scarf-fanout'
+                    )
+        return executor
+
+    def _after_fork_in_child(self) -> None:
+        # The pool's threads don't exist in the child; start a new pool on demand.
+        # Each endpoint's logger resets itself.
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
@@ -0,0 +1,30 @@
+"""Keep scarf objects usable in processes created with os.fork()."""
+import os
+import weakref
+
+_objects: 'weakref.WeakSet' = weakref.WeakSet()
+
+
+def register(obj) -> None:
+    """Call ``obj``'s fork hooks around every ``os.fork()`` while it is alive.
+
+    ``obj._before_fork()`` runs in the parent just before the fork and
+    ``obj._after_fork_in_child()`` in the child right after it; both are optional.
+    The child hook must replace locks, threads and connections inherited from
+    the parent, since other threads may have held or been using them mid-fork.
+    """
+    _objects.add(obj)
+
+
+def _call(hook: str) -> None:
+    for obj in list(_objects):
+        method = getattr(obj, hook, None)
+        if method is not None:
+            method()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(
+        before=lambda: _call('_before_fork'),
+        after_in_child=lambda: _call('_after_fork_in_child'),
+    )
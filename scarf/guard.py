@@ -0,0 +1,238 @@
+"""Limits on the shape and size of events, enforced before they are sent."""
+import math
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .serialization import EventEncoder
+
+TRUNCATE = 'truncate'
+DROP = 'drop'
+ACTIONS = (TRUNCATE, DROP)
+
+_SCALARS = frozenset((int, bool, type(None)))  # floats may be NaN or Infinity
+_JSON_TYPES = (str, int, float, Mapping, list, tuple)
+_DROPPED = object()  # returned by _clean for a value to leave out
+_isfinite = math.isfinite
+
+
+def default_fallback(value: Any) -> Any:
+    """Turn a value JSON can't represent into one it can.
+
+    Dates and times become ISO 8601 strings, bytes are decoded as UTF-8, sets
+    become lists and anything else becomes its ``str()``.
+    """
+    isoformat = getattr(value, 'isoformat', None)
+    if isoformat is not None:
+        return isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', 'replace')
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+class PayloadGuard:
+    """Keep pathological events from costing CPU, latency and bandwidth.
+
+    Events are checked against the limits in one pass that doesn't copy them.
+    An event that breaks a limit, or holds values JSON can't represent, is
+    rebuilt with offending values fixed according to ``action``:
+
+    - ``'truncate'`` cuts strings to ``max_string_length`` characters and
+      objects and arrays to their first ``max_keys`` entries.
+    - ``'drop'`` leaves out such strings, objects and arrays, with their keys.
+
+    Objects and arrays nested deeper than ``max_depth`` are always left out,
+    and other values, including NaN and Infinity, are converted by
+    ``fallback``. Tuples, mappings other than dicts and subclasses of JSON
+    types are converted to their plain JSON counterparts without counting as
+    a change. An event whose encoding
+    still exceeds ``max_bytes`` is rejected as a whole. The logger counts
+    changed events in ``events_truncated`` and rejected ones in
+    ``events_rejected``; neither raises.
+    """
+
+    DEFAULT_MAX_DEPTH = 8
+    DEFAULT_MAX_KEYS = 100
+    DEFAULT_MAX_STRING_LENGTH = 1024
+    DEFAULT_MAX_BYTES = 64 * 1024  # 64 KiB
+
+    def __init__(
+        self,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        max_string_length: int = DEFAULT_MAX_STRING_LENGTH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        action: str = TRUNCATE,
+        fallback: Callable[[Any], Any] = default_fallback,
+    ):
+        """Initialize the guard.
+
+        Args:
+            max_depth: Maximum nesting of objects and arrays; the event itself
+                is at depth 1 (optional, default: 8)
+            max_keys: Maximum number of entries of any object or array
+                (optional, default: 100)
+            max_string_length: Maximum length of a string value, in characters
+                (optional, default: 1024)
+            max_bytes: Maximum size of an encoded event, including static
+                properties (optional, default: 64 KiB)
+            action: 'truncate' or 'drop' values over a limit (optional, default: 'truncate')
+            fallback: Callable converting values JSON can't represent; its
+                result is checked like any other value (optional, default:
+                ``default_fallback``)
+
+        Raises:
+            ValueError: If a limit is less than 1 or action is not 'truncate' or 'drop'
+        """
+        if min(max_depth, max_keys, max_string_length, max_bytes) < 1:
+            raise ValueError("limits must be at least 1")
+        if action not in ACTIONS:
+            raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+
+        self.max_depth = max_depth
+        self.max_keys = max_keys
+        self.max_string_length = max_string_length
+        self.max_bytes = max_bytes
+        self.action = action
+        self.fallback = fallback
+
+    def clean(self, properties: Mapping[str, Any]) -> Tuple[Optional[Mapping[str, Any]], bool]:
+        """Apply the limits to an event's properties.
+
+        Returns:
+            The properties, the same object if they are within the limits or
+            None if the event has too many properties and action is 'drop',
+            and whether they had to be changed
+        """
+        if self._valid_object(properties, 1):
+            return properties, False
+        cleaned, changed = self._clean(properties, 1)
+        return cleaned if cleaned is not _DROPPED else None, changed
+
+    def encode(
+        self,
+        properties: Mapping[str, Any],
+        encoder: 'EventEncoder',
+    ) -> Tuple[Optional[bytes], bool]:
+        """Apply the limits and encode an event.
+
+        Returns:
+            The encoded event, or None if it is rejected, and whether the
+            properties had to be changed
+        """
+        cleaned, changed = self.clean(properties)
+        if cleaned is None:
+            return None, changed
+        record = encoder.encode(cleaned)
+        if len(record) > self.max_bytes:
+            return None, changed
+        return record, changed
+
+    def _valid_object(self, obj: Mapping[Any, Any], depth: int) -> bool:
+        if len(obj) > self.max_keys or depth > self.max_depth:
+            return False
+        # Strings and scalars, by far the most common values, are checked inline.
+        max_length = self.max_string_length
+        for key, value in obj.items():
+            if type(key) is not str:
+                return False
+            cls = type(value)
+            if cls is str:
+                if len(value) > max_length:
+                    return False
+            elif cls is float:
+                if not _isfinite(value):
+                    return False
+            elif cls not in _SCALARS and not self._valid(value, depth):
+                return False
+        return True
+
+    def _valid(self, value: Any, depth: int) -> bool:
+        cls = type(value)
+        if cls is str:
+            return len(value) <= self.max_string_length
+        if cls in _SCALARS:
+            return True
+        if cls is float:
+            return _isfinite(value)
+        if cls is dict:
+            return self._valid_object(value, depth + 1)
+        if cls is list:
+            if len(value) > self.max_keys or depth >= self.max_depth:
+                return False
+            for item in value:
+                if not self._valid(item, depth + 1):
+                    return False
+            return True
+        return False  # tuples, subclasses and other types take the slow path
+
+    def _clean(self, value: Any, depth: int) -> Tuple[Any, bool]:
+        # Returns the value within the limits, and whether that took truncating,
+        # dropping or falling back. Type conversions JSON doesn't see, such as
+        # tuples to lists, don't count.
+        cls = type(value)
+        if cls in _SCALARS:
+            return value, False
+        if isinstance(value, float):
+            if _isfinite(value):
+                return value, False
+            return self._fall_back(value, depth)
+        if isinstance(value, str):
+            value = str.__str__(value)  # a plain str, also for str subclasses
+            if len(value) <= self.max_string_length:
+                return value, False
+            if self.action == TRUNCATE:
+                return value[:self.max_string_length], True
+            return _DROPPED, True
+        if isinstance(value, Mapping):
+            if depth > self.max_depth:
+                return _DROPPED, True
+            items = list(value.items())
+            changed = False
+            if len(items) > self.max_keys:
+                if self.action == DROP:
+                    return _DROPPED, True
+                items = items[:self.max_keys]
+                changed = True
+            result: Dict[str, Any] = {}
+            for key, item in items:
+                item, item_changed = self._clean(item, depth + 1)
+                changed = changed or item_changed
+                if item is _DROPPED:
+                    continue
+                if type(key) is not str:
+                    # JSON encoders write int keys as strings too, but not others.
+                    if not isinstance(key, int) or isinstance(key, bool):
+                        changed = True
+                    key = str(key)
+                result[key] = item
+            return result, changed
+        if isinstance(value, (list, tuple)):
+            if depth > self.max_depth:
+                return _DROPPED, True
+            changed = False
+            if len(value) > self.max_keys:
+                if self.action == DROP:
+                    return _DROPPED, True
+                value = value[:self.max_keys]
+                changed = True
+            cleaned: List[Any] = []
+            for item in value:
+                item, item_changed = self._clean(item, depth + 1)
+                changed = changed or item_changed
+                if item is not _DROPPED:
+                    cleaned.append(item)
+            return cleaned, changed
+        if isinstance(value, int):
+            return value, False  # subclasses such as IntEnum encode fine
+        return self._fall_back(value, depth)
+
+    def _fall_back(self, value: Any, depth: int) -> Tuple[Any, bool]:
+        value = self.fallback(value)
+        # Don't hand the result to the fallback again.
+        if isinstance(value, float) and not _isfinite(value):
+            value = None
+        elif value is not None and not isinstance(value, _JSON_TYPES):
+            value = str(value)
+        return self._clean(value, depth)[0], True
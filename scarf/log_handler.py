@@ -0,0 +1,201 @@
+"""A logging.Handler that sends log records to Scarf as events."""
+import atexit
+import logging
+import operator
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+from . import fork
+from .dispatcher import BackgroundDispatcher
+from .event_logger import ScarfEventLogger
+from .sampling import RateLimit, TokenBucket
+
+Field = Union[str, Callable[[logging.LogRecord], Any]]
+
+DEFAULT_FIELDS: Mapping[str, Field] = {
+    'level': 'levelname',
+    'logger': 'name',
+    'message': 'message',
+    'module': 'module',
+    'function': 'funcName',
+    'line': 'lineno',
+    'exception': 'exception',
+}
+
+
+class ScarfLoggingHandler(logging.Handler):
+    """Send log records to Scarf in batches from a background thread.
+
+    ``emit`` only applies the level filter and rate limit, turns the record
+    into a property dict and queues it; it never waits on the network. A
+    worker thread sends queued events in batches with ``logger.log_events``,
+    so the endpoint must accept batched NDJSON bodies. Records are dropped,
+    and counted in ``dropped``, when the rate limit is exceeded or the queue
+    is full. Records logged while the handler itself is sending (for example
+    warnings from the HTTP library) are ignored to avoid feedback loops.
+
+    ``fields`` maps event property names to the ``LogRecord`` attribute to take
+    them from, or to a callable taking the record. Two attribute names are
+    special: ``'message'`` is the formatted message, and ``'exception'`` the
+    formatted traceback when the record has exception info. Properties whose
+    value is None are left out.
+
+    ``flush()`` and ``close()`` each wait at most the logger's
+    ``shutdown_timeout``. Once the handler starts closing, or the process
+    starts exiting, they share a single deadline instead, so the flush and
+    close run by ``logging.shutdown()`` at exit take that long in total.
+    Records still queued when the deadline passes are dropped and counted in
+    ``dropped``.
+    """
+
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_LINGER = 1.0  # 1 second
+    DEFAULT_MAX_QUEUE_SIZE = 10000
+
+    def __init__(
+        self,
+        logger: ScarfEventLogger,
+        level: int = logging.WARNING,
+        fields: Optional[Mapping[str, Field]] = None,
+        event_name: str = 'log',
+        rate_limit: Optional[RateLimit] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        linger: float = DEFAULT_LINGER,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ):
+        """Initialize the handler.
+
+        Args:
+            logger: Logger used to send the events
+            level: Minimum level of records sent (default: logging.WARNING)
+            fields: Mapping of event property names to record attributes or
+                callables (optional, default: DEFAULT_FIELDS)
+            event_name: Value of the ``event`` property of every event (default: 'log')
+            rate_limit: ``(records per second, burst)`` limit applied before records
+                are converted or queued (optional, default: unlimited)
+            batch_size: Maximum number of events per request (default: 100)
+            linger: Maximum number of seconds a partial batch waits for more
+                records (default: 1.0)
+            max_queue_size: Maximum number of records waiting to be sent (default: 10000)
+        """
+        super().__init__(level)
+        self.logger = logger
+        self.fields = dict(fields if fields is not None else DEFAULT_FIELDS)
+        self.event_name = event_name
+        self.rate_limited = 0
+        self.unsent = 0
+        self.failed = 0
+        self._getters: List[Tuple[str, Callable[[logging.LogRecord], Any]]] = [
+            (name, self._getter(source)) for name, source in self.fields.items()
+        ]
+        self._bucket = TokenBucket(*rate_limit) if rate_limit else None
+        self._sending = threading.local()
+        self._deadline: Optional[float] = None
+        self._dispatcher = BackgroundDispatcher(
+            self._send_batch,
+            max_queue_size=max_queue_size,
+            batch_size=batch_size,
+            linger=linger,
+        )
+        fork.register(self)
+        _handlers.add(self)
+
+    @property
+    def dropped(self) -> int:
+        """Records dropped by the rate limit, because the queue was full, or unsent at close."""
+        return self.rate_limited + self._dispatcher.dropped + self.unsent
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if getattr(self._sending, 'active', False):
+            return
+        if self._bucket is not None and not self._bucket.try_acquire():
+            self.rate_limited += 1
+            return
+        try:
+            self._dispatcher.submit(self.record_to_properties(record))
+        except Exception:
+            self.handleError(record)
+
+    def record_to_properties(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """Turn a log record into event properties using ``fields``."""
+        properties: Dict[str, Any] = {'event': self.event_name}
+        for name, get in self._getters:
+            value = get(record)
+            if value is not None:
+                properties[name] = value
+        return properties
+
+    def flush(self) -> None:
+        """Wait for queued records to be sent, until the deadline or the logger's budget."""
+        self._dispatcher.flush(self._time_left())
+
+    def close(self) -> None:
+        """Send queued records until the deadline, drop the rest and stop the worker."""
+        self._start_deadline()
+        self._dispatcher.close(self._time_left())
+        self.unsent += len(self._dispatcher.drain_pending())
+        super().close()
+
+    def _start_deadline(self) -> None:
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.logger.shutdown_timeout
+
+    def _time_left(self) -> float:
+        if self._deadline is None:
+            return self.logger.shutdown_timeout
+        return max(0.0, self._deadline - time.monotonic())
+
+    def _after_fork_in_child(self) -> None:
+        self._dispatcher._after_fork_in_child()
+        if self._bucket is not None:
+            self._bucket._after_fork_in_child()
+
+    def _getter(self, source: Field) -> Callable[[logging.LogRecord], Any]:
+        if callable(source):
+            return source
+        if source == 'message':
+            return logging.LogRecord.getMessage
+        if source == 'exception':
+            return self._format_exception
+        get = operator.attrgetter(source)
+
+        def getter(record: logging.LogRecord) -> Any:
+            try:
+                return get(record)
+            except AttributeError:
+                return None  # e.g. an ``extra`` attribute this record doesn't have
+
+        return getter
+
+    def _format_exception(self, record: logging.LogRecord) -> Optional[str]:
+        if not record.exc_info:
+            return None
+        formatter = self.formatter or logging.Formatter()
+        return formatter.formatException(record.exc_info)
+
+    def _send_batch(self, batch: List[Dict[str, Any]]) -> None:
+        self._sending.active = True
+        try:
+            self.logger.log_events(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            if self.logger.verbose:
+                print(f"\nFailed to send {len(batch)} log records:")
+                print(f"  {type(e).__name__}: {str(e)}")
+        finally:
+            self._sending.active = False
+
+
+_handlers: 'weakref.WeakSet[ScarfLoggingHandler]' = weakref.WeakSet()
+
+
+def _start_deadlines() -> None:
+    # Registered after logging's own exit hook, so it runs first and the
+    # flush() and close() of logging.shutdown() share one deadline.
+    for handler in list(_handlers):
+        handler._start_deadline()
+
+
+atexit.register(_start_deadlines)
@@ -0,0 +1,135 @@
+"""Runtime counters, a send latency histogram and hooks for exporting them."""
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+# Upper bounds in seconds, as in Prometheus' default histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Reasons passed to Hooks.on_drop
+DROP_QUEUE_FULL = 'queue_full'
+DROP_CLOSED = 'closed'
+DROP_COLLECTOR_UNAVAILABLE = 'collector_unavailable'
+DROP_SHUTDOWN = 'shutdown'
+DROP_EVICTED = 'evicted'
+DROP_SEND_FAILED = 'send_failed'
+
+
+class Hooks:
+    """Callbacks invoked as a logger sends events; subclass and override what you need.
+
+    Hooks run synchronously on the thread doing the work (the caller, or the
+    background worker), so they must be fast and must not raise. ``count`` is
+    the number of events in the request or drop, and ``size`` the request body
+    size in bytes, after compression.
+    """
+
+    def before_send(self, count: int, size: int) -> None:
+        """Called before a request is sent, once per request including its retries."""
+
+    def after_send(self, count: int, size: int, seconds: float) -> None:
+        """Called after a request succeeded, with its latency including retries."""
+
+    def on_error(self, count: int, error: BaseException, seconds: float) -> None:
+        """Called after a request failed for good, once retries are exhausted."""
+
+    def on_drop(self, count: int, reason: str) -> None:
+        """Called when events are dropped without a send attempt.
+
+        ``reason`` is one of DROP_QUEUE_FULL, DROP_CLOSED, DROP_COLLECTOR_UNAVAILABLE,
+        DROP_SHUTDOWN (not sent within the shutdown budget), DROP_EVICTED
+        (pushed out of a full queue by newer events) and DROP_SEND_FAILED (left
+        unsent in a batch after an earlier request of the batch failed).
+        """
+
+
+class LatencyHistogram:
+    """A fixed-bucket histogram of latencies in seconds. Not thread-safe on its own."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return cumulative bucket counts keyed by upper bound, Prometheus style."""
+        buckets: Dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip((*map(str, self.bounds), '+Inf'), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {'buckets': buckets, 'count': self.count, 'sum': self.total}
+
+
+class ClientMetrics:
+    """Counters kept by a logger, updated under one short lock per request.
+
+    Read them with ``stats()``; the values are totals since the logger was
+    created, except ``in_flight``.
+    """
+
+    COUNTERS = (
+        'events_sent',
+        'events_failed',
+        'events_dropped',
+        'events_sampled_out',
+        'events_deduplicated',
+        'events_truncated',
+        'events_rejected',
+        'events_spooled',
+        'events_forwarded',
+        'requests_sent',
+        'requests_failed',
+        'retries',
+        'bytes_sent',
+    )
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        self._in_flight = 0
+        self._latency = LatencyHistogram(latency_buckets)
+
+    def add(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, count: int, size: int, seconds: float, ok: bool) -> None:
+        with self._lock:
+            counters = self._counters
+            self._in_flight -= 1
+            if ok:
+                counters['events_sent'] += count
+                counters['requests_sent'] += 1
+                counters['bytes_sent'] += size
+            else:
+                counters['events_failed'] += count
+                counters['requests_failed'] += 1
+            self._latency.observe(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats['in_flight'] = self._in_flight
+            stats['send_latency'] = self._latency.snapshot()
+        return stats
+
+    def _after_fork_in_child(self) -> None:
+        # The child starts counting from zero, and nothing is in flight in it.
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+        self._in_flight = 0
+        self._latency = LatencyHistogram(self._latency.bounds)
+
@@ -0,0 +1,141 @@
+"""A process-wide registry of shared loggers, one per endpoint and configuration."""
+import os
+import threading
+from typing import Any, Dict, Hashable, Mapping, Optional, Sequence, Tuple, Union
+
+from .event_logger import ScarfEventLogger, build_user_agent
+from .transport import RequestsTransport, Transport
+
+_lock = threading.Lock()
+_loggers: Dict[Tuple[str, Hashable], ScarfEventLogger] = {}
+_transports: Dict[str, Transport] = {}
+
+
+class LoggerView:
+    """A shared logger with default properties layered under every event.
+
+    Views are cheap: they hold a reference to the shared logger and a dict of
+    defaults, which event properties override. They cannot close the shared
+    logger.
+    """
+
+    __slots__ = ('logger', 'default_properties')
+
+    def __init__(self, logger: ScarfEventLogger, default_properties: Mapping[str, Any]):
+        self.logger = logger
+        self.default_properties = dict(default_properties)
+
+    def log_event(self, properties: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """Log an event with the default properties; see ``ScarfEventLogger.log_event``."""
+        return self.logger.log_event({**self.default_properties, **properties}, timeout)
+
+    def log_events(
+        self,
+        events: Sequence[Dict[str, Any]],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Log several events with the default properties; see ``ScarfEventLogger.log_events``."""
+        defaults = self.default_properties
+        return self.logger.log_events([{**defaults, **event} for event in events], timeout)
+
+    def bind(self, **properties: Any) -> 'LoggerView':
+        """Return a view of the same logger with more default properties."""
+        return LoggerView(self.logger, {**self.default_properties, **properties})
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.logger.flush(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.logger.stats()
+
+
+def get_logger(
+    endpoint_url: str,
+    default_properties: Optional[Mapping[str, Any]] = None,
+    **options: Any,
+) -> Union[ScarfEventLogger, LoggerView]:
+    """Return the process-wide logger for an endpoint and configuration.
+
+    Calls with the same endpoint and options share one logger, and with it one
+    queue and worker thread in background mode. Loggers for the same endpoint
+    also share one connection pool unless a ``transport`` is given. Options
+    are compared by value, except objects such as spools or samplers, which
+    are compared by identity.
+
+    Shared loggers should not be closed by any one caller: background loggers
+    are shut down at exit. A shared logger that was closed anyway is replaced
+    on the next call.
+
+    Args:
+        endpoint_url: The endpoint URL for the Scarf API
+        default_properties: Properties added to this caller's events, under the
+            event's own properties (optional). When given, a ``LoggerView`` of
+            the shared logger is returned.
+        **options: Further ``ScarfEventLogger`` options
+
+    Returns:
+        The shared logger, or a view of it with the default properties
+
+    Raises:
+        ValueError: If endpoint_url is empty or the options are invalid
+        TypeError: If an option value cannot be compared, e.g. an unhashable object
+    """
+    if not endpoint_url:
+        raise ValueError("endpoint_url must be provided")
+    endpoint_url = endpoint_url.rstrip('/')
+    key = (endpoint_url, _freeze(options))
+
+    with _lock:
+        logger = _loggers.get(key)
+        if logger is None or logger._closed.is_set():
+            if 'transport' not in options:
+                transport = _transports.get(endpoint_url)
+                if transport is None:
+                    transport = _transports[endpoint_url] = RequestsTransport(build_user_agent())
+                options = {**options, 'transport': transport}
+            logger = _loggers[key] = ScarfEventLogger(endpoint_url, **options)
+
+    if default_properties:
+        return LoggerView(logger, default_properties)
+    return logger
+
+
+def close_all(timeout: Optional[float] = None) -> bool:
+    """Close every shared logger and empty the registry, e.g. between tests.
+
+    Args:
+        timeout: Maximum number of seconds to wait for each logger's queued events
+
+    Returns:
+        True if every logger sent all of its queued events
+    """
+    with _lock:
+        loggers = list(_loggers.values())
+        _loggers.clear()
+        _transports.clear()
+    drained = True
+    for logger in loggers:
+        drained = logger.close(timeout) and drained
+    return drained
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn option values into a hashable key, comparing containers by value."""
+    if isinstance(value, Mapping):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    hash(value)
+    return value
+
+
+def _reset_after_fork() -> None:
+    # The shared loggers and transports reset themselves for the child.
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,201 @@
+"""Retry and circuit breaker policies for sending events."""
+import threading
+import time
+from typing import FrozenSet, Iterable, Mapping, Optional, Tuple
+
+from .exceptions import TransportError
+
+DEFAULT_RETRY_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+
+def _status_and_headers(error: BaseException) -> Tuple[Optional[int], Mapping[str, str]]:
+    """Extract the HTTP status and response headers carried by an error, if any."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status, getattr(error, 'headers', {})
+    # requests.HTTPError keeps them on the attached response
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response.status_code, response.headers
+    return None, {}
+
+
+def is_transient(
+    error: BaseException,
+    retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+) -> bool:
+    """Return True if a failed send is worth trying again.
+
+    Connection failures and timeouts are transient, as are the given HTTP
+    statuses. Errors caused by the request itself, such as an invalid URL or
+    a 4xx status other than 429, are not.
+    """
+    status, _ = _status_and_headers(error)
+    if status is not None:
+        return status in retry_statuses
+    if isinstance(error, ValueError):
+        # e.g. requests.exceptions.InvalidURL
+        return False
+    return isinstance(error, (OSError, TransportError))
+
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    _, headers = _status_and_headers(error)
+    value = None
+    for name, header_value in headers.items():
+        if name.lower() == 'retry-after':
+            value = header_value.strip()
+            break
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter.
+
+    A failed send is retried while it is transient (see ``is_transient``) and
+    fewer than ``max_attempts`` attempts have been made. The delay before retry
+    ``n`` is drawn uniformly from ``[0, min(max_backoff, initial_backoff *
+    multiplier ** (n - 1))]``, or the exact backoff when jitter is disabled. A
+    ``Retry-After`` header on a 429 or 503 response takes precedence, capped at
+    ``max_retry_after``.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        max_retry_after: float = 30.0,
+    ):
+        """Initialize the retry policy.
+
+        Args:
+            max_attempts: Total number of attempts including the first (default: 3)
+            initial_backoff: Backoff in seconds before the first retry (default: 0.1)
+            max_backoff: Upper bound in seconds for computed backoffs (default: 5.0)
+            multiplier: Factor applied to the backoff after each retry (default: 2.0)
+            jitter: Randomize backoffs to avoid synchronized retries (default: True)
+            retry_statuses: HTTP statuses that are retried (default: 429 and 5xx gateway errors)
+            max_retry_after: Upper bound in seconds for Retry-After delays (default: 30.0)
+
+        Raises:
+            ValueError: If max_attempts is less than 1 or a backoff is negative
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if initial_backoff < 0 or max_backoff < 0:
+            raise ValueError("backoffs must not be negative")
+
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """Return True if another attempt should follow failed attempt number ``attempt``."""
+        return attempt < self.max_attempts and is_transient(error, self.retry_statuses)
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Return the number of seconds to wait after failed attempt number ``attempt``."""
+        if error is not None:
+            status, _ = _status_and_headers(error)
+            if status in (429, 503):
+                retry_after = parse_retry_after(error)
+                if retry_after is not None:
+                    return min(retry_after, self.max_retry_after)
+
+        delay = min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            import random
+
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class CircuitBreaker:
+    """Stop sending to an endpoint that keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the breaker opens
+    and ``allow_request`` returns False for ``reset_timeout`` seconds. It then
+    lets a single trial request through (half-open): success closes the
+    breaker, failure opens it for another ``reset_timeout``. Safe to share
+    between threads.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker (default: 5)
+            reset_timeout: Seconds the breaker stays open before a trial request (default: 30.0)
+
+        Raises:
+            ValueError: If failure_threshold is less than 1
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        """The current state: CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            if self._state == self.OPEN and self._cooled_down():
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._cooled_down():
+                self._state = self.HALF_OPEN
+                return True  # the single trial request
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.reset_timeout
@@ -0,0 +1,161 @@
+"""Client-side sampling and rate limiting of events."""
+import random
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+RateLimit = Tuple[float, float]  # (events per second, burst size)
+
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at ``rate`` tokens per second."""
+
+    __slots__ = ('rate', 'burst', '_tokens', '_updated', '_lock')
+
+    def __init__(self, rate: float, burst: float):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of tokens the bucket holds
+
+        Raises:
+            ValueError: If rate is negative or burst is less than 1
+        """
+        if rate < 0:
+            raise ValueError("rate must not be negative")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available, without blocking."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+
+
+class Sampler:
+    """Decide cheaply whether an event should be sent at all.
+
+    Each event is first kept with probability ``event_rates[name]`` (or ``rate``
+    for names without their own rate), where ``name`` is the value of its
+    ``event_key`` property. Kept events must then take a token from the bucket
+    for their name, configured by ``event_rate_limits[name]`` or ``rate_limit``.
+    Decisions take constant time and never look at the rest of the properties.
+
+    Sampled events carry their sample weight (the inverse of the sampling rate)
+    in the ``weight_key`` property so that counts can be scaled back up
+    downstream. Events dropped by rate limiting are not reflected in the weight.
+    """
+
+    DEFAULT_MAX_TRACKED_EVENTS = 1000
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        event_rates: Optional[Mapping[str, float]] = None,
+        rate_limit: Optional[RateLimit] = None,
+        event_rate_limits: Optional[Mapping[str, RateLimit]] = None,
+        event_key: str = 'event',
+        weight_key: str = 'sample_weight',
+        max_tracked_events: int = DEFAULT_MAX_TRACKED_EVENTS,
+    ):
+        """Initialize the sampler.
+
+        Args:
+            rate: Fraction of events kept, between 0 and 1 (default: 1.0)
+            event_rates: Per event name sampling rates overriding ``rate`` (optional)
+            rate_limit: Default ``(events per second, burst)`` limit applied to each
+                event name separately (optional, default: unlimited)
+            event_rate_limits: Per event name limits overriding ``rate_limit`` (optional)
+            event_key: Property holding the event name (default: 'event')
+            weight_key: Property that receives the sample weight (default: 'sample_weight')
+            max_tracked_events: Number of event names given their own bucket under
+                ``rate_limit``; further names share one bucket (default: 1000)
+
+        Raises:
+            ValueError: If a sampling rate is outside [0, 1]
+        """
+        event_rates = dict(event_rates or {})
+        for value in (rate, *event_rates.values()):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError("sampling rates must be between 0 and 1")
+
+        self.rate = rate
+        self.event_rates = event_rates
+        self.rate_limit = rate_limit
+        self.event_key = event_key
+        self.weight_key = weight_key
+        self.max_tracked_events = max_tracked_events
+        self._buckets: Dict[Any, TokenBucket] = {
+            name: TokenBucket(*limit) for name, limit in (event_rate_limits or {}).items()
+        }
+        self._fixed_buckets = frozenset(self._buckets)
+        self._overflow_bucket = TokenBucket(*rate_limit) if rate_limit else None
+        self._lock = threading.Lock()
+
+    def sample(self, properties: Mapping[str, Any]) -> Optional[float]:
+        """Decide whether to send an event.
+
+        Returns:
+            The event's sample weight if it should be sent, or None if it was
+            sampled out or rate limited
+        """
+        name = properties.get(self.event_key)
+        if not isinstance(name, str):
+            name = None
+        rate = self.event_rates.get(name, self.rate) if self.event_rates else self.rate
+        if rate < 1.0 and (rate == 0.0 or random.random() >= rate):
+            return None
+
+        bucket = self._bucket_for(name)
+        if bucket is not None and not bucket.try_acquire():
+            return None
+        return 1.0 / rate
+
+    def apply(self, properties: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Sample an event and attach its weight.
+
+        Returns:
+            The properties to send, with the sample weight added when it is not 1,
+            or None if the event should be dropped
+        """
+        weight = self.sample(properties)
+        if weight is None:
+            return None
+        if weight != 1.0:
+            return {**properties, self.weight_key: weight}
+        return properties
+
+    def _after_fork_in_child(self) -> None:
+        self._lock = threading.Lock()
+        for bucket in self._buckets.values():
+            bucket._after_fork_in_child()
+        if self._overflow_bucket is not None:
+            self._overflow_bucket._after_fork_in_child()
+
+    def _bucket_for(self, name: Any) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(name)
+        if bucket is not None or self.rate_limit is None:
+            return bucket
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                if len(self._buckets) - len(self._fixed_buckets) >= self.max_tracked_events:
+                    return self._overflow_bucket
+                bucket = self._buckets[name] = TokenBucket(*self.rate_limit)
+            return bucket
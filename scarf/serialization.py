@@ -0,0 +1,163 @@
+"""Encoding of event properties into JSON request bodies."""
+import functools
+import itertools
+import json
+import math
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+Dumps = Callable[[Any], bytes]
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _stdlib_dumps() -> Dumps:
+    # One reusable encoder instead of json.dumps(..., separators=...), which
+    # builds a new JSONEncoder on every call when given non-default arguments.
+    # NaN and Infinity are not JSON; refuse them rather than send a body the
+    # endpoint rejects.
+    encode = json.JSONEncoder(separators=(',', ':'), allow_nan=False).encode
+
+    def dumps(obj: Any) -> bytes:
+        return encode(obj).encode('utf-8')
+
+    return dumps
+
+
+def _has_non_finite(obj: Any) -> bool:
+    """Return whether ``obj`` holds NaN or Infinity, as a value or a dict key."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(map(_has_non_finite, obj)) or any(map(_has_non_finite, obj.values()))
+    if isinstance(obj, (list, tuple)):
+        return any(map(_has_non_finite, obj))
+    return False
+
+
+def _load_backend(name: str) -> Dumps:
+    # The fast backends must behave like the standard library: refuse NaN and
+    # Infinity with ValueError, and encode integers of any width.
+    if name == 'orjson':
+        import orjson
+
+        option = orjson.OPT_NON_STR_KEYS
+        orjson_dumps = orjson.dumps
+        fallback = _stdlib_dumps()
+
+        def dumps(obj: Any) -> bytes:
+            try:
+                data = orjson_dumps(obj, option=option)
+            except TypeError:
+                # e.g. an integer wider than 64 bits; the standard library
+                # encodes it, or raises what it would have raised anyway.
+                return fallback(obj)
+            # orjson writes NaN and Infinity as null; only look when it did.
+            if b'null' in data and _has_non_finite(obj):
+                raise ValueError("Out of range float values are not JSON compliant")
+            return data
+
+        return dumps
+    if name == 'ujson':
+        import ujson
+
+        ujson_dumps = ujson.dumps
+        fallback = _stdlib_dumps()
+
+        def dumps(obj: Any) -> bytes:
+            try:
+                text = ujson_dumps(obj, escape_forward_slashes=False, allow_nan=False)
+            except OverflowError:
+                # How ujson refuses NaN and Infinity, and some wide integers.
+                return fallback(obj)
+            # ujson still writes NaN and Infinity dict keys as "nan" and "inf".
+            if ('nan"' in text or 'inf"' in text) and _has_non_finite(obj):
+                raise ValueError("Out of range float values are not JSON compliant")
+            return text.encode('utf-8')
+
+        return dumps
+    if name == 'json':
+        return _stdlib_dumps()
+    raise ValueError(f"Unknown JSON backend {name!r}; expected one of {BACKENDS}")
+
+
+@functools.lru_cache(maxsize=None)
+def default_backend() -> str:
+    """Return the fastest JSON backend installed: orjson, ujson or the standard library."""
+    for name in BACKENDS[:-1]:
+        try:
+            _load_backend(name)
+        except ImportError:
+            continue
+        return name
+    return 'json'
+
+
+class EventEncoder:
+    """Encode event properties as compact UTF-8 JSON, one object per event.
+
+    ``static_properties`` are encoded once, when the encoder is created, and
+    spliced into every event. An event property with the same name as a static
+    one takes precedence over it.
+
+    All backends encode the same values: NaN and Infinity, which JSON can't
+    represent, raise ``ValueError``, and integers of any width are encoded.
+
+    Encoders are stateless once created and safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        static_properties: Optional[Mapping[str, Any]] = None,
+        backend: Optional[str] = None,
+    ):
+        """Initialize the encoder.
+
+        Args:
+            static_properties: Properties added to every event (optional)
+            backend: 'orjson', 'ujson' or 'json' (optional, default: the fastest
+                one installed, see ``default_backend``)
+
+        Raises:
+            ImportError: If the requested backend is not installed
+            ValueError: If backend is not a known backend name, or
+                static_properties hold NaN or Infinity
+            TypeError: If static_properties is not JSON-serializable
+        """
+        self.backend = backend or default_backend()
+        self.static_properties = dict(static_properties or {})
+        self._dumps = _load_backend(self.backend)
+        self._static_keys = frozenset(self.static_properties)
+        # The static members without their braces, ready to splice: b'"a":1,"b":2'
+        self._static = self._dumps(self.static_properties)[1:-1]
+
+    def encode(self, properties: Mapping[str, Any]) -> bytes:
+        """Encode one event.
+
+        Raises:
+            TypeError: If properties is not JSON-serializable
+            ValueError: If properties hold NaN or Infinity
+        """
+        if not self._static:
+            return self._dumps(properties)
+        if not properties:
+            return b'{' + self._static + b'}'
+        if self._static_keys.isdisjoint(properties):
+            return b'{' + self._static + b',' + self._dumps(properties)[1:]
+        return self._dumps({**self.static_properties, **properties})
+
+    @staticmethod
+    def encode_batch(records: Iterable[bytes]) -> bytes:
+        """Join encoded events into a newline-delimited JSON body in one allocation."""
+        return b'\n'.join(itertools.chain(records, (b'',)))
+
+
+def gzip_compress(body: bytes, level: int) -> bytes:
+    """Gzip a request body.
+
+    Equivalent to ``gzip.compress`` without its file-object machinery, which
+    dominates the cost for bodies of a few kilobytes.
+    """
+    import zlib
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
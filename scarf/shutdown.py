@@ -0,0 +1,111 @@
+"""Flush background loggers within a time budget when the process exits."""
+import atexit
+import os
+import signal
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .event_logger import ScarfEventLogger
+
+_loggers: 'weakref.WeakSet[ScarfEventLogger]' = weakref.WeakSet()
+_lock = threading.Lock()
+_atexit_registered = False
+_previous_sigterm_handler = None
+_sigterm_installed = False
+
+
+def register(logger: 'ScarfEventLogger', handle_sigterm: bool = False) -> None:
+    """Shut ``logger`` down at exit, and on SIGTERM if ``handle_sigterm`` is set.
+
+    Loggers are held weakly; one that is garbage collected is simply skipped.
+    """
+    global _atexit_registered
+    with _lock:
+        _loggers.add(logger)
+        if not _atexit_registered:
+            atexit.register(shutdown_all)
+            _atexit_registered = True
+    if handle_sigterm:
+        install_sigterm_handler()
+
+
+def unregister(logger: 'ScarfEventLogger') -> None:
+    with _lock:
+        _loggers.discard(logger)
+
+
+def shutdown_all() -> bool:
+    """Shut down every registered logger, each within its own ``shutdown_timeout``.
+
+    The budgets all start counting when this is called, so the whole call
+    takes at most the largest budget.
+
+    Returns:
+        True if every pending event was delivered
+    """
+    with _lock:
+        loggers = list(_loggers)
+        _loggers.clear()
+    start = time.monotonic()
+    delivered = True
+    for logger in loggers:
+        remaining = start + logger.shutdown_timeout - time.monotonic()
+        delivered = logger.shutdown(max(0.0, remaining)) and delivered
+    return delivered
+
+
+def install_sigterm_handler() -> bool:
+    """Shut down registered loggers on SIGTERM, then defer to the previous handler.
+
+    Only the main thread can install signal handlers; from other threads this
+    does nothing.
+
+    Returns:
+        True if the handler is installed
+    """
+    global _previous_sigterm_handler, _sigterm_installed
+    if _sigterm_installed:
+        return True
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    _previous_sigterm_handler = signal.signal(signal.SIGTERM, _on_sigterm)
+    _sigterm_installed = True
+    return True
+
+
+def _on_sigterm(signum, frame) -> None:
+    # Shut down off the signal handler: it may have interrupted the main
+    # thread while it held one of the locks a shutdown takes. Waiting for the
+    # largest budget then bounds the delay even if that lock is never released.
+    try:
+        budget = max((logger.shutdown_timeout for logger in list(_loggers)), default=0.0)
+    except RuntimeError:  # the set changed while it was copied
+        budget = 0.0
+    thread = threading.Thread(target=shutdown_all, name="scarf-shutdown", daemon=True)
+    try:
+        thread.start()
+    except RuntimeError:
+        pass  # no new threads during interpreter shutdown on Python 3.12+
+    else:
+        thread.join(budget)
+    previous = _previous_sigterm_handler
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        # Die of SIGTERM as if the handler had never been installed.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _reset_after_fork() -> None:
+    # Registered loggers stay registered in the child, where they have been
+    # reset for the fork; the atexit hook and signal handler are inherited.
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
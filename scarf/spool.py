@@ -0,0 +1,224 @@
+"""Durable on-disk storage for events that could not be sent yet."""
+import os
+import threading
+import time
+from collections import deque
+from typing import BinaryIO, Callable, Deque, Iterable, List, Optional, Tuple
+
+_SEGMENT_SUFFIX = '.seg'
+
+
+class DiskSpool:
+    """An append-only store of encoded events, split into segment files.
+
+    Records are single-line encoded events (JSON without a trailing newline).
+    They are appended with buffered writes to the newest segment, which is
+    fsynced at most every ``fsync_interval`` seconds and rotated once it reaches
+    ``segment_bytes``. When the spool grows beyond ``max_bytes`` the oldest
+    segments are deleted. Segments left behind by a previous process are picked
+    up and replayed as well.
+    """
+
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MiB
+    DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024  # 4 MiB
+    DEFAULT_FSYNC_INTERVAL = 1.0  # 1 second
+    WRITE_BUFFER_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        """Open or create a spool directory.
+
+        Args:
+            directory: Directory holding the segment files; created if missing
+            max_bytes: Maximum total size of all segments (optional, default: 64 MiB)
+            segment_bytes: Size at which a segment is closed and a new one started
+                (optional, default: 4 MiB)
+            fsync_interval: Maximum number of seconds between fsyncs of appended
+                records (optional, default: 1.0)
+
+        Raises:
+            ValueError: If segment_bytes is not positive or exceeds max_bytes
+        """
+        if segment_bytes <= 0:
+            raise ValueError("segment_bytes must be positive")
+        if max_bytes < segment_bytes:
+            raise ValueError("max_bytes must be at least segment_bytes")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.evicted_bytes = 0
+        self._lock = threading.Lock()
+        # (sequence number, size in bytes) of closed segments, oldest first
+        self._segments: Deque[Tuple[int, int]] = deque()
+        self._active: Optional[BinaryIO] = None
+        self._active_seq = 0
+        self._active_size = 0
+        self._last_fsync = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(_SEGMENT_SUFFIX):
+                continue
+            try:
+                seq = int(name[:-len(_SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            self._segments.append((seq, os.path.getsize(self._path(seq))))
+        self._active_seq = self._segments[-1][0] + 1 if self._segments else 0
+
+    @property
+    def size(self) -> int:
+        """Total number of bytes currently held in the spool."""
+        with self._lock:
+            return sum(size for _, size in self._segments) + self._active_size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def append(self, records: Iterable[bytes]) -> None:
+        """Append encoded records to the spool, evicting the oldest data if it is full."""
+        with self._lock:
+            for record in records:
+                if self._active is None:
+                    self._active = open(
+                        self._path(self._active_seq), 'ab', buffering=self.WRITE_BUFFER_SIZE
+                    )
+                self._active.write(record + b'\n')
+                self._active_size += len(record) + 1
+                if self._active_size >= self.segment_bytes:
+                    self._rotate()
+            self._evict()
+            if (
+                self._active is not None
+                and time.monotonic() - self._last_fsync >= self.fsync_interval
+            ):
+                self._sync()
+
+    def replay(self, send: Callable[[List[bytes]], None], batch_size: int = 500) -> int:
+        """Hand spooled records to ``send`` in batches, oldest first.
+
+        Records are removed from the spool once ``send`` returns. If ``send``
+        raises, replay stops and the unsent records stay in the spool.
+
+        Args:
+            send: Callable that delivers a batch of encoded records or raises
+            batch_size: Maximum number of records per ``send`` call (default: 500)
+
+        Returns:
+            The number of records delivered
+        """
+        with self._lock:
+            if self._active_size:
+                self._rotate()
+            pending = [seq for seq, _ in self._segments]
+
+        delivered = 0
+        for seq in pending:
+            try:
+                with open(self._path(seq), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue  # evicted while we were replaying earlier segments
+
+            # A crash mid-write can leave a partial last line; it is discarded.
+            records = data.split(b'\n')[:-1]
+            for start in range(0, len(records), batch_size):
+                try:
+                    send(records[start:start + batch_size])
+                except Exception:
+                    self._truncate_segment(seq, records[start:])
+                    raise
+                delivered += len(records[start:start + batch_size])
+            self._remove_segment(seq)
+        return delivered
+
+    def flush(self) -> None:
+        """Write buffered records to disk and fsync them."""
+        with self._lock:
+            if self._active is not None:
+                self._sync()
+
+    def close(self) -> None:
+        """Flush buffered records and close the active segment."""
+        with self._lock:
+            if self._active is not None:
+                self._sync()
+                self._active.close()
+                self._active = None
+
+    def _before_fork(self) -> None:
+        # Empty the write buffer so the child's copy has nothing to flush twice.
+        self.flush()
+
+    def _abandon(self) -> None:
+        """Drop the inherited file handle in a forked child; the parent owns the spool."""
+        self._lock = threading.Lock()
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{_SEGMENT_SUFFIX}")
+
+    def _sync(self) -> None:
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self) -> None:
+        if self._active is not None:
+            self._sync()
+            self._active.close()
+            self._active = None
+        self._segments.append((self._active_seq, self._active_size))
+        self._active_seq += 1
+        self._active_size = 0
+
+    def _evict(self) -> None:
+        total = sum(size for _, size in self._segments) + self._active_size
+        while self._segments and total > self.max_bytes:
+            seq, size = self._segments.popleft()
+            try:
+                os.remove(self._path(seq))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted_bytes += size
+
+    def _segment_index(self, seq: int) -> Optional[int]:
+        for i, (spooled_seq, _) in enumerate(self._segments):
+            if spooled_seq == seq:
+                return i
+        return None
+
+    def _remove_segment(self, seq: int) -> None:
+        with self._lock:
+            index = self._segment_index(seq)
+            if index is None:
+                return  # already evicted
+            del self._segments[index]
+            try:
+                os.remove(self._path(seq))
+            except FileNotFoundError:
+                pass
+
+    def _truncate_segment(self, seq: int, remaining: List[bytes]) -> None:
+        data = b''.join(record + b'\n' for record in remaining)
+        with self._lock:
+            index = self._segment_index(seq)
+            if index is None:
+                return  # already evicted
+            tmp_path = self._path(seq) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path(seq))
+            self._segments[index] = (seq, len(data))
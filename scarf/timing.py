@@ -0,0 +1,163 @@
+"""Timing of code blocks and functions as duration events."""
+import functools
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, TypeVar
+
+if TYPE_CHECKING:
+    from .aggregation import EventAggregator
+    from .event_logger import ScarfEventLogger
+    from .sampling import Sampler
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+_CO_COROUTINE = 0x80  # inspect.CO_COROUTINE, without importing inspect
+
+
+class Timer:
+    """Time a block or function and log how long it took; see ``ScarfEventLogger.timed``.
+
+    Sampling is decided when timing starts, with the logger's sampler applied
+    to the timer's ``event`` and properties: a call that is sampled out, or
+    made while analytics are disabled, is not timed at all and costs little
+    more than the sampling decision.
+
+    A timer used as a context manager times one block at a time. Use a new
+    ``timed()`` call per block, or the decorator, to time code running
+    concurrently in several threads or tasks.
+    """
+
+    __slots__ = (
+        'logger', 'name', 'properties', 'aggregator', '_dims', '_sampler', '_weight', '_start',
+    )
+
+    def __init__(
+        self,
+        logger: 'ScarfEventLogger',
+        name: str,
+        properties: Dict[str, Any],
+        aggregator: Optional['EventAggregator'] = None,
+    ):
+        self.logger = logger
+        self.name = name
+        self.properties = {'event': name, **properties}
+        self.aggregator = aggregator
+        self._dims = dict(properties)
+        self._sampler: Optional['Sampler'] = None
+        self._weight: Optional[float] = None
+        self._start = 0
+
+    def __enter__(self) -> 'Timer':
+        self._sampler, self._weight = self._sample()
+        if self._weight is not None:
+            self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._weight is not None:
+            self._record(
+                time.perf_counter_ns() - self._start, exc_type, self._weight, self._sampler
+            )
+
+    async def __aenter__(self) -> 'Timer':
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func: F) -> F:
+        # The sampling decision is inlined: it is all a skipped call pays for.
+        logger, properties, record = self.logger, self.properties, self._record
+        perf_counter_ns = time.perf_counter_ns
+
+        code = getattr(func, '__code__', None)
+        if code is not None and code.co_flags & _CO_COROUTINE:
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                config = logger.config
+                if not config.enabled:
+                    return await func(*args, **kwargs)
+                sampler = config.sampler
+                weight = 1.0
+                if sampler is not None:
+                    weight = sampler.sample(properties)
+                    if weight is None:
+                        logger.metrics.add('events_sampled_out')
+                        return await func(*args, **kwargs)
+                start = perf_counter_ns()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    record(perf_counter_ns() - start, type(e), weight, sampler)
+                    raise
+                record(perf_counter_ns() - start, None, weight, sampler)
+                return result
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            config = logger.config
+            if not config.enabled:
+                return func(*args, **kwargs)
+            sampler = config.sampler
+            weight = 1.0
+            if sampler is not None:
+                weight = sampler.sample(properties)
+                if weight is None:
+                    logger.metrics.add('events_sampled_out')
+                    return func(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                record(perf_counter_ns() - start, type(e), weight, sampler)
+                raise
+            record(perf_counter_ns() - start, None, weight, sampler)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    def _sample(self) -> Tuple[Optional['Sampler'], Optional[float]]:
+        config = self.logger.config
+        if not config.enabled:
+            return None, None
+        sampler = config.sampler
+        if sampler is None:
+            return None, 1.0
+        weight = sampler.sample(self.properties)
+        if weight is None:
+            self.logger.metrics.add('events_sampled_out')
+        return sampler, weight
+
+    def _record(
+        self,
+        elapsed_ns: int,
+        exc_type: Optional[type],
+        weight: float,
+        sampler: Optional['Sampler'],
+    ) -> None:
+        # The sampler that made the decision is passed in: a config reload may
+        # have replaced or removed the logger's sampler since.
+        duration_ms = elapsed_ns / 1e6
+        if self.aggregator is not None:
+            dims = self._dims
+            if exc_type is not None:
+                dims = {**dims, 'error': exc_type.__name__}
+            self.aggregator.observe(self.name, duration_ms, dims)
+            return
+
+        logger = self.logger
+        if not logger.config.enabled:
+            return
+        properties = {**self.properties, 'duration_ms': duration_ms}
+        if exc_type is not None:
+            properties['error'] = exc_type.__name__
+        if weight != 1.0:
+            properties[sampler.weight_key] = weight
+        try:
+            logger._log_sampled(properties, None)
+        except Exception as e:
+            # Failing to report a duration must not fail the timed code.
+            if logger.verbose:
+                print(f"\nFailed to send timing {self.name!r}:")
+                print(f"  {type(e).__name__}: {str(e)}")
@@ -0,0 +1,296 @@
+"""Transports that deliver encoded event payloads over HTTP."""
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+from . import fork
+from .exceptions import HTTPStatusError, TransportError
+
+if TYPE_CHECKING:
+    import http.client
+
+    import requests
+
+
+class TransportResponse:
+    """The parts of an HTTP response the loggers look at."""
+
+    __slots__ = ('status_code', 'headers', 'content', 'url')
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Optional[Mapping[str, str]] = None,
+        content: bytes = b'',
+        url: str = '',
+    ):
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', 'replace')
+
+
+class Transport:
+    """Base class for transports.
+
+    ``send`` POSTs an already encoded body and returns an object with
+    ``status_code``, ``headers``, ``text`` and ``url`` attributes. It must
+    raise if the request fails or the response status is not a success, and
+    be safe to call from several threads at once.
+    """
+
+    def send(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any pooled connections."""
+
+    def _after_fork_in_child(self) -> None:
+        """Drop state shared with the parent process; see ``scarf.fork``."""
+
+
+class RequestsTransport(Transport):
+    """Send with a ``requests.Session``, raising ``requests`` exceptions on failure.
+
+    This is the default transport, and the only one that honours proxy and
+    certificate settings from the environment the way ``requests`` does.
+    The session keeps up to ``pool_size`` idle connections per origin;
+    threads sending beyond that open connections that are closed after use.
+    """
+
+    DEFAULT_POOL_SIZE = 10  # as in requests
+
+    def __init__(self, user_agent: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE):
+        """Initialize the transport; the session is created on first use.
+
+        Args:
+            user_agent: User-Agent header set on the session (optional)
+            pool_size: Maximum number of idle connections kept per origin; size
+                it for the number of threads sending at once (default: 10)
+
+        Raises:
+            ValueError: If pool_size is less than 1
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.user_agent = user_agent
+        self.pool_size = pool_size
+        self._session: Optional['requests.Session'] = None
+        self._lock = threading.Lock()
+        fork.register(self)
+
+    @property
+    def session(self) -> 'requests.Session':
+        """The requests session used to send events, created on first use."""
+        session = self._session
+        if session is None:
+            with self._lock:
+                session = self._session
+                if session is None:
+                    import requests
+
+                    session = requests.Session()
+                    if self.pool_size != self.DEFAULT_POOL_SIZE:
+                        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size)
+                        session.mount('https://', adapter)
+                        session.mount('http://', adapter)
+                    if self.user_agent:
+                        session.headers.update({'User-Agent': self.user_agent})
+                    self._session = session
+        return session
+
+    def send(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> 'requests.Response':
+        response = self.session.post(url, data=body, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+    def _after_fork_in_child(self) -> None:
+        self._session = None
+        self._lock = threading.Lock()
+
+
+class HTTPClientTransport(Transport):
+    """A lean transport built on ``http.client`` with persistent connections.
+
+    Up to ``pool_size`` idle keep-alive connections are kept per origin.
+    Concurrent sends beyond that open extra connections, which are closed
+    after use. Failures raise ``TransportError``, and non-success statuses
+    raise ``HTTPStatusError``.
+    """
+
+    DEFAULT_POOL_SIZE = 4
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        """Initialize the transport.
+
+        Args:
+            pool_size: Maximum number of idle connections kept per origin (default: 4)
+
+        Raises:
+            ValueError: If pool_size is less than 1
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pools: Dict[Tuple[str, str, int], Deque['http.client.HTTPConnection']] = {}
+        self._ssl_context = None
+        fork.register(self)
+
+    def send(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> TransportResponse:
+        import http.client
+        import socket
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme!r}")
+        origin = (parts.scheme, parts.hostname or '', parts.port or (
+            443 if parts.scheme == 'https' else 80
+        ))
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+        while True:
+            conn, reused = self._acquire(origin, timeout)
+            try:
+                conn.request('POST', path, body=body, headers=dict(headers))
+                response = conn.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                conn.close()
+                if reused:
+                    continue  # the server closed an idle keep-alive connection
+                raise TransportError(str(e) or type(e).__name__) from e
+            except socket.timeout as e:
+                conn.close()
+                raise TransportError(f"Request timed out after {timeout}s") from e
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise TransportError(str(e) or type(e).__name__) from e
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(origin, conn)
+
+            response_headers = dict(response.getheaders())
+            if not 200 <= response.status < 300:
+                raise HTTPStatusError(response.status, response_headers, content)
+            return TransportResponse(response.status, response_headers, content, url)
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+    def _after_fork_in_child(self) -> None:
+        # Don't close the inherited sockets: the parent is still using them.
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _acquire(
+        self,
+        origin: Tuple[str, str, int],
+        timeout: float,
+    ) -> Tuple['http.client.HTTPConnection', bool]:
+        with self._lock:
+            pool = self._pools.get(origin)
+            if pool:
+                conn = pool.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+
+        import http.client
+
+        scheme, host, port = origin
+        if scheme == 'https':
+            if self._ssl_context is None:
+                import ssl
+
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context
+            ), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _release(self, origin: Tuple[str, str, int], conn: 'http.client.HTTPConnection'):
+        with self._lock:
+            pool = self._pools.setdefault(origin, deque())
+            if len(pool) < self.pool_size:
+                pool.append(conn)
+                return
+        conn.close()
+
+
+class InMemoryTransport(Transport):
+    """Record payloads instead of sending them, for tests and benchmarks.
+
+    Every call is appended to ``requests`` as ``(url, body, headers)``, and
+    answered with ``status_code``; non-success statuses raise
+    ``HTTPStatusError`` like a real endpoint would.
+    """
+
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.requests: List[Tuple[str, bytes, Dict[str, str]]] = []
+        self._lock = threading.Lock()
+
+    def send(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> TransportResponse:
+        with self._lock:
+            self.requests.append((url, body, dict(headers)))
+        if not 200 <= self.status_code < 300:
+            raise HTTPStatusError(self.status_code)
+        return TransportResponse(self.status_code, url=url)
+
+
+class NullTransport(Transport):
+    """Discard every payload and report success; the cheapest possible transport."""
+
+    _RESPONSE = TransportResponse(204)
+
+    def send(
+        self,
+        url: str,
+        body: bytes,
+        headers: Mapping[str, str],
+        timeout: float,
+    ) -> TransportResponse:
+        return self._RESPONSE
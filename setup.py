@@ -28,11 +28,19 @@ setup(
     install_requires=[
         "requests>=2.25.0",
     ],
+    entry_points={
+        "console_scripts": [
+            "scarf=scarf.cli:main",
+        ],
+    },
     extras_require={
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
             "ruff>=0.1.0",
         ],
+        "fast": [
+            "orjson>=3.6.0",
+        ],
     },
 )
@@ -0,0 +1,74 @@
+"""A local HTTP server standing in for a Scarf endpoint in tests."""
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubScarfServer:
+    """Record every POST it receives and answer with a fixed status code.
+
+    Use as a context manager; ``url`` is valid while the server is running.
+    """
+
+    def __init__(self, status: int = 200, delay: float = 0.0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.clients = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/events"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def events(self):
+        """Return every event received so far, decoding batched NDJSON bodies."""
+        events = []
+        with self._lock:
+            received = list(self.requests)
+        for headers, body in received:
+            if headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            if headers.get('Content-Type') == 'application/x-ndjson':
+                events.extend(json.loads(line) for line in body.splitlines() if line)
+            else:
+                events.append(json.loads(body))
+        return events
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                with stub._lock:
+                    stub.requests.append((dict(self.headers), body))
+                    stub.clients.add(self.client_address)
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
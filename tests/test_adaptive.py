@@ -0,0 +1,147 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from scarf import ScarfEventLogger
+from scarf.adaptive import AdaptiveController
+from scarf.dispatcher import BackgroundDispatcher
+from scarf.exceptions import HTTPStatusError, TransportError
+from scarf.transport import Transport, TransportResponse
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+def attached(controller, backlog=0, **settings):
+    """Attach the controller to a dispatcher that has ``backlog`` items queued."""
+    dispatcher = BackgroundDispatcher(lambda batch: None, **settings)
+    dispatcher._queue.extend(range(backlog))
+    controller.attach(dispatcher)
+    return dispatcher
+
+
+class TestAdaptiveController(unittest.TestCase):
+
+    def test_attach_clamps_settings(self):
+        """Test that the dispatcher starts from its own settings within the bounds."""
+        controller = AdaptiveController(min_batch_size=10, max_linger=0.5, min_concurrency=2)
+        dispatcher = attached(controller, batch_size=1, linger=2.0)
+        self.assertEqual(
+            (dispatcher.batch_size, dispatcher.linger, dispatcher.concurrency), (10, 0.5, 2)
+        )
+
+    def test_backlog_increases_additively(self):
+        """Test that fast sends with a backlog grow the batch and about one request per round."""
+        controller = AdaptiveController(max_batch_size=100, max_concurrency=4)
+        dispatcher = attached(controller, backlog=1000, batch_size=10, linger=0.4)
+        controller.record(0.01)
+        self.assertEqual((dispatcher.batch_size, dispatcher.concurrency), (12, 2))
+        self.assertEqual(dispatcher.linger, 0.2)
+        controller.record(0.01)  # half a round at concurrency 2
+        self.assertEqual(dispatcher.concurrency, 2)
+        for _ in range(20):
+            controller.record(0.01)
+        self.assertEqual((dispatcher.batch_size, dispatcher.concurrency), (100, 4))
+
+    def test_idle_queue_lingers_longer(self):
+        """Test that when the queue keeps up, the linger grows back to its maximum."""
+        controller = AdaptiveController(max_linger=1.0)
+        dispatcher = attached(controller, linger=0.0)
+        for _ in range(10):
+            controller.record(0.01)
+        self.assertEqual(dispatcher.linger, 1.0)
+        self.assertEqual(controller.increases, 0)
+
+    def test_overload_decreases_multiplicatively_once_per_window(self):
+        """Test that slow or failed requests halve concurrency and batch size once per window."""
+        controller = AdaptiveController(max_concurrency=8, target_latency=0.5)
+        dispatcher = attached(controller, batch_size=100, concurrency=8)
+        with patch('scarf.adaptive.time.monotonic', return_value=100.0) as clock:
+            controller.record(2.0)
+            controller.record(0.1, TransportError("timed out"))  # same window
+            self.assertEqual((dispatcher.batch_size, dispatcher.concurrency), (50, 4))
+            clock.return_value = 101.0
+            controller.record(0.1, HTTPStatusError(503))
+        self.assertEqual((dispatcher.batch_size, dispatcher.concurrency), (25, 2))
+        self.assertEqual(controller.decreases, 2)
+        self.assertGreater(controller.error_rate, 0)
+
+    def test_throttling_sends_fewer_larger_requests(self):
+        """Test that a 429 halves concurrency but grows the batch size and linger."""
+        controller = AdaptiveController(max_concurrency=8)
+        dispatcher = attached(controller, batch_size=100, linger=0.1, concurrency=8)
+        controller.record(0.05, HTTPStatusError(429))
+        self.assertEqual(
+            (dispatcher.batch_size, dispatcher.linger, dispatcher.concurrency), (200, 0.2, 4)
+        )
+        self.assertEqual(controller.state()['throttled'], 1)
+
+    def test_client_errors_are_ignored(self):
+        """Test that errors caused by the request itself don't change the settings."""
+        controller = AdaptiveController()
+        dispatcher = attached(controller, batch_size=100)
+        controller.record(5.0, HTTPStatusError(400))
+        self.assertEqual(dispatcher.batch_size, 100)
+
+    def test_invalid_bounds(self):
+        """Test that inconsistent bounds are rejected."""
+        for kwargs in (
+            {'min_batch_size': 0},
+            {'min_batch_size': 10, 'max_batch_size': 5},
+            {'min_linger': 2.0, 'max_linger': 1.0},
+            {'max_concurrency': 0},
+            {'target_latency': 0},
+        ):
+            with self.assertRaises(ValueError, msg=kwargs):
+                AdaptiveController(**kwargs)
+
+
+class ConcurrencyTransport(Transport):
+    """Record the largest number of concurrent sends."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def send(self, url, body, headers, timeout):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.events += body.count(b'\n')
+        return TransportResponse(204, {}, b'', url)
+
+
+class TestAdaptiveLogger(unittest.TestCase):
+
+    def test_backlog_raises_concurrency(self):
+        """Test that a backed-up logger sends several batches at once and reports its state."""
+        transport = ConcurrencyTransport(delay=0.02)
+        controller = AdaptiveController(max_batch_size=20, max_concurrency=4)
+        logger = ScarfEventLogger(
+            ENDPOINT, transport=transport, background=True, compress=False, adaptive=controller
+        )
+        for i in range(2000):
+            logger.log_event({'n': i})
+        self.assertTrue(logger.close(10))  # waits for every worker, however many started
+
+        self.assertEqual(transport.events, 2000)
+        self.assertGreater(transport.peak, 1)
+        self.assertLessEqual(transport.peak, 4)
+        state = logger.stats()['adaptive']
+        self.assertEqual(state['batch_size'], 20)
+        self.assertGreater(state['increases'], 0)
+
+    def test_requires_background(self):
+        """Test that adaptive tuning is rejected without background delivery."""
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(ENDPOINT, adaptive=AdaptiveController())
+
+
+if __name__ == '__main__':
+    unittest.main()
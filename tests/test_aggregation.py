@@ -0,0 +1,103 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from scarf import EventAggregator
+
+
+class TestEventAggregator(unittest.TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+        self.logger.log_event.return_value = True
+        self.logger.verbose = False
+
+    def sent(self):
+        return [call.args[0] for call in self.logger.log_event.call_args_list]
+
+    def test_counters_fold_by_dimensions(self):
+        """Test that increments with equal dimensions become one summary event."""
+        aggregator = EventAggregator(self.logger)
+        for _ in range(1000):
+            aggregator.increment('download', {'os': 'linux', 'arch': 'x86_64'})
+        aggregator.increment('download', {'arch': 'x86_64', 'os': 'linux'}, n=5)
+        aggregator.increment('download', {'os': 'macOS'})
+
+        self.assertEqual(aggregator.flush(), 2)
+        self.assertCountEqual(self.sent(), [
+            {'event': 'download', 'arch': 'x86_64', 'os': 'linux',
+             'aggregate': 'counter', 'count': 1005},
+            {'event': 'download', 'os': 'macOS', 'aggregate': 'counter', 'count': 1},
+        ])
+
+    def test_observations_are_summarized(self):
+        """Test that observed values are reduced to count, sum, min and max."""
+        aggregator = EventAggregator(self.logger)
+        for value in (3, 1, 4, 1, 5):
+            aggregator.observe('latency', value, {'route': '/'})
+
+        aggregator.flush()
+        self.assertEqual(self.sent(), [{
+            'event': 'latency', 'route': '/', 'aggregate': 'summary',
+            'count': 5, 'sum': 14, 'min': 1, 'max': 5,
+        }])
+
+    def test_flush_resets_state(self):
+        """Test that each flush only reports what was recorded since the last one."""
+        aggregator = EventAggregator(self.logger)
+        aggregator.increment('x')
+        aggregator.flush()
+        self.assertEqual(aggregator.flush(), 0)
+        self.assertEqual(self.logger.log_event.call_count, 1)
+
+    def test_cardinality_overflow(self):
+        """Test that calls for keys beyond max_keys are counted by one overflow key."""
+        aggregator = EventAggregator(self.logger, max_keys=2)
+        for user in range(10):
+            aggregator.increment('login', {'user': user})
+
+        aggregator.flush()
+        self.assertEqual(aggregator.overflowed, 8)
+        self.assertIn({'event': 'overflow', 'aggregate': 'counter', 'count': 8}, self.sent())
+
+    def test_overflow_bounds_distinct_names(self):
+        """Test that many distinct names never grow the table past max_keys + 1."""
+        aggregator = EventAggregator(self.logger, max_keys=10)
+        for i in range(10000):
+            aggregator.increment(f'counter-{i}')
+            aggregator.observe(f'summary-{i}', i)
+
+        self.assertEqual(len(aggregator._counters) + len(aggregator._summaries), 11)
+        self.assertEqual(aggregator.overflowed, 19990)
+        self.assertEqual(aggregator.flush(), 11)
+
+    def test_send_failures_are_counted(self):
+        """Test that a failing logger doesn't stop the remaining summaries."""
+        self.logger.log_event.side_effect = [RuntimeError("down"), True]
+        aggregator = EventAggregator(self.logger)
+        aggregator.increment('a')
+        aggregator.increment('b')
+
+        self.assertEqual(aggregator.flush(), 1)
+        self.assertEqual(aggregator.failed, 1)
+
+    def test_periodic_flush(self):
+        """Test that the background thread flushes every flush_interval."""
+        aggregator = EventAggregator(self.logger, flush_interval=0.05)
+        aggregator.increment('tick')
+        for _ in range(100):
+            if self.logger.log_event.called:
+                break
+            time.sleep(0.01)
+        aggregator.close()
+        self.assertEqual(self.sent()[0]['count'], 1)
+
+    def test_invalid_arguments(self):
+        """Test that invalid settings are rejected."""
+        with self.assertRaises(ValueError):
+            EventAggregator(self.logger, flush_interval=0)
+        with self.assertRaises(ValueError):
+            EventAggregator(self.logger, max_keys=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
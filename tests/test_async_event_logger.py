@@ -0,0 +1,95 @@
+import asyncio
+import os
+import unittest
+
+from scarf import AsyncScarfEventLogger, HTTPStatusError, TransportError
+
+from .stub_server import StubScarfServer
+
+
+class TestAsyncScarfEventLogger(unittest.IsolatedAsyncioTestCase):
+    DEFAULT_ENDPOINT = "https://scarf.sh/api/v1"
+
+    def setUp(self):
+        """Clear analytics environment variables before each test."""
+        self.original_env = {
+            var: os.environ.pop(var, None)
+            for var in ['DO_NOT_TRACK', 'SCARF_NO_ANALYTICS', 'SCARF_VERBOSE']
+        }
+
+    def tearDown(self):
+        """Restore original environment variables after each test."""
+        for var, value in self.original_env.items():
+            if value is not None:
+                os.environ[var] = value
+            else:
+                os.environ.pop(var, None)
+
+    def test_initialization(self):
+        """Test that the async logger mirrors the sync constructor options."""
+        logger = AsyncScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT + '/')
+        self.assertEqual(logger.endpoint_url, self.DEFAULT_ENDPOINT)
+        self.assertEqual(logger.timeout, AsyncScarfEventLogger.DEFAULT_TIMEOUT)
+        self.assertFalse(logger.verbose)
+        self.assertTrue(logger.headers['User-Agent'].startswith('scarf-py/'))
+
+    def test_initialization_validation(self):
+        """Test that invalid constructor arguments are rejected."""
+        with self.assertRaises(ValueError):
+            AsyncScarfEventLogger(endpoint_url="")
+        with self.assertRaises(ValueError):
+            AsyncScarfEventLogger(endpoint_url="ftp://scarf.sh")
+        with self.assertRaises(ValueError):
+            AsyncScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, max_concurrency=0)
+
+    async def test_log_event(self):
+        """Test that an event is POSTed as JSON with the extended User-Agent."""
+        with StubScarfServer() as server:
+            async with AsyncScarfEventLogger(endpoint_url=server.url) as logger:
+                self.assertTrue(await logger.log_event({'event': 'test', 'n': 1}))
+
+            self.assertEqual(server.events(), [{'event': 'test', 'n': 1}])
+            headers, _ = server.requests[0]
+            self.assertEqual(headers['User-Agent'], logger.headers['User-Agent'])
+            self.assertEqual(headers['Content-Type'], 'application/json')
+
+    async def test_concurrent_sends_reuse_pooled_connections(self):
+        """Test that concurrent sends stay within the pool size and reuse connections."""
+        with StubScarfServer() as server:
+            async with AsyncScarfEventLogger(
+                endpoint_url=server.url, max_concurrency=4
+            ) as logger:
+                results = await asyncio.gather(
+                    *(logger.log_event({'i': i}) for i in range(200))
+                )
+
+            self.assertTrue(all(results))
+            self.assertEqual(sorted(e['i'] for e in server.events()), list(range(200)))
+            self.assertLessEqual(len(server.clients), 4)
+
+    async def test_do_not_track(self):
+        """Test that disabled analytics skip the request entirely."""
+        os.environ['DO_NOT_TRACK'] = '1'
+        with StubScarfServer() as server:
+            async with AsyncScarfEventLogger(endpoint_url=server.url) as logger:
+                self.assertFalse(await logger.log_event({'event': 'test'}))
+            self.assertEqual(server.requests, [])
+
+    async def test_error_status(self):
+        """Test that a non-success status raises HTTPStatusError."""
+        with StubScarfServer(status=503) as server:
+            async with AsyncScarfEventLogger(endpoint_url=server.url) as logger:
+                with self.assertRaises(HTTPStatusError) as ctx:
+                    await logger.log_event({'event': 'test'})
+            self.assertEqual(ctx.exception.status_code, 503)
+
+    async def test_timeout(self):
+        """Test that a slow endpoint raises TransportError after the timeout."""
+        with StubScarfServer(delay=1.0) as server:
+            async with AsyncScarfEventLogger(endpoint_url=server.url) as logger:
+                with self.assertRaises(TransportError):
+                    await logger.log_event({'event': 'test'}, timeout=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
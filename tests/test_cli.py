@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from scarf import cli
+
+from .stub_server import StubScarfServer
+
+
+class TestSend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'events.ndjson')
+        self.checkpoint = os.path.join(self.tmp, 'events.ckpt')
+        self.failed = os.path.join(self.tmp, 'events.failed')
+
+    def write(self, lines):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(''.join(line + '\n' for line in lines))
+
+    def send(self, url, *options):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            status = cli.main(['send', '--endpoint', url, self.path, '--quiet', *options])
+        return status, stderr.getvalue()
+
+    def test_sends_every_event_in_batches(self):
+        """Test that every line is sent once, in batches of the requested size."""
+        events = [{'event': 'download', 'n': i} for i in range(1050)]
+        self.write(json.dumps(event) for event in events)
+        with StubScarfServer() as server:
+            status, _ = self.send(
+                server.url, '--batch-size', '100', '--concurrency', '4',
+                '--checkpoint', self.checkpoint,
+            )
+            received = server.events()
+
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(received, key=lambda e: e['n']), events)
+        self.assertEqual(len(server.requests), 11)
+        with open(self.checkpoint, encoding='utf-8') as f:
+            state = json.load(f)
+        self.assertEqual(state['offset'], os.path.getsize(self.path))
+        self.assertEqual((state['sent'], state['failed']), (1050, 0))
+
+    def test_invalid_and_failed_lines_go_to_failed_file(self):
+        """Test that lines that are not events, or could not be sent, are written aside."""
+        self.write(['{"event": "ok"}', 'not json', '[1, 2]', '', '{"event": "ok"}'])
+        with StubScarfServer() as server:
+            status, _ = self.send(server.url, '--failed', self.failed)
+        self.assertEqual(status, 1)
+        self.assertEqual(server.events(), [{'event': 'ok'}, {'event': 'ok'}])
+        with open(self.failed, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['not json', '[1, 2]'])
+
+        with StubScarfServer(status=500) as server:
+            status, _ = self.send(server.url, '--failed', self.failed, '--retries', '1')
+        self.assertEqual(status, 1)
+        with open(self.failed, encoding='utf-8') as f:
+            self.assertEqual(
+                f.read().splitlines(),
+                ['not json', '[1, 2]', 'not json', '[1, 2]', '{"event": "ok"}', '{"event": "ok"}'],
+            )
+
+    def test_resumes_from_checkpoint(self):
+        """Test that a rerun skips the lines recorded in the checkpoint."""
+        self.write(json.dumps({'n': i}) for i in range(10))
+        with open(self.path, 'rb') as f:
+            offset = len(b''.join(f.readlines()[:6]))
+        cli.Checkpoint(self.checkpoint, self.path).save(offset, 6, 0)
+
+        with StubScarfServer() as server:
+            status, _ = self.send(server.url, '--checkpoint', self.checkpoint)
+        self.assertEqual(status, 0)
+        self.assertEqual(server.events(), [{'n': i} for i in range(6, 10)])
+        with open(self.checkpoint, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['sent'], 10)
+
+    def test_rejects_checkpoint_of_another_file(self):
+        self.write(['{"event": "ok"}'])
+        cli.Checkpoint(self.checkpoint, os.path.join(self.tmp, 'other.ndjson')).save(0, 0, 0)
+        status, stderr = self.send('http://127.0.0.1:9/events', '--checkpoint', self.checkpoint)
+        self.assertEqual(status, 2)
+        self.assertIn('belongs to', stderr)
+
+    def test_rejects_invalid_options(self):
+        with redirect_stderr(io.StringIO()):
+            for argv in (
+                ['send', '--endpoint', 'http://x', '-', '--checkpoint', self.checkpoint],
+                ['send', '--endpoint', 'http://x', self.path, '--concurrency', '0'],
+                ['send', self.path],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    cli.main(argv)
+                self.assertEqual(cm.exception.code, 2)
+
+
+class TestReadBatches(unittest.TestCase):
+
+    def test_batches_carry_byte_offsets(self):
+        """Test that each batch spans the bytes of its lines, skipping blank lines."""
+        data = b'{"a":1}\n\n{"b":2}\n{"c":3}\n\n'
+        batches = list(cli.read_batches(io.BytesIO(data), 0, 2, 1 << 20))
+        self.assertEqual(batches, [
+            (0, 17, [b'{"a":1}', b'{"b":2}']),
+            (17, 26, [b'{"c":3}']),
+        ])
+
+    def test_splits_batches_at_max_bytes(self):
+        data = b'{"a":1}\n' * 4
+        batches = list(cli.read_batches(io.BytesIO(data), 100, 10, 16))
+        self.assertEqual([(start, end, len(lines)) for start, end, lines in batches], [
+            (100, 116, 2),
+            (116, 132, 2),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from scarf import ScarfEventLogger
+from scarf.collector import ScarfCollector, spawn_collector
+
+from .stub_server import StubScarfServer
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestScarfCollector(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, 'scarf.sock')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_workers_send_through_collector(self):
+        """Test that events handed to the collector socket are batched upstream."""
+        with StubScarfServer() as server:
+            upstream = ScarfEventLogger(server.url, background=True, batch_size=100, linger=0.05)
+            collector = ScarfCollector(self.socket_path, upstream)
+            collector.start()
+
+            worker = ScarfEventLogger(server.url, collector_socket=self.socket_path)
+            for i in range(50):
+                self.assertTrue(worker.log_event({'i': i}))
+
+            self.assertTrue(wait_for(lambda: collector.received == 50))
+            self.assertTrue(collector.close(timeout=5))
+            self.assertEqual(sorted(e['i'] for e in server.events()), list(range(50)))
+            self.assertLess(len(server.requests), 50)
+            self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_socket_file_appears_once_listening(self):
+        """Test that the socket path accepts connections as soon as it exists."""
+        upstream = ScarfEventLogger("https://scarf.sh/api/v1", background=True)
+        with open(self.socket_path, 'w'):
+            pass  # a stale file from an earlier run
+        collector = ScarfCollector(self.socket_path, upstream)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['scarf.sock'])
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+        collector.close(timeout=5)
+
+    def test_missing_collector_drops_event(self):
+        """Test that logging without a running collector returns False instead of raising."""
+        worker = ScarfEventLogger("https://scarf.sh/api/v1", collector_socket=self.socket_path)
+        self.assertFalse(worker.log_event({'event': 'test'}))
+
+    def test_collector_cannot_be_combined_with_background(self):
+        """Test that collector mode and background mode are mutually exclusive."""
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(
+                "https://scarf.sh/api/v1", background=True, collector_socket=self.socket_path
+            )
+
+    def test_spawned_collector_process(self):
+        """Test that a collector process forwards events and flushes on terminate."""
+        with StubScarfServer() as server:
+            process = spawn_collector(self.socket_path, server.url, batch_size=10, linger=5.0)
+            worker = ScarfEventLogger(server.url, collector_socket=self.socket_path)
+            for i in range(3):
+                self.assertTrue(worker.log_event({'i': i}))
+
+            # Give the collector time to receive before asking it to stop.
+            time.sleep(0.2)
+            process.terminate()
+            process.join(10)
+            self.assertEqual(sorted(e['i'] for e in server.events()), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
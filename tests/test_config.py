@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from scarf import Sampler, ScarfEventLogger
+from scarf.config import Config, load_file, resolve
+from scarf.transport import InMemoryTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+CLEAN_ENV = {'DO_NOT_TRACK': '', 'SCARF_NO_ANALYTICS': '', 'SCARF_VERBOSE': ''}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@patch.dict(os.environ, CLEAN_ENV)
+class TestResolve(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'scarf.json')
+
+    def write(self, settings):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f)
+
+    def test_file_overrides_logger_settings(self):
+        self.write({'endpoint_url': 'https://eu.scarf.sh/', 'timeout': 1, 'verbose': True,
+                    'sampling': {'rate': 0.5}})
+        config = resolve(ENDPOINT, 3.0, False, None, self.path)
+        self.assertEqual(config.endpoint_url, 'https://eu.scarf.sh')
+        self.assertEqual(config.timeout, 1)
+        self.assertTrue(config.verbose)
+        self.assertTrue(config.enabled)
+        self.assertEqual(config.sampler.rate, 0.5)
+
+    def test_missing_file_overrides_nothing(self):
+        config = resolve(ENDPOINT, 3.0, None, None, self.path)
+        self.assertEqual((config.endpoint_url, config.timeout), (ENDPOINT, 3.0))
+        self.assertFalse(config.verbose)
+        self.assertTrue(config.enabled)
+
+    def test_environment(self):
+        """Test that DO_NOT_TRACK wins over the file and SCARF_VERBOSE is only a default."""
+        self.write({'enabled': True})
+        with patch.dict(os.environ, {'DO_NOT_TRACK': '1', 'SCARF_VERBOSE': 'true'}):
+            config = resolve(ENDPOINT, 3.0, None, None, self.path)
+            self.assertFalse(config.enabled)
+            self.assertTrue(config.verbose)
+            self.assertFalse(resolve(ENDPOINT, 3.0, False, None).verbose)
+
+    def test_invalid_files(self):
+        for content in ('{', '[]', '{"enable": false}', '{"timeout": "3"}',
+                        '{"enabled": 0}', '{"timeout": true}', '{"sampling": {"rat": 1}}'):
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            with self.assertRaises(ValueError, msg=content):
+                resolve(ENDPOINT, 3.0, None, None, self.path)
+
+    def test_load_file(self):
+        self.write({'enabled': False})
+        self.assertEqual(load_file(self.path), {'enabled': False})
+
+    def test_replace(self):
+        config = Config(ENDPOINT, 3.0)
+        changed = config.replace(enabled=False)
+        self.assertTrue(config.enabled)
+        self.assertFalse(changed.enabled)
+        self.assertEqual(changed.endpoint_url, ENDPOINT)
+
+
+@patch.dict(os.environ, CLEAN_ENV)
+class TestReload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'scarf.json')
+        self.transport = InMemoryTransport()
+
+    def write(self, settings):
+        # Write a new file rather than rewriting it in place, as deployment tools do.
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f)
+        os.replace(tmp_path, self.path)
+
+    def logger(self, **options):
+        logger = ScarfEventLogger(
+            ENDPOINT, transport=self.transport, config_path=self.path, **options
+        )
+        self.addCleanup(logger.close)
+        return logger
+
+    def test_reload_swaps_configuration(self):
+        logger = self.logger()
+        self.assertTrue(logger.log_event({'event': 'a'}))
+
+        self.write({'enabled': False})
+        self.assertTrue(logger.log_event({'event': 'b'}))  # not reloaded yet
+        self.assertFalse(logger.reload().enabled)
+        self.assertFalse(logger.log_event({'event': 'c'}))
+        self.assertFalse(logger.log_events([{'event': 'd'}]))
+
+        self.write({'endpoint_url': 'https://eu.scarf.sh/api/v1'})
+        logger.reload()
+        self.assertTrue(logger.log_event({'event': 'e'}))
+        self.assertEqual(
+            [url for url, _, _ in self.transport.requests],
+            [ENDPOINT, ENDPOINT, 'https://eu.scarf.sh/api/v1'],
+        )
+
+    def test_environment_is_read_on_reload(self):
+        logger = self.logger()
+        with patch.dict(os.environ, {'SCARF_NO_ANALYTICS': 'true'}):
+            self.assertTrue(logger.log_event({'event': 'a'}))
+            logger.reload()
+            self.assertFalse(logger.log_event({'event': 'b'}))
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_invalid_file_keeps_configuration(self):
+        self.write({'timeout': 1.5})
+        logger = self.logger()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"timeout": ')
+        with self.assertRaises(ValueError):
+            logger.reload()
+        self.assertEqual(logger.timeout, 1.5)
+
+    def test_assigned_settings_survive_reload(self):
+        logger = self.logger()
+        logger.timeout = 0.5
+        logger.sampler = Sampler(rate=0.0)
+        logger.reload()
+        self.assertEqual(logger.config.timeout, 0.5)
+        self.assertFalse(logger.log_event({'event': 'a'}))
+
+    def test_watched_file_is_reloaded(self):
+        logger = self.logger(watch_interval=0.02)
+        self.write({'enabled': False})
+        self.assertTrue(wait_for(lambda: not logger.config.enabled))
+        os.remove(self.path)
+        self.assertTrue(wait_for(lambda: logger.config.enabled))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGHUP'), "requires SIGHUP")
+    def test_sighup_reloads(self):
+        logger = self.logger(handle_sighup=True)
+        self.write({'enabled': False})
+        os.kill(os.getpid(), signal.SIGHUP)
+        self.assertTrue(wait_for(lambda: not logger.config.enabled))
+
+    def test_timing_is_skipped_while_disabled(self):
+        self.write({'enabled': False})
+        logger = self.logger()
+        calls = []
+        timed = logger.timed('op')(lambda: calls.append(1))
+        timed()
+        with logger.timed('block'):
+            pass
+        self.assertEqual(calls, [1])
+        self.assertEqual(self.transport.requests, [])
+
+    def test_invalid_watch_options(self):
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(ENDPOINT, watch_interval=1.0)
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(ENDPOINT, config_path=self.path, watch_interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from scarf import PayloadGuard, ScarfEventLogger
+from scarf.dedup import DedupCache
+from scarf.transport import InMemoryTransport, Transport
+
+from .test_shutdown import run_script
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+class FailingTransport(Transport):
+    def send(self, url, body, headers, timeout):
+        raise OSError("unreachable")
+
+
+class TestDedupCache(unittest.TestCase):
+
+    def test_repeats_are_suppressed_until_the_ttl_expires(self):
+        """Test that identical events pass once per TTL window."""
+        with patch('scarf.dedup.time.monotonic', return_value=100.0) as clock:
+            cache = DedupCache(ttl=60)
+            self.assertTrue(cache.check({'event': 'import', 'version': '1.0'}))
+            self.assertFalse(cache.check({'version': '1.0', 'event': 'import'}))
+            self.assertTrue(cache.check({'event': 'import', 'version': '1.1'}))
+
+            clock.return_value = 159.0
+            self.assertFalse(cache.check({'event': 'import', 'version': '1.0'}))
+            clock.return_value = 160.5
+            self.assertTrue(cache.check({'event': 'import', 'version': '1.0'}))
+            self.assertFalse(cache.check({'event': 'import', 'version': '1.0'}))
+
+    def test_key_subset(self):
+        """Test that only the configured keys identify an event."""
+        cache = DedupCache(keys=['event', 'package'])
+        self.assertTrue(cache.check({'event': 'run', 'package': 'a', 'pid': 1}))
+        self.assertFalse(cache.check({'event': 'run', 'package': 'a', 'pid': 2}))
+        self.assertTrue(cache.check({'event': 'run', 'package': 'b', 'pid': 2}))
+
+    def test_nested_values_are_canonical(self):
+        """Test that nested key order does not matter and odd values are handled."""
+        cache = DedupCache()
+        self.assertTrue(cache.check({'details': {'a': 1, 'b': [1, 2]}, 'at': object}))
+        self.assertFalse(cache.check({'at': object, 'details': {'b': [1, 2], 'a': 1}}))
+
+    def test_lru_eviction(self):
+        """Test that the least recently seen event is forgotten first."""
+        cache = DedupCache(max_entries=2)
+        for name in ('a', 'b'):
+            cache.check({'event': name})
+        cache.check({'event': 'a'})  # a is now the most recently seen
+        cache.check({'event': 'c'})  # evicts b
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.check({'event': 'a'}))
+        self.assertTrue(cache.check({'event': 'b'}))
+
+    def test_persistence(self):
+        """Test that unexpired entries survive a save and reload."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dedup.idx')
+            cache = DedupCache(ttl=60, path=path)
+            cache.check({'event': 'first_run'})
+            cache.save()
+            self.assertEqual(os.path.getsize(path), 8 + 24)
+
+            reloaded = DedupCache(ttl=60, path=path)
+            self.assertFalse(reloaded.check({'event': 'first_run'}))
+
+            with patch('scarf.dedup.time.time', return_value=10**10):
+                expired = DedupCache(ttl=60, path=path)
+            self.assertEqual(len(expired), 0)
+
+    def test_corrupt_index_is_ignored(self):
+        """Test that an unreadable index starts an empty cache."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dedup.idx')
+            with open(path, 'wb') as f:
+                f.write(b'garbage')
+            self.assertEqual(len(DedupCache(path=path)), 0)
+
+    def test_invalid_arguments(self):
+        """Test that nonsensical settings are rejected."""
+        with self.assertRaises(ValueError):
+            DedupCache(ttl=0)
+        with self.assertRaises(ValueError):
+            DedupCache(max_entries=0)
+
+
+class TestLoggerDedup(unittest.TestCase):
+
+    def test_repeated_events_are_not_sent(self):
+        """Test that the logger sends each identical event once and counts the rest."""
+        transport = InMemoryTransport()
+        logger = ScarfEventLogger(ENDPOINT, transport=transport, dedup=DedupCache())
+        self.assertTrue(logger.log_event({'event': 'feature_enabled'}))
+        self.assertFalse(logger.log_event({'event': 'feature_enabled'}))
+        logger.log_events([{'event': 'feature_enabled'}, {'event': 'other'}])
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(logger.stats()['events_deduplicated'], 2)
+
+    def test_failed_sends_are_not_remembered(self):
+        """Test that an event which failed to send can be sent again."""
+        cache = DedupCache()
+        logger = ScarfEventLogger(ENDPOINT, transport=FailingTransport(), dedup=cache)
+        with self.assertRaises(OSError):
+            logger.log_event({'event': 'first_run'})
+        self.assertEqual(len(cache), 0)
+
+    def test_failed_batches_are_not_remembered(self):
+        cache = DedupCache()
+        logger = ScarfEventLogger(ENDPOINT, transport=FailingTransport(), dedup=cache)
+        with self.assertRaises(OSError):
+            logger.log_events([{'event': 'first_run'}, {'event': 'other'}])
+        self.assertEqual(len(cache), 0)
+
+    def test_dropped_events_are_not_remembered(self):
+        """Test that an event dropped by a closed background logger is let through later."""
+        cache = DedupCache()
+        logger = ScarfEventLogger(
+            ENDPOINT, transport=InMemoryTransport(), background=True, dedup=cache
+        )
+        logger.close()
+        self.assertFalse(logger.log_event({'event': 'first_run'}))
+        self.assertEqual(len(cache), 0)
+
+    def test_rejected_events_are_not_remembered(self):
+        cache = DedupCache()
+        logger = ScarfEventLogger(
+            ENDPOINT, transport=InMemoryTransport(), dedup=cache, guard=PayloadGuard(max_bytes=50),
+        )
+        logger.log_events([{'event': 'x' * 100}, {'event': 'ok'}])
+        self.assertEqual(len(cache), 1)
+        self.assertTrue(cache.check({'event': 'x' * 100}))
+
+    def test_close_saves_the_index(self):
+        """Test that closing the logger writes the dedup index."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dedup.idx')
+            logger = ScarfEventLogger(
+                ENDPOINT, transport=InMemoryTransport(), dedup=DedupCache(path=path)
+            )
+            logger.log_event({'event': 'first_run'})
+            logger.close()
+            self.assertFalse(DedupCache(path=path).check({'event': 'first_run'}))
+
+    def test_exit_saves_the_index(self):
+        """Test that a synchronous logger that is never closed writes the index at exit."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dedup.idx')
+            result, _ = run_script(f"""
+                from scarf import ScarfEventLogger
+                from scarf.dedup import DedupCache
+                from scarf.transport import NullTransport
+                logger = ScarfEventLogger(
+                    {ENDPOINT!r}, transport=NullTransport(), dedup=DedupCache(path={path!r}),
+                )
+                logger.log_event({{'event': 'first_run'}})
+            """)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertFalse(DedupCache(path=path).check({'event': 'first_run'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
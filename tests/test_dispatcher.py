@@ -0,0 +1,292 @@
+import threading
+import unittest
+
+from scarf.dispatcher import BackgroundDispatcher
+
+
+class TestBackgroundDispatcher(unittest.TestCase):
+    def test_items_are_sent_in_order(self):
+        """Test that queued items reach the send callable in submission order."""
+        sent = []
+        dispatcher = BackgroundDispatcher(sent.extend)
+        for i in range(100):
+            self.assertTrue(dispatcher.submit(i))
+
+        self.assertTrue(dispatcher.flush(timeout=5))
+        self.assertEqual(sent, list(range(100)))
+        dispatcher.close()
+
+    def test_full_queue_drops_items(self):
+        """Test that submit never blocks and counts drops when the queue is full."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def send(batch):
+            started.set()
+            release.wait(5)
+
+        dispatcher = BackgroundDispatcher(send, max_queue_size=2)
+        self.assertTrue(dispatcher.submit("in-flight"))
+        self.assertTrue(started.wait(5))
+
+        self.assertTrue(dispatcher.submit("a"))
+        self.assertTrue(dispatcher.submit("b"))
+        self.assertFalse(dispatcher.submit("c"))
+        self.assertEqual(dispatcher.dropped, 1)
+
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+
+    def test_flush_timeout(self):
+        """Test that flush gives up once its timeout expires."""
+        release = threading.Event()
+        dispatcher = BackgroundDispatcher(lambda batch: release.wait(5))
+        dispatcher.submit("slow")
+
+        self.assertFalse(dispatcher.flush(timeout=0.05))
+        release.set()
+        self.assertTrue(dispatcher.flush(timeout=5))
+        dispatcher.close()
+
+    def test_send_errors_are_reported(self):
+        """Test that exceptions from send are passed to on_error and don't stop the worker."""
+        errors = []
+        sent = []
+
+        def send(batch):
+            if batch == ["bad"]:
+                raise RuntimeError("boom")
+            sent.extend(batch)
+
+        dispatcher = BackgroundDispatcher(send, on_error=errors.append)
+        for item in ("a", "bad", "b"):
+            dispatcher.submit(item)
+
+        self.assertTrue(dispatcher.flush(timeout=5))
+        self.assertEqual(sent, ["a", "b"])
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], RuntimeError)
+        dispatcher.close()
+
+    def test_close_rejects_new_items(self):
+        """Test that items submitted after close are dropped."""
+        sent = []
+        dispatcher = BackgroundDispatcher(sent.extend)
+        dispatcher.submit(1)
+        self.assertTrue(dispatcher.close(timeout=5))
+
+        self.assertFalse(dispatcher.submit(2))
+        self.assertEqual(sent, [1])
+
+    def test_invalid_queue_size(self):
+        """Test that a non-positive queue size is rejected."""
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, max_queue_size=0)
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, batch_size=0)
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, linger=-1)
+
+    def test_batches_fill_up_to_batch_size(self):
+        """Test that the worker groups queued items into batches of at most batch_size."""
+        batches = []
+        dispatcher = BackgroundDispatcher(batches.append, batch_size=10, linger=5)
+        for i in range(25):
+            dispatcher.submit(i)
+
+        self.assertTrue(dispatcher.flush(timeout=5))
+        self.assertTrue(all(len(batch) <= 10 for batch in batches))
+        self.assertEqual([item for batch in batches for item in batch], list(range(25)))
+        dispatcher.close()
+
+    def test_linger_waits_for_more_items(self):
+        """Test that a partial batch is held back for up to linger seconds."""
+        sent = threading.Event()
+        batches = []
+
+        def send(batch):
+            batches.append(batch)
+            sent.set()
+
+        dispatcher = BackgroundDispatcher(send, batch_size=10, linger=0.2)
+        dispatcher.submit("a")
+        dispatcher.submit("b")
+
+        self.assertTrue(sent.wait(5))
+        self.assertEqual(batches, [["a", "b"]])
+        dispatcher.close()
+
+    def test_flush_cuts_linger_short(self):
+        """Test that flush sends a partial batch without waiting out the linger time."""
+        batches = []
+        dispatcher = BackgroundDispatcher(batches.append, batch_size=10, linger=60)
+        dispatcher.submit("a")
+
+        self.assertTrue(dispatcher.flush(timeout=5))
+        self.assertEqual(batches, [["a"]])
+        dispatcher.close()
+
+    def test_concurrent_sends(self):
+        """Test that up to concurrency batches are sent at once, and raising it takes effect."""
+        active = threading.Semaphore(0)
+        release = threading.Event()
+        sent = []
+
+        def send(batch):
+            active.release()
+            release.wait(5)
+            sent.extend(batch)
+
+        dispatcher = BackgroundDispatcher(send, concurrency=2)
+        for i in range(20):
+            dispatcher.submit(i)
+        self.assertTrue(active.acquire(timeout=5))
+        self.assertTrue(active.acquire(timeout=5))
+        self.assertFalse(active.acquire(timeout=0.1))
+
+        dispatcher.concurrency = 3
+        dispatcher.submit(20)
+        self.assertTrue(active.acquire(timeout=5))
+
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(sorted(sent), list(range(21)))
+
+    def test_invalid_concurrency(self):
+        """Test that a concurrency below one is rejected."""
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, concurrency=0)
+
+
+    def _stalled(self, **options):
+        """Return a dispatcher whose first batch is stuck in send, and its release event."""
+        release = threading.Event()
+        started = threading.Event()
+        sent = []
+
+        def send(batch):
+            started.set()
+            release.wait(5)
+            sent.extend(batch)
+
+        dispatcher = BackgroundDispatcher(send, **options)
+        self.assertTrue(dispatcher.submit(b"in-flight"))
+        self.assertTrue(started.wait(5))
+        return dispatcher, release, sent
+
+    def test_byte_budget_counts_items_being_sent(self):
+        """Test that max_queue_bytes bounds queued items and the batch being sent."""
+        dispatcher, release, _ = self._stalled(max_queue_bytes=20)
+        self.assertEqual(dispatcher.queued_bytes, 9)
+        self.assertTrue(dispatcher.submit(b"0123456789"))
+        self.assertFalse(dispatcher.submit(b"xx"))
+        self.assertEqual(dispatcher.queued_bytes, 19)
+        self.assertEqual(dispatcher.dropped, 1)
+
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(dispatcher.queued_bytes, 0)
+
+    def test_drop_oldest_evicts_queued_items(self):
+        """Test that the oldest queued items make room for new ones and are reported."""
+        evicted = []
+        dispatcher, release, sent = self._stalled(
+            max_queue_bytes=20, overflow='drop_oldest', on_evict=evicted.extend,
+        )
+        for item in (b"a", b"b", b"c", b"ddddddddd"):
+            self.assertTrue(dispatcher.submit(item))
+        self.assertEqual(evicted, [b"a"])
+        self.assertFalse(dispatcher.submit(b"x" * 12))  # can't fit next to in-flight
+        self.assertEqual(dispatcher.dropped, 2)
+
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(sent, [b"in-flight", b"b", b"c", b"ddddddddd"])
+
+    def test_block_waits_for_room(self):
+        """Test that the block policy waits for room and drops once block_timeout expires."""
+        dispatcher, release, sent = self._stalled(
+            max_queue_size=1, overflow='block', block_timeout=0.05,
+        )
+        self.assertTrue(dispatcher.submit(b"a"))
+        self.assertFalse(dispatcher.submit(b"b"))
+
+        dispatcher.block_timeout = 5
+        threading.Timer(0.05, release.set).start()
+        self.assertTrue(dispatcher.submit(b"c"))
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(sent, [b"in-flight", b"a", b"c"])
+        self.assertEqual(dispatcher.dropped, 1)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, overflow='drop_random')
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, max_queue_bytes=0)
+
+    def test_shards_deliver_every_item_once_under_contention(self):
+        """Test that items from many threads are each sent once, in order per thread."""
+        sent = []
+        lock = threading.Lock()
+
+        def send(batch):
+            with lock:
+                sent.extend(batch)
+
+        dispatcher = BackgroundDispatcher(
+            send, max_queue_size=100000, batch_size=50, linger=0.005, shards=8,
+        )
+        threads, per_thread = 32, 2000
+        start = threading.Barrier(threads)
+
+        def produce(t):
+            start.wait()
+            for i in range(per_thread):
+                self.assertTrue(dispatcher.submit((t, i)))
+
+        workers = [threading.Thread(target=produce, args=(t,)) for t in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertTrue(dispatcher.flush(timeout=10))
+        self.assertEqual(len(dispatcher), 0)
+        self.assertTrue(dispatcher.close(timeout=5))
+
+        self.assertEqual(len(sent), threads * per_thread)
+        for t in range(threads):
+            self.assertEqual([i for s, i in sent if s == t], list(range(per_thread)))
+        self.assertEqual(dispatcher.dropped, 0)
+
+    def test_full_shard_applies_overflow_policy(self):
+        """Test that a full shard moves to the queue, and drops once the queue is full too."""
+        dispatcher, release, sent = self._stalled(max_queue_size=1, shards=2)
+        capacity = BackgroundDispatcher.SHARD_CAPACITY
+        for i in range(capacity + 1):
+            self.assertTrue(dispatcher.submit(i))  # the first one moves to the queue
+        self.assertEqual(len(dispatcher), capacity + 1)
+        self.assertFalse(dispatcher.submit('dropped'))
+        self.assertEqual(dispatcher.dropped, 1)
+
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertEqual(sent, [b"in-flight", *range(capacity + 1)])
+
+    def test_drain_pending_empties_shards(self):
+        dispatcher, release, _ = self._stalled(shards=4)
+        for item in (b"a", b"b", b"c"):
+            self.assertTrue(dispatcher.submit(item))
+        self.assertEqual(len(dispatcher), 3)
+        self.assertEqual(dispatcher.drain_pending(), [b"a", b"b", b"c"])
+        self.assertEqual(len(dispatcher), 0)
+        release.set()
+        self.assertTrue(dispatcher.close(timeout=5))
+        self.assertFalse(dispatcher.submit(b"late"))
+
+    def test_invalid_shards(self):
+        with self.assertRaises(ValueError):
+            BackgroundDispatcher(lambda batch: None, shards=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
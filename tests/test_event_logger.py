@@ -1,12 +1,28 @@
+import json
 import os
 import re
+import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
-from requests.exceptions import ReadTimeout, Timeout
+from requests.exceptions import HTTPError, ReadTimeout, Timeout
 
-from scarf import ScarfEventLogger, __version__
+from scarf import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    Sampler,
+    ScarfEventLogger,
+    __version__,
+)
+from scarf.metrics import Hooks
+from scarf.spool import DiskSpool
+from scarf.transport import InMemoryTransport
+
+from .stub_server import StubScarfServer
 
 
 class TestScarfEventLogger(unittest.TestCase):
@@ -34,6 +50,14 @@ class TestScarfEventLogger(unittest.TestCase):
             elif var in os.environ:
                 del os.environ[var]
 
+    def assertPostedEvent(self, post, properties, timeout=3.0):
+        """Assert that the last call to a mocked Session.post sent one JSON event."""
+        args, kwargs = post.call_args
+        self.assertEqual(args, (self.DEFAULT_ENDPOINT,))
+        self.assertEqual(json.loads(kwargs['data']), properties)
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json')
+        self.assertEqual(kwargs['timeout'], timeout)
+
     def test_initialization(self):
         """Test that we can create a ScarfEventLogger instance."""
         logger = ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT)
@@ -104,11 +128,7 @@ class TestScarfEventLogger(unittest.TestCase):
         result = logger.log_event(nested_props)
 
         self.assertTrue(result)
-        mock_session.return_value.post.assert_called_with(
-            self.DEFAULT_ENDPOINT,
-            json=nested_props,
-            timeout=3.0
-        )
+        self.assertPostedEvent(mock_session.return_value.post, nested_props)
 
     @patch('requests.Session')
     def test_empty_properties_allowed(self, mock_session):
@@ -121,11 +141,7 @@ class TestScarfEventLogger(unittest.TestCase):
         result = logger.log_event({})
 
         self.assertTrue(result)
-        mock_session.return_value.post.assert_called_with(
-            self.DEFAULT_ENDPOINT,
-            json={},
-            timeout=3.0
-        )
+        self.assertPostedEvent(mock_session.return_value.post, {})
 
     @patch('requests.Session')
     def test_request_timeout(self, mock_session):
@@ -137,11 +153,7 @@ class TestScarfEventLogger(unittest.TestCase):
         with self.assertRaises(Timeout):
             logger.log_event({"event": "test"})
 
-        mock_session.return_value.post.assert_called_with(
-            self.DEFAULT_ENDPOINT,
-            json={"event": "test"},
-            timeout=1
-        )
+        self.assertPostedEvent(mock_session.return_value.post, {"event": "test"}, timeout=1)
 
     @patch('requests.Session')
     def test_request_timeout_override(self, mock_session):
@@ -154,11 +166,7 @@ class TestScarfEventLogger(unittest.TestCase):
         result = logger.log_event({"event": "test"}, timeout=1.0)
 
         self.assertTrue(result)
-        mock_session.return_value.post.assert_called_with(
-            self.DEFAULT_ENDPOINT,
-            json={"event": "test"},
-            timeout=1.0
-        )
+        self.assertPostedEvent(mock_session.return_value.post, {"event": "test"}, timeout=1.0)
 
     def test_check_do_not_track(self):
         """Test the do-not-track pure function with various environment values."""
@@ -222,11 +230,7 @@ class TestScarfEventLogger(unittest.TestCase):
 
             if should_send:
                 self.assertTrue(result)
-                mock_session.return_value.post.assert_called_with(
-                    self.DEFAULT_ENDPOINT,
-                    json=test_properties,
-                    timeout=3.0
-                )
+                self.assertPostedEvent(mock_session.return_value.post, test_properties)
             else:
                 self.assertFalse(result)
                 mock_session.return_value.post.assert_not_called()
@@ -260,11 +264,7 @@ class TestScarfEventLogger(unittest.TestCase):
 
             if should_send:
                 self.assertTrue(result)
-                mock_session.return_value.post.assert_called_with(
-                    self.DEFAULT_ENDPOINT,
-                    json=test_properties,
-                    timeout=3.0
-                )
+                self.assertPostedEvent(mock_session.return_value.post, test_properties)
             else:
                 self.assertFalse(result)
                 mock_session.return_value.post.assert_not_called()
@@ -316,11 +316,7 @@ class TestScarfEventLogger(unittest.TestCase):
             logger.log_event({"event": "test"}, timeout=1)
 
         # Verify the last timeout value was passed correctly
-        mock_session.return_value.post.assert_called_with(
-            self.DEFAULT_ENDPOINT,
-            json={"event": "test"},
-            timeout=1
-        )
+        self.assertPostedEvent(mock_session.return_value.post, {"event": "test"}, timeout=1)
 
     @patch('requests.Session')
     @patch('builtins.print')
@@ -367,6 +363,347 @@ class TestScarfEventLogger(unittest.TestCase):
         mock_print.assert_any_call("  URL: https://scarf.sh/api/v1")
         mock_print.assert_any_call("  Body: Success")
 
+    @patch('requests.Session')
+    def test_background_mode_does_not_block(self, mock_session):
+        """Test that background mode queues events and sends them on a worker thread."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_session.return_value.post.return_value = mock_response
+
+        logger = ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, background=True)
+        properties = {'event': 'test'}
+        self.assertTrue(logger.log_event(properties))
+        # Mutating the caller's dict must not affect the queued event
+        properties['event'] = 'mutated'
+
+        self.assertTrue(logger.flush(timeout=5))
+        mock_session.return_value.post.assert_called_once()
+        self.assertPostedEvent(mock_session.return_value.post, {'event': 'test'})
+        self.assertTrue(logger.close(timeout=5))
+        self.assertFalse(logger.log_event({'event': 'after-close'}))
+
+    @patch('requests.Session')
+    def test_background_mode_swallows_errors(self, mock_session):
+        """Test that send failures in background mode never reach the caller."""
+        mock_session.return_value.post.side_effect = Timeout("Request timed out")
+
+        logger = ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, background=True)
+        self.assertTrue(logger.log_event({'event': 'test'}))
+        self.assertTrue(logger.close(timeout=5))
+        mock_session.return_value.post.assert_called_once()
+
+    @patch('requests.Session')
+    def test_background_mode_respects_do_not_track(self, mock_session):
+        """Test that disabled analytics short-circuit before anything is queued."""
+        os.environ['DO_NOT_TRACK'] = '1'
+        logger = ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, background=True)
+        self.assertFalse(logger.log_event({'event': 'test'}))
+        self.assertTrue(logger.close(timeout=5))
+        mock_session.return_value.post.assert_not_called()
+
+    def test_batching_requires_background(self):
+        """Test that batching is rejected without background delivery."""
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, batch_size=10)
+
+    def test_background_batches_are_gzipped_ndjson(self):
+        """Test that batched events reach a local server as gzip'd NDJSON requests."""
+        with StubScarfServer() as server:
+            logger = ScarfEventLogger(
+                endpoint_url=server.url,
+                background=True,
+                batch_size=50,
+                linger=5.0,
+            )
+            for i in range(120):
+                logger.log_event({'event': 'test', 'i': i})
+            self.assertTrue(logger.close(timeout=5))
+
+            self.assertEqual([e['i'] for e in server.events()], list(range(120)))
+            self.assertLessEqual(len(server.requests), 3)
+            for headers, _ in server.requests:
+                self.assertEqual(headers['Content-Encoding'], 'gzip')
+                self.assertEqual(headers['Content-Type'], 'application/x-ndjson')
+
+    def test_log_events_splits_by_bytes(self):
+        """Test that log_events keeps each uncompressed body under batch_max_bytes."""
+        with StubScarfServer() as server:
+            logger = ScarfEventLogger(
+                endpoint_url=server.url,
+                batch_max_bytes=100,
+                compress=False,
+            )
+            events = [{'event': 'test', 'payload': 'x' * 20, 'i': i} for i in range(10)]
+            self.assertTrue(logger.log_events(events))
+
+            self.assertEqual(server.events(), events)
+            self.assertGreater(len(server.requests), 1)
+            for headers, body in server.requests:
+                self.assertNotIn('Content-Encoding', headers)
+                self.assertLessEqual(len(body), 100)
+
+    def test_log_events_raises_on_error_status(self):
+        """Test that a failed batch request raises like log_event does."""
+        with StubScarfServer(status=500) as server:
+            logger = ScarfEventLogger(endpoint_url=server.url)
+            with self.assertRaises(HTTPError):
+                logger.log_events([{'event': 'test'}])
+
+    def test_spool_requires_background(self):
+        """Test that a spool is rejected without background delivery."""
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, spool=DiskSpool(directory))
+
+    def test_failed_events_are_spooled_and_replayed(self):
+        """Test that events survive an outage in the spool and are replayed later."""
+        with tempfile.TemporaryDirectory() as directory, StubScarfServer(status=503) as server:
+            spool = DiskSpool(directory)
+            with patch.object(ScarfEventLogger, 'SPOOL_REPLAY_INTERVAL', 0.05):
+                logger = ScarfEventLogger(
+                    endpoint_url=server.url,
+                    background=True,
+                    batch_size=10,
+                    linger=0.0,
+                    spool=spool,
+                )
+                for i in range(5):
+                    logger.log_event({'i': i})
+                self.assertTrue(logger.flush(timeout=5))
+                self.assertEqual(server.events(), [{'i': i} for i in range(5)])
+
+                # The endpoint recovers; the spooled batch is replayed in the background.
+                server.requests.clear()
+                server.status = 200
+                for _ in range(100):
+                    if not spool:
+                        break
+                    time.sleep(0.05)
+                logger.close(timeout=5)
+
+            self.assertEqual(sorted(e['i'] for e in server.events()), list(range(5)))
+            self.assertEqual(spool.size, 0)
+
+    def test_spooled_events_are_replayed_as_encoded(self):
+        """Test that unbatched replay sends the spooled bytes without re-encoding them."""
+        with tempfile.TemporaryDirectory() as directory:
+            spool = DiskSpool(directory)
+            spool.append([b'{"i": 0, "tags": ["a"]}', b'{"i": 1}'])
+            transport = InMemoryTransport()
+            logger = ScarfEventLogger(
+                endpoint_url=self.DEFAULT_ENDPOINT,
+                transport=transport,
+                background=True,
+                spool=spool,
+            )
+            self.assertEqual(logger._replay_spool(), 2)
+            logger.close(timeout=5)
+        self.assertEqual(
+            [body for _, body, _ in transport.requests],
+            [b'{"i": 0, "tags": ["a"]}', b'{"i": 1}'],
+        )
+
+    @patch('requests.Session')
+    def test_queue_overflow_spills_to_spool(self, mock_session):
+        """Test that events beyond max_queue_size go to the spool instead of being dropped."""
+        release = threading.Event()
+        mock_session.return_value.post.side_effect = lambda *args, **kwargs: release.wait(5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            spool = DiskSpool(directory)
+            logger = ScarfEventLogger(
+                endpoint_url=self.DEFAULT_ENDPOINT,
+                background=True,
+                max_queue_size=1,
+                spool=spool,
+            )
+            for i in range(10):
+                self.assertTrue(logger.log_event({'i': i}))
+            self.assertGreater(spool.size, 0)
+
+            release.set()
+            logger.close(timeout=5)
+
+    @patch('requests.Session')
+    def test_queue_memory_is_bounded_in_bytes(self, mock_session):
+        """Test that queued events are held encoded, within max_queue_bytes, and drops counted."""
+        release = threading.Event()
+        mock_session.return_value.post.side_effect = lambda *args, **kwargs: release.wait(5)
+        drops = []
+
+        class RecordingHooks(Hooks):
+            def on_drop(self, count, reason):
+                drops.append((count, reason))
+
+        logger = ScarfEventLogger(
+            endpoint_url=self.DEFAULT_ENDPOINT,
+            background=True,
+            max_queue_bytes=1000,
+            overflow='drop_oldest',
+            hooks=RecordingHooks(),
+        )
+        for i in range(20):
+            self.assertTrue(logger.log_event({'event': 'test', 'i': i}))
+
+        stats = logger.stats()
+        self.assertLessEqual(stats['queue_bytes'], 1000)
+        self.assertGreater(stats['events_dropped'], 0)
+        self.assertEqual(sum(count for count, _ in drops), stats['events_dropped'])
+        self.assertEqual({reason for _, reason in drops}, {'evicted'})
+        release.set()
+        logger.close(timeout=5)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(self.DEFAULT_ENDPOINT, background=True, overflow='drop_all')
+        with self.assertRaises(ValueError):
+            ScarfEventLogger(self.DEFAULT_ENDPOINT, background=True, overflow='spill')
+
+    def test_retry_policy_retries_transient_errors(self):
+        """Test that 503 responses are retried until the endpoint recovers."""
+        with StubScarfServer(status=503) as server:
+            logger = ScarfEventLogger(
+                endpoint_url=server.url,
+                retry_policy=RetryPolicy(max_attempts=5, initial_backoff=0.01),
+            )
+            with self.assertRaises(HTTPError):
+                logger.log_event({'event': 'test'})
+            self.assertEqual(len(server.requests), 5)
+
+    @patch('requests.Session')
+    def test_retry_policy_skips_client_errors(self, mock_session):
+        """Test that a 400 response is raised without retrying."""
+        response = MagicMock()
+        response.status_code = 400
+        response.raise_for_status.side_effect = HTTPError(response=response)
+        mock_session.return_value.post.return_value = response
+
+        logger = ScarfEventLogger(
+            endpoint_url=self.DEFAULT_ENDPOINT,
+            retry_policy=RetryPolicy(max_attempts=5, initial_backoff=0.01),
+        )
+        with self.assertRaises(HTTPError):
+            logger.log_event({'event': 'test'})
+        self.assertEqual(mock_session.return_value.post.call_count, 1)
+
+    @patch('requests.Session')
+    def test_circuit_breaker_fails_fast(self, mock_session):
+        """Test that an open circuit breaker skips the request entirely."""
+        mock_session.return_value.post.side_effect = Timeout("Request timed out")
+
+        logger = ScarfEventLogger(
+            endpoint_url=self.DEFAULT_ENDPOINT,
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        for _ in range(2):
+            with self.assertRaises(Timeout):
+                logger.log_event({'event': 'test'})
+        with self.assertRaises(CircuitOpenError):
+            logger.log_event({'event': 'test'})
+        self.assertEqual(mock_session.return_value.post.call_count, 2)
+
+    @patch('requests.Session')
+    def test_open_circuit_spools_in_background(self, mock_session):
+        """Test that background mode spools events while the circuit is open."""
+        mock_session.return_value.post.side_effect = Timeout("Request timed out")
+
+        with tempfile.TemporaryDirectory() as directory:
+            spool = DiskSpool(directory)
+            logger = ScarfEventLogger(
+                endpoint_url=self.DEFAULT_ENDPOINT,
+                background=True,
+                spool=spool,
+                circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60),
+            )
+            for i in range(3):
+                logger.log_event({'i': i})
+            self.assertTrue(logger.flush(timeout=5))
+            logger.close(timeout=5)
+
+            self.assertEqual(mock_session.return_value.post.call_count, 1)
+            replayed = []
+            spool.replay(replayed.extend)
+            self.assertEqual(len(replayed), 3)
+
+    @patch('requests.Session')
+    def test_sampler_drops_before_sending(self, mock_session):
+        """Test that sampled-out events return False without any request."""
+        logger = ScarfEventLogger(
+            endpoint_url=self.DEFAULT_ENDPOINT,
+            sampler=Sampler(event_rates={'noisy': 0.0}, rate_limit=(0, 1)),
+        )
+        self.assertFalse(logger.log_event({'event': 'noisy'}))
+        self.assertTrue(logger.log_event({'event': 'quiet'}))
+        self.assertFalse(logger.log_event({'event': 'quiet'}))
+        mock_session.return_value.post.assert_called_once()
+        self.assertPostedEvent(mock_session.return_value.post, {'event': 'quiet'})
+
+    @patch('requests.Session')
+    @patch('scarf.sampling.random.random', return_value=0.0)
+    def test_sampler_records_weight(self, mock_random, mock_session):
+        """Test that sent events carry their sample weight."""
+        logger = ScarfEventLogger(endpoint_url=self.DEFAULT_ENDPOINT, sampler=Sampler(rate=0.5))
+        self.assertTrue(logger.log_event({'event': 'test'}))
+        mock_session.return_value.post.assert_called_once()
+        self.assertPostedEvent(
+            mock_session.return_value.post, {'event': 'test', 'sample_weight': 2.0}
+        )
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requires os.fork")
+    def test_background_logger_survives_fork(self):
+        """Test that a forked child gets its own working queue and worker thread."""
+        with StubScarfServer() as server:
+            logger = ScarfEventLogger(endpoint_url=server.url, background=True)
+            logger.log_event({'from': 'parent'})
+            self.assertTrue(logger.flush(timeout=5))
+            parent_session = logger.session
+
+            pid = os.fork()
+            if pid == 0:  # child
+                ok = (
+                    logger.session is not parent_session
+                    and logger.log_event({'from': 'child'})
+                    and logger.flush(timeout=5)
+                )
+                os._exit(0 if ok else 1)
+
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+            self.assertTrue(logger.log_event({'from': 'parent-after-fork'}))
+            self.assertTrue(logger.close(timeout=5))
+            self.assertCountEqual(
+                [e['from'] for e in server.events()],
+                ['parent', 'child', 'parent-after-fork'],
+            )
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requires fork")
+    def test_forked_child_drops_instead_of_spilling(self):
+        """Test that a child, which has no spool, drops events that overflow the queue."""
+        class StuckTransport(InMemoryTransport):
+            def send(self, url, body, headers, timeout):
+                time.sleep(5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            logger = ScarfEventLogger(
+                endpoint_url=self.DEFAULT_ENDPOINT,
+                transport=StuckTransport(),
+                background=True,
+                max_queue_size=1,
+                spool=DiskSpool(directory),
+            )
+            pid = os.fork()
+            if pid == 0:  # child
+                try:
+                    results = [logger.log_event({'n': i}) for i in range(4)]
+                    ok = not all(results) and logger.stats()['events_dropped'] > 0
+                except Exception:
+                    ok = False
+                os._exit(0 if ok else 1)
+
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+            logger.shutdown(0)
+
     def test_version_consistency(self):
         """Test that version is consistent with pyproject.toml."""
         # Read version from pyproject.toml
@@ -391,5 +728,83 @@ class TestScarfEventLogger(unittest.TestCase):
         )
         self.assertRegex(ua, pattern)
 
+
+@patch.dict(os.environ, {'DO_NOT_TRACK': '', 'SCARF_NO_ANALYTICS': '', 'SCARF_VERBOSE': ''})
+class TestThreadSafety(unittest.TestCase):
+    """Stress one logger from many threads at once."""
+
+    THREADS = 32
+
+    def run_threads(self, target):
+        start = threading.Barrier(self.THREADS)
+
+        def run(t):
+            start.wait()
+            target(t)
+
+        threads = [threading.Thread(target=run, args=(t,)) for t in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_blocking_logging_from_many_threads(self):
+        transport = InMemoryTransport()
+        logger = ScarfEventLogger('https://scarf.sh/api/v1', transport=transport)
+
+        def log(t):
+            for i in range(50):
+                self.assertTrue(logger.log_event({'thread': t, 'n': i}))
+
+        self.run_threads(log)
+        received = [json.loads(body) for _, body, _ in transport.requests]
+        expected = [{'thread': t, 'n': i} for t in range(self.THREADS) for i in range(50)]
+        self.assertCountEqual(received, expected)
+        stats = logger.stats()
+        self.assertEqual((stats['events_sent'], stats['requests_sent']), (1600, 1600))
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_sharded_background_logging_from_many_threads(self):
+        """Test that every event is delivered once while settings are swapped underneath."""
+        transport = InMemoryTransport()
+        logger = ScarfEventLogger(
+            'https://scarf.sh/api/v1',
+            transport=transport,
+            background=True,
+            batch_size=100,
+            linger=0.01,
+            compress=False,
+            max_queue_size=100000,
+            max_queue_bytes=None,
+            shards=8,
+        )
+
+        def log(t):
+            for i in range(500):
+                self.assertTrue(logger.log_event({'thread': t, 'n': i}))
+                if i % 100 == 0:
+                    logger.reload()
+                    logger.stats()
+
+        self.run_threads(log)
+        self.assertTrue(logger.close(timeout=10))
+        received = [
+            json.loads(line)
+            for _, body, _ in transport.requests
+            for line in body.splitlines()
+        ]
+        self.assertEqual(len(received), self.THREADS * 500)
+        for t in range(self.THREADS):
+            self.assertEqual([e['n'] for e in received if e['thread'] == t], list(range(500)))
+        stats = logger.stats()
+        self.assertEqual(stats['events_sent'], self.THREADS * 500)
+        self.assertEqual(stats['events_dropped'], 0)
+        self.assertEqual((stats['queue_depth'], stats['queue_bytes']), (0, 0))
+
+    def test_shards_require_background(self):
+        with self.assertRaises(ValueError):
+            ScarfEventLogger('https://scarf.sh/api/v1', shards=4)
+
+
 if __name__ == '__main__':
     unittest.main()
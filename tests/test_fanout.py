@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+import unittest
+
+from scarf import FanoutEventLogger
+from scarf.exceptions import TransportError
+from scarf.fanout import Endpoint
+from scarf.transport import Transport, TransportResponse
+
+PRODUCTION = 'https://scarf.sh/api/v1'
+STAGING = 'https://staging.scarf.sh/api/v1'
+
+
+class RecordingTransport(Transport):
+    """Record sends per URL, optionally sleeping or failing for some URLs."""
+
+    def __init__(self, delay=0.0, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.sends = []
+        self._lock = threading.Lock()
+
+    def send(self, url, body, headers, timeout):
+        time.sleep(self.delay)
+        with self._lock:
+            self.sends.append((url, body, timeout))
+        if url in self.failing:
+            raise TransportError("unreachable")
+        return TransportResponse(204, {}, b'', url)
+
+    def events(self, url):
+        return [json.loads(body) for u, body, _ in self.sends if u == url]
+
+
+class TestFanoutEventLogger(unittest.TestCase):
+
+    def test_sends_to_every_endpoint_concurrently(self):
+        """Test that a call takes about as long as the slowest endpoint, not the sum."""
+        transport = RecordingTransport(delay=0.3)
+        endpoints = [PRODUCTION, STAGING, 'https://eu.scarf.sh/api/v1']
+        with FanoutEventLogger(endpoints, transport=transport) as logger:
+            start = time.monotonic()
+            results = logger.log_event({'event': 'download'})
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(results, dict.fromkeys(endpoints, True))
+        self.assertLess(elapsed, 0.6)  # sequentially it takes 0.9s
+        for url in endpoints:
+            self.assertEqual(transport.events(url), [{'event': 'download'}])
+
+    def test_routing_and_per_endpoint_timeouts(self):
+        """Test that predicates select endpoints and each endpoint keeps its timeout."""
+        transport = RecordingTransport()
+        logger = FanoutEventLogger(
+            [
+                Endpoint(PRODUCTION, timeout=1.0),
+                Endpoint(STAGING, timeout=5.0, predicate=lambda p: p.get('beta', False)),
+            ],
+            transport=transport,
+        )
+        self.assertEqual(logger.log_event({'event': 'a'}), {PRODUCTION: True})
+        self.assertEqual(
+            logger.log_event({'event': 'b', 'beta': True}),
+            {PRODUCTION: True, STAGING: True},
+        )
+        self.assertEqual(
+            sorted((url, timeout) for url, _, timeout in transport.sends),
+            [(PRODUCTION, 1.0), (PRODUCTION, 1.0), (STAGING, 5.0)],
+        )
+
+    def test_failures_are_reported_per_endpoint(self):
+        """Test that one failing endpoint doesn't affect the others."""
+        transport = RecordingTransport(failing=[PRODUCTION])
+        logger = FanoutEventLogger([PRODUCTION, STAGING], transport=transport)
+        results = logger.log_event({'event': 'download'})
+        self.assertIsInstance(results[PRODUCTION], TransportError)
+        self.assertIs(results[STAGING], True)
+        self.assertEqual(transport.events(STAGING), [{'event': 'download'}])
+
+    def test_log_events_routes_each_event(self):
+        """Test that batches only hold the events routed to each endpoint."""
+        transport = RecordingTransport()
+        logger = FanoutEventLogger(
+            [PRODUCTION, Endpoint(STAGING, predicate=lambda p: p['n'] % 2 == 0)],
+            transport=transport,
+            compress=False,
+        )
+        events = [{'n': i} for i in range(4)]
+        self.assertEqual(logger.log_events(events), {PRODUCTION: True, STAGING: True})
+        batches = {url: body for url, body, _ in transport.sends}
+        self.assertEqual(batches[PRODUCTION].count(b'\n'), 4)
+        self.assertEqual(batches[STAGING], b'{"n":0}\n{"n":2}\n')
+
+        self.assertEqual(logger.log_events([{'n': 1}]), {PRODUCTION: True})
+
+    def test_invalid_arguments(self):
+        """Test that empty or duplicate endpoint lists are rejected."""
+        with self.assertRaises(ValueError):
+            FanoutEventLogger([])
+        with self.assertRaises(ValueError):
+            FanoutEventLogger([PRODUCTION, PRODUCTION + '/'])
+        with self.assertRaises(ValueError):
+            FanoutEventLogger([PRODUCTION], max_workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import collections
+import datetime
+import enum
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from scarf import PayloadGuard, ScarfEventLogger
+from scarf.serialization import EventEncoder
+from scarf.transport import InMemoryTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+class TestPayloadGuard(unittest.TestCase):
+
+    def test_valid_events_pass_unchanged(self):
+        """Test that events within the limits are returned as they are, not copied."""
+        guard = PayloadGuard()
+        properties = {'event': 'download', 'n': 1, 'ok': True, 'x': None, 'f': 0.5,
+                      'details': {'tags': ['a', 'b'], 'mirror': {'region': 'eu'}}}
+        cleaned, changed = guard.clean(properties)
+        self.assertIs(cleaned, properties)
+        self.assertFalse(changed)
+
+    def test_truncate(self):
+        guard = PayloadGuard(max_depth=2, max_keys=3, max_string_length=4)
+        cleaned, changed = guard.clean({
+            'long': 'abcdefgh',
+            'list': [1, 2, 3, 4, 5],
+            'nested': {'deeper': {'x': 1}, 'kept': 'ok'},
+        })
+        self.assertTrue(changed)
+        self.assertEqual(cleaned, {
+            'long': 'abcd',
+            'list': [1, 2, 3],
+            'nested': {'kept': 'ok'},
+        })
+
+    def test_drop(self):
+        guard = PayloadGuard(max_depth=3, max_keys=3, max_string_length=4, action='drop')
+        cleaned, changed = guard.clean({
+            'long': 'abcdefgh',
+            'list': [1, 2, 3, 4, 5],
+            'items': ['ok', 'too long'],
+            'short': 'abc',
+        })
+        self.assertTrue(changed)
+        self.assertIsNone(cleaned)  # four properties
+
+        cleaned, _ = guard.clean(
+            {'long': 'abcdefgh', 'list': [1, 2, 3, 4], 'items': ['ok', 'no!!!']}
+        )
+        self.assertEqual(cleaned, {'items': ['ok']})
+
+    def test_fallback_for_values_json_cannot_represent(self):
+        guard = PayloadGuard()
+        cleaned, changed = guard.clean({
+            'when': datetime.date(2024, 1, 2),
+            'raw': b'bytes',
+            'tags': {'a'},
+            'pair': (1, 2),
+            1: 'int key',
+            'other': object,
+        })
+        self.assertTrue(changed)
+        self.assertEqual(cleaned['when'], '2024-01-02')
+        self.assertEqual(cleaned['raw'], 'bytes')
+        self.assertEqual(cleaned['tags'], ['a'])
+        self.assertEqual(cleaned['pair'], [1, 2])
+        self.assertEqual(cleaned['1'], 'int key')
+        self.assertEqual(cleaned['other'], "<class 'object'>")
+        json.dumps(cleaned)
+
+    def test_conversions_json_doesnt_see_are_not_changes(self):
+        """Test that tuples, other mappings, subclasses and int keys don't count as changed."""
+        class Level(enum.IntEnum):
+            HIGH = 2
+
+        class Name(str):
+            pass
+
+        guard = PayloadGuard()
+        cleaned, changed = guard.clean({
+            'tags': ('a', 'b'),
+            'ordered': collections.OrderedDict(a=1),
+            'level': Level.HIGH,
+            'name': Name('scarf'),
+            'by_id': {1: 'one'},
+        })
+        self.assertFalse(changed)
+        self.assertEqual(cleaned, {
+            'tags': ['a', 'b'], 'ordered': {'a': 1}, 'level': 2, 'name': 'scarf',
+            'by_id': {'1': 'one'},
+        })
+        self.assertTrue(guard.clean({'tags': ('a', 'b' * 2000)})[1])
+
+    def test_non_finite_floats_fall_back(self):
+        encoder = EventEncoder(backend='json')
+        cleaned, changed = PayloadGuard().clean({'x': float('nan'), 'y': [float('inf')], 'z': 0.5})
+        self.assertTrue(changed)
+        self.assertEqual(cleaned, {'x': 'nan', 'y': ['inf'], 'z': 0.5})
+        record, _ = PayloadGuard(fallback=lambda value: value).encode({'x': float('nan')}, encoder)
+        self.assertEqual(json.loads(record), {'x': None})
+
+    def test_fallback_results_are_limited_too(self):
+        guard = PayloadGuard(max_string_length=3, fallback=lambda value: value)
+        cleaned, _ = guard.clean({'obj': object()})
+        self.assertEqual(len(cleaned['obj']), 3)
+
+    def test_encode_rejects_oversized_events(self):
+        encoder = EventEncoder({'app': 'example'})
+        guard = PayloadGuard(max_bytes=40)
+        record, changed = guard.encode({'event': 'a'}, encoder)
+        self.assertEqual(json.loads(record), {'app': 'example', 'event': 'a'})
+        self.assertFalse(changed)
+        self.assertEqual(guard.encode({'event': 'a' * 40}, encoder), (None, False))
+
+    def test_invalid_limits(self):
+        with self.assertRaises(ValueError):
+            PayloadGuard(max_depth=0)
+        with self.assertRaises(ValueError):
+            PayloadGuard(action='raise')
+
+
+@patch.dict(os.environ, {'DO_NOT_TRACK': '', 'SCARF_NO_ANALYTICS': ''})
+class TestLoggerGuard(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = InMemoryTransport()
+
+    def test_rejections_are_counted_not_raised(self):
+        logger = ScarfEventLogger(
+            ENDPOINT,
+            transport=self.transport,
+            guard=PayloadGuard(max_string_length=10, max_bytes=100),
+            compress=False,
+        )
+        self.assertTrue(logger.log_event({'event': 'x' * 50, 'when': datetime.date(2024, 1, 2)}))
+        self.assertFalse(logger.log_event({'event': 'a', 'tags': ['y' * 10] * 20}))
+        self.assertTrue(logger.log_events([{'event': 'b'}, {'tags': ['y' * 10] * 20}]))
+
+        stats = logger.stats()
+        self.assertEqual(stats['events_truncated'], 1)
+        self.assertEqual(stats['events_rejected'], 2)
+        bodies = [json.loads(body.splitlines()[0]) for _, body, _ in self.transport.requests]
+        self.assertEqual(bodies, [{'event': 'x' * 10, 'when': '2024-01-02'}, {'event': 'b'}])
+
+    def test_background_events_are_guarded_before_queueing(self):
+        logger = ScarfEventLogger(
+            ENDPOINT,
+            transport=self.transport,
+            background=True,
+            guard=PayloadGuard(max_bytes=50),
+        )
+        self.assertFalse(logger.log_event({'event': 'x' * 100}))
+        self.assertTrue(logger.log_event({'event': 'ok'}))
+        self.assertTrue(logger.close(timeout=5))
+        self.assertEqual(len(self.transport.requests), 1)
+        self.assertEqual(logger.stats()['events_rejected'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# Modules that must not be loaded by `import scarf` or by constructing a logger;
+# each one costs milliseconds of startup time.
+HEAVY_MODULES = ['requests', 'urllib3', 'asyncio', 'ssl', 'gzip', 'email', 'random']
+
+
+def loaded_modules(statement):
+    """Run statement in a fresh interpreter and return which HEAVY_MODULES are loaded."""
+    code = (
+        f"{statement}\n"
+        "import sys, json\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Site customizations may load some of these before scarf is imported.
+        cls.preloaded = set(loaded_modules("pass"))
+
+    def test_import_is_lean(self):
+        """Test that importing scarf doesn't pull in heavy dependencies."""
+        self.assertEqual(set(loaded_modules("import scarf")) - self.preloaded, set())
+
+    def test_construction_is_lean(self):
+        """Test that creating a logger defers importing requests until the first send."""
+        statement = "import scarf; scarf.ScarfEventLogger('https://scarf.sh/api/v1')"
+        self.assertEqual(set(loaded_modules(statement)) - self.preloaded, set())
+
+    def test_lazy_exports(self):
+        """Test that lazily exported names still resolve from the package."""
+        code = (
+            "import scarf\n"
+            "from scarf import AsyncScarfEventLogger, EventAggregator, Sampler\n"
+            "assert set(scarf.__all__) <= set(dir(scarf))"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import logging
+import threading
+import time
+import unittest
+
+from scarf import ScarfEventLogger, ScarfLoggingHandler
+from scarf.transport import InMemoryTransport, Transport
+
+from .stub_server import StubScarfServer
+from .test_shutdown import run_script
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+def sent_events(transport):
+    return [
+        json.loads(line)
+        for _, body, _ in transport.requests
+        for line in body.splitlines()
+    ]
+
+
+class TestScarfLoggingHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = InMemoryTransport()
+        self.scarf = ScarfEventLogger(ENDPOINT, transport=self.transport, compress=False)
+        self.log = logging.getLogger(f'scarf.tests.{self.id()}')
+        self.log.propagate = False
+        self.log.setLevel(logging.DEBUG)
+
+    def attach(self, handler):
+        self.log.addHandler(handler)
+        self.addCleanup(self.log.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_sends_records_at_or_above_level(self):
+        """Test that records are filtered by level and sent in one batch."""
+        handler = self.attach(ScarfLoggingHandler(self.scarf, batch_size=10, linger=0.01))
+        self.log.info("ignored")
+        self.log.warning("disk %s is full", "/tmp")
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            self.log.exception("failed")
+        handler.flush()
+
+        self.assertEqual(len(self.transport.requests), 1)
+        warning, error = sent_events(self.transport)
+        self.assertEqual(warning['event'], 'log')
+        self.assertEqual(warning['level'], 'WARNING')
+        self.assertEqual(warning['message'], 'disk /tmp is full')
+        self.assertEqual(warning['logger'], self.log.name)
+        self.assertEqual(warning['function'], 'test_sends_records_at_or_above_level')
+        self.assertNotIn('exception', warning)
+        self.assertIn('RuntimeError: boom', error['exception'])
+
+    def test_custom_fields(self):
+        """Test that fields map to record attributes, specials and callables."""
+        handler = self.attach(ScarfLoggingHandler(
+            self.scarf,
+            fields={
+                'msg': 'message',
+                'tenant': 'tenant',
+                'severity': lambda record: record.levelno // 10,
+            },
+            event_name='app_log',
+        ))
+        self.log.error("hello", extra={'tenant': 'acme'})
+        self.log.error("no tenant")
+        handler.flush()
+        self.assertEqual(sent_events(self.transport), [
+            {'event': 'app_log', 'msg': 'hello', 'tenant': 'acme', 'severity': 4},
+            {'event': 'app_log', 'msg': 'no tenant', 'severity': 4},
+        ])
+
+    def test_rate_limit(self):
+        """Test that records over the rate limit are dropped before being queued."""
+        handler = self.attach(ScarfLoggingHandler(self.scarf, rate_limit=(0, 2)))
+        for i in range(5):
+            self.log.warning("warning %d", i)
+        handler.flush()
+        self.assertEqual(len(sent_events(self.transport)), 2)
+        self.assertEqual(handler.rate_limited, 3)
+        self.assertEqual(handler.dropped, 3)
+
+    def test_emit_never_waits_on_the_network(self):
+        """Test that logging returns while a send is blocked, and ignores its own records."""
+        started, release = threading.Event(), threading.Event()
+        log = self.log
+
+        class SlowTransport(Transport):
+            def send(self, url, body, headers, timeout):
+                log.warning("logged while sending")  # must not feed back into the queue
+                started.set()
+                release.wait(5)
+
+        scarf = ScarfEventLogger(ENDPOINT, transport=SlowTransport())
+        handler = self.attach(ScarfLoggingHandler(scarf, batch_size=1, linger=0))
+        self.log.warning("first")
+        self.assertTrue(started.wait(5))
+
+        start = time.monotonic()
+        self.log.warning("second")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(len(handler._dispatcher), 1)
+
+        release.set()
+        handler.flush()
+        self.assertEqual(len(handler._dispatcher), 0)
+
+    def test_close_drops_what_the_budget_leaves(self):
+        """Test that close gives up at the logger's budget and counts unsent records."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        class HangingTransport(Transport):
+            def send(self, url, body, headers, timeout):
+                release.wait(5)
+
+        scarf = ScarfEventLogger(ENDPOINT, transport=HangingTransport(), shutdown_timeout=0.1)
+        handler = self.attach(ScarfLoggingHandler(scarf, batch_size=1, linger=0))
+        for i in range(5):
+            self.log.warning("record %d", i)
+
+        start = time.monotonic()
+        handler.flush()
+        handler.close()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertGreaterEqual(handler.dropped, 3)  # one or two can be in flight
+
+    def test_exit_waits_for_one_budget(self):
+        """Test that flush and close at exit share the budget against a hanging endpoint."""
+        with StubScarfServer(delay=5) as server:
+            result, elapsed = run_script(f"""
+                import logging
+                from scarf import ScarfEventLogger, ScarfLoggingHandler
+                scarf = ScarfEventLogger({server.url!r}, timeout=10, shutdown_timeout=0.5)
+                log = logging.getLogger('app')
+                log.addHandler(ScarfLoggingHandler(scarf, batch_size=1, linger=0))
+                for i in range(20):
+                    log.warning("record %d", i)
+            """)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertLess(elapsed, 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import unittest
+
+from scarf import AsyncScarfEventLogger, HTTPStatusError, RetryPolicy, Sampler, ScarfEventLogger
+from scarf.metrics import (
+    DROP_CLOSED,
+    DROP_QUEUE_FULL,
+    DROP_SEND_FAILED,
+    Hooks,
+    LatencyHistogram,
+)
+from scarf.transport import InMemoryTransport, Transport
+
+from .stub_server import StubScarfServer
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+class RecordingHooks(Hooks):
+    def __init__(self):
+        self.calls = []
+
+    def before_send(self, count, size):
+        self.calls.append(('before_send', count))
+
+    def after_send(self, count, size, seconds):
+        self.calls.append(('after_send', count))
+
+    def on_error(self, count, error, seconds):
+        self.calls.append(('on_error', count, type(error)))
+
+    def on_drop(self, count, reason):
+        self.calls.append(('on_drop', count, reason))
+
+
+class BlockingTransport(Transport):
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def send(self, url, body, headers, timeout):
+        self.started.set()
+        self.release.wait(5)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_cumulative_buckets(self):
+        """Test that buckets are cumulative and bounds are inclusive."""
+        histogram = LatencyHistogram((0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(seconds)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {'0.1': 2, '1.0': 3, '+Inf': 4})
+        self.assertEqual(snapshot['count'], 4)
+        self.assertAlmostEqual(snapshot['sum'], 3.65)
+
+
+class TestLoggerMetrics(unittest.TestCase):
+
+    def test_sent_events_and_hooks(self):
+        """Test that successful requests are counted and reported to hooks."""
+        transport = InMemoryTransport()
+        hooks = RecordingHooks()
+        logger = ScarfEventLogger(endpoint_url=ENDPOINT, transport=transport, hooks=hooks)
+        logger.log_event({'event': 'one'})
+        logger.log_events([{'event': 'two'}, {'event': 'three'}])
+
+        stats = logger.stats()
+        self.assertEqual(stats['events_sent'], 3)
+        self.assertEqual(stats['requests_sent'], 2)
+        self.assertEqual(stats['bytes_sent'], sum(len(body) for _, body, _ in transport.requests))
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['send_latency']['count'], 2)
+        self.assertEqual(stats['send_latency']['buckets']['+Inf'], 2)
+        self.assertEqual(hooks.calls, [
+            ('before_send', 1), ('after_send', 1), ('before_send', 2), ('after_send', 2),
+        ])
+
+    def test_failures_and_retries(self):
+        """Test that failed requests and their retries are counted."""
+        hooks = RecordingHooks()
+        logger = ScarfEventLogger(
+            endpoint_url=ENDPOINT,
+            transport=InMemoryTransport(status_code=503),
+            retry_policy=RetryPolicy(max_attempts=3, initial_backoff=0),
+            hooks=hooks,
+        )
+        with self.assertRaises(HTTPStatusError):
+            logger.log_event({'event': 'test'})
+
+        stats = logger.stats()
+        self.assertEqual(stats['events_failed'], 1)
+        self.assertEqual(stats['requests_failed'], 1)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['events_sent'], 0)
+        self.assertEqual(hooks.calls, [('before_send', 1), ('on_error', 1, HTTPStatusError)])
+
+    def test_drops_are_counted(self):
+        """Test that events dropped by a full queue or after close are reported."""
+        transport = BlockingTransport()
+        hooks = RecordingHooks()
+        logger = ScarfEventLogger(
+            endpoint_url=ENDPOINT,
+            transport=transport,
+            background=True,
+            max_queue_size=1,
+            hooks=hooks,
+        )
+        logger.log_event({'event': 'in-flight'})
+        self.assertTrue(transport.started.wait(5))
+        logger.log_event({'event': 'queued'})
+        self.assertEqual(logger.stats()['in_flight'], 1)
+        self.assertEqual(logger.stats()['queue_depth'], 1)
+        self.assertFalse(logger.log_event({'event': 'dropped'}))
+
+        transport.release.set()
+        self.assertTrue(logger.close(timeout=5))
+        self.assertFalse(logger.log_event({'event': 'late'}))
+
+        stats = logger.stats()
+        self.assertEqual(stats['events_dropped'], 2)
+        self.assertEqual(stats['events_sent'], 2)
+        self.assertIn(('on_drop', 1, DROP_QUEUE_FULL), hooks.calls)
+        self.assertIn(('on_drop', 1, DROP_CLOSED), hooks.calls)
+
+    def test_every_event_of_a_failed_batch_is_counted(self):
+        """Test that chunks left untried after a failed request are counted as dropped."""
+        hooks = RecordingHooks()
+        logger = ScarfEventLogger(
+            endpoint_url=ENDPOINT,
+            transport=InMemoryTransport(status_code=503),
+            background=True,
+            batch_size=100,
+            batch_max_bytes=40,  # four events per request
+            linger=5,
+            hooks=hooks,
+        )
+        for i in range(100):
+            logger.log_event({'n': i + 100})
+        self.assertTrue(logger.close(timeout=5))
+
+        stats = logger.stats()
+        self.assertEqual(stats['requests_failed'], 1)
+        self.assertEqual(stats['events_failed'], 4)
+        accounted = stats['events_sent'] + stats['events_failed'] + stats['events_dropped']
+        self.assertEqual(accounted, 100)
+        self.assertIn(('on_drop', 96, DROP_SEND_FAILED), hooks.calls)
+
+    def test_sampled_out_events_are_counted(self):
+        """Test that sampling is counted separately from drops."""
+        logger = ScarfEventLogger(
+            endpoint_url=ENDPOINT,
+            transport=InMemoryTransport(),
+            sampler=Sampler(event_rates={'noisy': 0.0}),
+        )
+        logger.log_event({'event': 'noisy'})
+        logger.log_events([{'event': 'noisy'}, {'event': 'quiet'}])
+        stats = logger.stats()
+        self.assertEqual(stats['events_sampled_out'], 2)
+        self.assertEqual(stats['events_sent'], 1)
+        self.assertEqual(stats['events_dropped'], 0)
+
+
+class TestAsyncLoggerMetrics(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_stats(self):
+        """Test that the async logger keeps the same counters."""
+        with StubScarfServer() as server:
+            hooks = RecordingHooks()
+            async with AsyncScarfEventLogger(endpoint_url=server.url, hooks=hooks) as logger:
+                await asyncio.gather(*(logger.log_event({'n': i}) for i in range(3)))
+                stats = logger.stats()
+        self.assertEqual(stats['events_sent'], 3)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['send_latency']['count'], 3)
+        self.assertEqual(hooks.calls.count(('after_send', 1)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
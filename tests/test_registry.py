@@ -0,0 +1,98 @@
+import threading
+import unittest
+
+from scarf import ScarfEventLogger, get_logger, registry
+from scarf.registry import LoggerView
+from scarf.spool import DiskSpool
+from scarf.transport import InMemoryTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+class TestRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        registry.close_all(timeout=5)
+
+    def test_same_endpoint_and_options_share_a_logger(self):
+        """Test that equal configurations get one logger and all share a connection pool."""
+        first = get_logger(ENDPOINT, timeout=1.0)
+        self.assertIsInstance(first, ScarfEventLogger)
+        self.assertIs(get_logger(ENDPOINT + '/', timeout=1.0), first)
+        self.assertIs(
+            get_logger(ENDPOINT, static_properties={'a': [1, 2]}),
+            get_logger(ENDPOINT, static_properties={'a': [1, 2]}),
+        )
+
+        other = get_logger(ENDPOINT, timeout=2.0)
+        self.assertIsNot(other, first)
+        self.assertIs(other.transport, first.transport)
+        self.assertIsNot(get_logger('https://other.example/api').transport, first.transport)
+
+    def test_objects_are_compared_by_identity(self):
+        """Test that option objects such as transports are compared by identity."""
+        transport = InMemoryTransport()
+        logger = get_logger(ENDPOINT, transport=transport)
+        self.assertIs(logger.transport, transport)
+        self.assertIs(get_logger(ENDPOINT, transport=transport), logger)
+        self.assertIsNot(get_logger(ENDPOINT, transport=InMemoryTransport()), logger)
+
+    def test_concurrent_calls_create_one_logger(self):
+        """Test that racing callers all get the same instance."""
+        results = []
+        barrier = threading.Barrier(8)
+
+        def get():
+            barrier.wait()
+            results.append(get_logger(ENDPOINT, background=True))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(logger) for logger in results}), 1)
+
+    def test_default_properties_view(self):
+        """Test that views layer defaults under event properties on the shared logger."""
+        transport = InMemoryTransport()
+        view = get_logger(ENDPOINT, {'library': 'a', 'kind': 'x'}, transport=transport)
+        self.assertIsInstance(view, LoggerView)
+        self.assertIs(view.logger, get_logger(ENDPOINT, transport=transport))
+
+        view.log_event({'event': 'one', 'kind': 'y'})
+        view.bind(extra=1).log_event({'event': 'two'})
+        self.assertEqual(
+            [body for _, body, _ in transport.requests],
+            [
+                b'{"library":"a","kind":"y","event":"one"}',
+                b'{"library":"a","kind":"x","extra":1,"event":"two"}',
+            ],
+        )
+
+    def test_closed_logger_is_replaced(self):
+        """Test that a shared logger closed by a caller is not handed out again."""
+        logger = get_logger(ENDPOINT, background=True)
+        logger.close()
+        self.assertIsNot(get_logger(ENDPOINT, background=True), logger)
+
+    def test_unhashable_option(self):
+        """Test that options that cannot be compared are rejected."""
+        class Unhashable:
+            __hash__ = None
+
+        with self.assertRaises(TypeError):
+            get_logger(ENDPOINT, sampler=Unhashable())
+
+    def test_spool_is_an_identity_option(self):
+        """Test that different spool objects give different loggers."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            first = get_logger(ENDPOINT, background=True, spool=DiskSpool(a))
+            second = get_logger(ENDPOINT, background=True, spool=DiskSpool(b))
+            self.assertIsNot(first, second)
+            registry.close_all(timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
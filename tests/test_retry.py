@@ -0,0 +1,101 @@
+import time
+import unittest
+from email.utils import formatdate
+from unittest.mock import MagicMock
+
+from requests.exceptions import ConnectionError, HTTPError, InvalidURL
+
+from scarf import CircuitBreaker, HTTPStatusError, RetryPolicy, TransportError
+from scarf.retry import is_transient, parse_retry_after
+
+
+def http_error(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return HTTPError(response=response)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_transient_errors(self):
+        """Test which failures are considered worth retrying."""
+        self.assertTrue(is_transient(ConnectionError("refused")))
+        self.assertTrue(is_transient(TransportError("timed out")))
+        self.assertTrue(is_transient(http_error(503)))
+        self.assertTrue(is_transient(HTTPStatusError(429)))
+        self.assertFalse(is_transient(http_error(400)))
+        self.assertFalse(is_transient(InvalidURL("bad url")))
+        self.assertFalse(is_transient(RuntimeError("bug")))
+
+    def test_should_retry_respects_max_attempts(self):
+        """Test that retries stop after max_attempts attempts."""
+        policy = RetryPolicy(max_attempts=3)
+        error = http_error(500)
+        self.assertTrue(policy.should_retry(error, 1))
+        self.assertTrue(policy.should_retry(error, 2))
+        self.assertFalse(policy.should_retry(error, 3))
+
+    def test_backoff_is_capped_exponential(self):
+        """Test that backoff grows exponentially up to max_backoff."""
+        policy = RetryPolicy(initial_backoff=0.1, max_backoff=0.5, jitter=False)
+        self.assertEqual(
+            [policy.backoff(n) for n in range(1, 6)],
+            [0.1, 0.2, 0.4, 0.5, 0.5],
+        )
+
+    def test_backoff_jitter_stays_in_range(self):
+        """Test that jittered backoffs never exceed the capped delay."""
+        policy = RetryPolicy(initial_backoff=0.1, max_backoff=1.0)
+        for _ in range(100):
+            self.assertTrue(0 <= policy.backoff(3) <= 0.4)
+
+    def test_retry_after_takes_precedence(self):
+        """Test that Retry-After on 429/503 overrides the computed backoff."""
+        policy = RetryPolicy(max_retry_after=10.0)
+        self.assertEqual(policy.backoff(1, http_error(429, {'Retry-After': '2'})), 2.0)
+        self.assertEqual(policy.backoff(1, HTTPStatusError(503, {'retry-after': '60'})), 10.0)
+
+        # HTTP dates have whole-second resolution
+        date = formatdate(time.time() + 5, usegmt=True)
+        self.assertTrue(3.5 < parse_retry_after(http_error(503, {'Retry-After': date})) <= 5)
+        self.assertIsNone(parse_retry_after(http_error(503, {'Retry-After': 'soon'})))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the breaker."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+    def test_success_resets_failure_count(self):
+        """Test that a success in between failures keeps the breaker closed."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_trial(self):
+        """Test that after the cool-down a single trial request decides the state."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+
+if __name__ == '__main__':
+    unittest.main()
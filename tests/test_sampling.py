@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+
+from scarf.sampling import Sampler, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill(self):
+        """Test that a bucket allows a burst and then refills over time."""
+        with patch('scarf.sampling.time.monotonic', return_value=100.0) as clock:
+            bucket = TokenBucket(rate=2, burst=3)
+            self.assertEqual([bucket.try_acquire() for _ in range(4)], [True] * 3 + [False])
+
+            clock.return_value = 100.5
+            self.assertTrue(bucket.try_acquire())
+            self.assertFalse(bucket.try_acquire())
+
+    def test_invalid_arguments(self):
+        """Test that nonsensical bucket settings are rejected."""
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=-1, burst=1)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, burst=0)
+
+
+class TestSampler(unittest.TestCase):
+    def test_default_keeps_everything_unweighted(self):
+        """Test that the default sampler keeps events unchanged."""
+        sampler = Sampler()
+        properties = {'event': 'download'}
+        self.assertIs(sampler.apply(properties), properties)
+
+    def test_global_rate_attaches_weight(self):
+        """Test that sampled events carry the inverse of the rate as their weight."""
+        sampler = Sampler(rate=0.25)
+        with patch('scarf.sampling.random.random', return_value=0.1):
+            self.assertEqual(
+                sampler.apply({'event': 'download'}),
+                {'event': 'download', 'sample_weight': 4.0},
+            )
+        with patch('scarf.sampling.random.random', return_value=0.3):
+            self.assertIsNone(sampler.apply({'event': 'download'}))
+
+    def test_per_event_rates(self):
+        """Test that per-event rates override the global rate."""
+        sampler = Sampler(rate=1.0, event_rates={'noisy': 0.0, 'rare': 0.5})
+        self.assertIsNone(sampler.sample({'event': 'noisy'}))
+        self.assertEqual(sampler.sample({'event': 'other'}), 1.0)
+        with patch('scarf.sampling.random.random', return_value=0.4):
+            self.assertEqual(sampler.sample({'event': 'rare'}), 2.0)
+
+    def test_sampled_rate_is_roughly_right(self):
+        """Test that the kept fraction approximates the configured rate."""
+        sampler = Sampler(rate=0.1)
+        kept = sum(sampler.sample({'event': 'x'}) is not None for _ in range(20000))
+        self.assertTrue(1600 < kept < 2400, kept)
+
+    def test_rate_limit_per_event_name(self):
+        """Test that each event name gets its own token bucket."""
+        sampler = Sampler(rate_limit=(0, 2), event_rate_limits={'vip': (0, 5)})
+        self.assertEqual(sum(sampler.sample({'event': 'a'}) is not None for _ in range(10)), 2)
+        self.assertEqual(sum(sampler.sample({'event': 'b'}) is not None for _ in range(10)), 2)
+        self.assertEqual(sum(sampler.sample({'event': 'vip'}) is not None for _ in range(10)), 5)
+
+    def test_untracked_event_names_share_a_bucket(self):
+        """Test that names beyond max_tracked_events share the overflow bucket."""
+        sampler = Sampler(rate_limit=(0, 1), max_tracked_events=1)
+        self.assertIsNotNone(sampler.sample({'event': 'first'}))
+        self.assertIsNotNone(sampler.sample({'event': 'second'}))
+        self.assertIsNone(sampler.sample({'event': 'third'}))
+
+    def test_invalid_rate(self):
+        """Test that sampling rates outside [0, 1] are rejected."""
+        with self.assertRaises(ValueError):
+            Sampler(rate=1.5)
+        with self.assertRaises(ValueError):
+            Sampler(event_rates={'x': -0.1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import gzip
+import importlib.util
+import json
+import unittest
+
+from scarf import ScarfEventLogger
+from scarf.serialization import EventEncoder, default_backend, gzip_compress
+from scarf.transport import InMemoryTransport
+
+
+class TestEventEncoder(unittest.TestCase):
+
+    def test_compact_json(self):
+        """Test that events are encoded as compact UTF-8 JSON."""
+        encoder = EventEncoder(backend='json')
+        self.assertEqual(encoder.encode({'a': 1, 'b': [1, 2]}), b'{"a":1,"b":[1,2]}')
+        self.assertEqual(json.loads(encoder.encode({'name': 'café'})), {'name': 'café'})
+
+    def test_static_properties_spliced(self):
+        """Test that static properties are added to every event."""
+        encoder = EventEncoder({'sdk': 'scarf-py', 'v': 1})
+        self.assertEqual(
+            json.loads(encoder.encode({'event': 'test'})),
+            {'sdk': 'scarf-py', 'v': 1, 'event': 'test'},
+        )
+        self.assertEqual(json.loads(encoder.encode({})), {'sdk': 'scarf-py', 'v': 1})
+
+    def test_event_properties_override_static(self):
+        """Test that an event property replaces a static one of the same name."""
+        encoder = EventEncoder({'sdk': 'scarf-py', 'v': 1})
+        body = encoder.encode({'v': 2})
+        self.assertEqual(body.count(b'"v"'), 1)
+        self.assertEqual(json.loads(body), {'sdk': 'scarf-py', 'v': 2})
+
+    def assert_encodes_like_the_standard_library(self, backend):
+        encoder = EventEncoder(backend=backend)
+        for value in (float('nan'), float('inf'), float('-inf')):
+            for properties in ({'x': value}, {'x': [None, {'y': value}]}, {value: 1}):
+                with self.assertRaises(ValueError, msg=(backend, properties)):
+                    encoder.encode(properties)
+        wide = {'big': 2**64, 'small': -2**63 - 1, 'none': None, 'inf': 'info"'}
+        self.assertEqual(json.loads(encoder.encode(wide)), wide)
+        with self.assertRaises(TypeError):
+            encoder.encode({'x': {1, 2}})
+
+    def test_nan_and_infinity_are_refused(self):
+        """Test that values JSON can't represent raise instead of producing invalid JSON."""
+        self.assert_encodes_like_the_standard_library('json')
+        logger = ScarfEventLogger(
+            'https://scarf.sh/api/v1', transport=InMemoryTransport(), background=True
+        )
+        logger.encoder = EventEncoder(backend='json')
+        with self.assertRaises(ValueError):
+            logger.log_event({'x': float('nan')})
+        logger.close()
+
+    @unittest.skipUnless(importlib.util.find_spec('orjson'), "requires orjson")
+    def test_orjson_encodes_like_the_standard_library(self):
+        """Test that orjson refuses NaN and Infinity and encodes wide integers."""
+        self.assert_encodes_like_the_standard_library('orjson')
+
+    @unittest.skipUnless(importlib.util.find_spec('ujson'), "requires ujson")
+    def test_ujson_encodes_like_the_standard_library(self):
+        """Test that ujson refuses NaN and Infinity and encodes wide integers."""
+        self.assert_encodes_like_the_standard_library('ujson')
+
+    def test_unknown_backend(self):
+        """Test that unknown backends are rejected."""
+        with self.assertRaises(ValueError):
+            EventEncoder(backend='yaml')
+
+    def test_default_backend_prefers_fast_libraries(self):
+        """Test that an installed orjson or ujson is picked automatically."""
+        installed = [
+            name for name in ('orjson', 'ujson') if importlib.util.find_spec(name) is not None
+        ]
+        self.assertEqual(default_backend(), installed[0] if installed else 'json')
+        for name in installed:
+            encoder = EventEncoder({'s': 1}, backend=name)
+            self.assertEqual(json.loads(encoder.encode({'a': '/'})), {'s': 1, 'a': '/'})
+
+    def test_batch_and_gzip(self):
+        """Test that batches are NDJSON with a trailing newline and gzip round-trips."""
+        body = EventEncoder.encode_batch([b'{"a":1}', b'{"a":2}'])
+        self.assertEqual(body, b'{"a":1}\n{"a":2}\n')
+        self.assertEqual(gzip.decompress(gzip_compress(body, 6)), body)
+
+    def test_logger_static_properties(self):
+        """Test that the logger sends static properties with single and batched events."""
+        transport = InMemoryTransport()
+        logger = ScarfEventLogger(
+            endpoint_url='https://scarf.sh/api/v1',
+            transport=transport,
+            static_properties={'app': 'demo'},
+            compress=False,
+        )
+        logger.log_event({'event': 'one'})
+        logger.log_events([{'event': 'two'}, {'event': 'three', 'app': 'other'}])
+        _, single, _ = transport.requests[0]
+        _, batch, _ = transport.requests[1]
+        self.assertEqual(json.loads(single), {'app': 'demo', 'event': 'one'})
+        self.assertEqual(
+            [json.loads(line) for line in batch.splitlines()],
+            [{'app': 'demo', 'event': 'two'}, {'app': 'other', 'event': 'three'}],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from scarf import ScarfEventLogger
+from scarf.spool import DiskSpool
+from scarf.transport import InMemoryTransport, Transport
+
+from .stub_server import StubScarfServer
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SlowTransport(Transport):
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send(self, url, body, headers, timeout):
+        time.sleep(min(self.delay, timeout))
+        if self.delay > timeout:
+            raise TimeoutError("timed out")
+        with self._lock:
+            self.sent += 1
+
+
+class BlockingTransport(Transport):
+    """Hold every send until ``release`` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.sending = threading.Semaphore(0)
+
+    def send(self, url, body, headers, timeout):
+        self.sending.release()
+        self.release.wait(5)
+
+
+def run_script(script, timeout=10):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    for var in ('DO_NOT_TRACK', 'SCARF_NO_ANALYTICS', 'SCARF_VERBOSE'):
+        env.pop(var, None)
+    start = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, '-c', textwrap.dedent(script)],
+        env=env, capture_output=True, text=True, timeout=timeout,
+    )
+    return result, time.monotonic() - start
+
+
+class TestShutdown(unittest.TestCase):
+
+    def test_context_manager(self):
+        """Test that leaving a with block sends queued events and closes the logger."""
+        transport = InMemoryTransport()
+        with ScarfEventLogger(ENDPOINT, transport=transport, background=True) as logger:
+            for i in range(5):
+                logger.log_event({'n': i})
+        self.assertEqual(len(transport.requests), 5)
+        self.assertFalse(logger.log_event({'n': 'late'}))
+
+    def test_pending_events_are_sent_concurrently(self):
+        """Test that shutdown sends queued events in parallel within the budget."""
+        transport = SlowTransport(delay=0.1)
+        logger = ScarfEventLogger(ENDPOINT, transport=transport, background=True)
+        for i in range(1 + ScarfEventLogger.SHUTDOWN_CONCURRENCY):
+            logger.log_event({'n': i})
+
+        start = time.monotonic()
+        self.assertTrue(logger.shutdown(1.0))
+        self.assertLess(time.monotonic() - start, 0.6)  # sequentially it takes 0.9s
+        self.assertEqual(transport.sent, 1 + ScarfEventLogger.SHUTDOWN_CONCURRENCY)
+
+    def test_budget_is_strict(self):
+        """Test that events not sent within the budget are dropped and counted."""
+        transport = SlowTransport(delay=5)
+        logger = ScarfEventLogger(ENDPOINT, transport=transport, background=True)
+        for i in range(50):
+            logger.log_event({'n': i})
+
+        start = time.monotonic()
+        self.assertFalse(logger.shutdown(0.2))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertGreater(logger.stats()['events_dropped'], 0)
+
+    def test_unsent_events_are_spooled(self):
+        """Test that a spool keeps the events the budget did not allow to send."""
+        with tempfile.TemporaryDirectory() as directory:
+            spool = DiskSpool(directory)
+            logger = ScarfEventLogger(
+                ENDPOINT, transport=SlowTransport(delay=5), background=True, spool=spool
+            )
+            for i in range(20):
+                logger.log_event({'n': i})
+            self.assertFalse(logger.shutdown(0.1))
+            self.assertGreater(logger.stats()['events_spooled'], 0)
+            self.assertGreater(spool.size, 0)
+
+    def test_budget_is_shared_by_every_wait(self):
+        """Test that a replay and a batch both stuck in send don't each get the budget."""
+        transport = BlockingTransport()
+        self.addCleanup(transport.release.set)
+        with tempfile.TemporaryDirectory() as directory:
+            spool = DiskSpool(directory)
+            spool.append([b'{"n": 0}'])
+            with patch.object(ScarfEventLogger, 'SPOOL_REPLAY_INTERVAL', 0.01):
+                logger = ScarfEventLogger(
+                    ENDPOINT, transport=transport, background=True, spool=spool
+                )
+                logger.log_event({'n': 1})
+                for _ in range(2):  # the replayer and the worker
+                    self.assertTrue(transport.sending.acquire(timeout=5))
+
+            start = time.monotonic()
+            logger.shutdown(0.2)
+            self.assertLess(time.monotonic() - start, 0.35)
+            transport.release.set()
+
+    def test_exit_flushes_background_logger(self):
+        """Test that events queued just before exit are delivered by the atexit hook."""
+        with StubScarfServer() as server:
+            result, _ = run_script(f"""
+                from scarf import ScarfEventLogger
+                logger = ScarfEventLogger({server.url!r}, background=True)
+                for i in range(5):
+                    logger.log_event({{'n': i}})
+            """)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertCountEqual([e['n'] for e in server.events()], range(5))
+
+    def test_exit_is_not_delayed_by_a_slow_endpoint(self):
+        """Test that a hanging endpoint delays exit by no more than the budget."""
+        with StubScarfServer(delay=5) as server:
+            result, elapsed = run_script(f"""
+                from scarf import ScarfEventLogger
+                logger = ScarfEventLogger({server.url!r}, background=True, timeout=10)
+                for i in range(20):
+                    logger.log_event({{'n': i}})
+            """)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertLess(elapsed, 3)
+
+    @unittest.skipUnless(hasattr(signal, 'SIGTERM') and os.name == 'posix', "requires POSIX")
+    def test_sigterm_flushes_then_terminates(self):
+        """Test that SIGTERM flushes queued events and still terminates the process."""
+        with StubScarfServer() as server:
+            result, _ = run_script(f"""
+                import os, signal, time
+                from scarf import ScarfEventLogger
+                logger = ScarfEventLogger({server.url!r}, background=True, handle_sigterm=True)
+                for i in range(3):
+                    logger.log_event({{'n': i}})
+                os.kill(os.getpid(), signal.SIGTERM)
+                time.sleep(5)
+            """)
+            self.assertEqual(result.returncode, -signal.SIGTERM)
+            self.assertCountEqual([e['n'] for e in server.events()], range(3))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGTERM') and os.name == 'posix', "requires POSIX")
+    def test_sigterm_while_holding_a_lock_does_not_hang(self):
+        """Test that SIGTERM terminates within the budget when it interrupts a held lock."""
+        result, elapsed = run_script(f"""
+            import os, signal, time
+            from scarf import ScarfEventLogger
+            from scarf.transport import NullTransport
+            logger = ScarfEventLogger(
+                {ENDPOINT!r}, transport=NullTransport(), background=True,
+                handle_sigterm=True, shutdown_timeout=0.2,
+            )
+            logger.log_event({{'n': 1}})
+            with logger._dispatcher._lock:
+                os.kill(os.getpid(), signal.SIGTERM)
+                time.sleep(5)
+        """)
+        self.assertEqual(result.returncode, -signal.SIGTERM)
+        self.assertLess(elapsed, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from scarf.spool import DiskSpool
+
+
+class TestDiskSpool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_replay_oldest_first(self):
+        """Test that records are replayed in append order across segments."""
+        spool = DiskSpool(self.directory, max_bytes=10_000, segment_bytes=50)
+        records = [f'{{"i":{i}}}'.encode() for i in range(20)]
+        spool.append(records)
+        self.assertGreater(len(os.listdir(self.directory)), 1)
+
+        batches = []
+        self.assertEqual(spool.replay(batches.append, batch_size=7), 20)
+        self.assertEqual([r for batch in batches for r in batch], records)
+        self.assertTrue(all(len(batch) <= 7 for batch in batches))
+        self.assertEqual(spool.size, 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_failed_replay_keeps_unsent_records(self):
+        """Test that a failing send leaves the unsent records in the spool."""
+        spool = DiskSpool(self.directory)
+        spool.append([b'1', b'2', b'3', b'4'])
+        sent = []
+
+        def send(batch):
+            if b'3' in batch:
+                raise ConnectionError("offline")
+            sent.extend(batch)
+
+        with self.assertRaises(ConnectionError):
+            spool.replay(send, batch_size=2)
+        self.assertEqual(sent, [b'1', b'2'])
+
+        self.assertEqual(spool.replay(sent.extend), 2)
+        self.assertEqual(sent, [b'1', b'2', b'3', b'4'])
+
+    def test_eviction_drops_oldest_segments(self):
+        """Test that exceeding max_bytes deletes the oldest segments first."""
+        spool = DiskSpool(self.directory, max_bytes=100, segment_bytes=20)
+        spool.append([b'%09d' % i for i in range(50)])
+
+        self.assertLessEqual(spool.size, 100)
+        self.assertGreater(spool.evicted_bytes, 0)
+        replayed = []
+        spool.replay(replayed.extend)
+        self.assertEqual(replayed[-1], b'%09d' % 49)
+        self.assertNotIn(b'%09d' % 0, replayed)
+
+    def test_recovers_segments_from_previous_process(self):
+        """Test that a new spool picks up segments and ignores a torn last line."""
+        spool = DiskSpool(self.directory)
+        spool.append([b'{"a":1}', b'{"b":2}'])
+        spool.close()
+        with open(os.path.join(self.directory, sorted(os.listdir(self.directory))[0]), 'ab') as f:
+            f.write(b'{"torn"')
+
+        reopened = DiskSpool(self.directory)
+        reopened.append([b'{"c":3}'])
+        replayed = []
+        reopened.replay(replayed.extend)
+        self.assertEqual(replayed, [b'{"a":1}', b'{"b":2}', b'{"c":3}'])
+
+    def test_invalid_sizes(self):
+        """Test that inconsistent size limits are rejected."""
+        with self.assertRaises(ValueError):
+            DiskSpool(self.directory, segment_bytes=0)
+        with self.assertRaises(ValueError):
+            DiskSpool(self.directory, max_bytes=10, segment_bytes=20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+from scarf import EventAggregator, Sampler, ScarfEventLogger
+from scarf.transport import InMemoryTransport
+
+ENDPOINT = 'https://scarf.sh/api/v1'
+
+
+class TestTimed(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = InMemoryTransport()
+        self.logger = ScarfEventLogger(ENDPOINT, transport=self.transport)
+
+    def events(self):
+        return [json.loads(body) for _, body, _ in self.transport.requests]
+
+    def test_context_manager(self):
+        """Test that a with block logs its duration and properties."""
+        with self.logger.timed('export', format='csv'):
+            time.sleep(0.01)
+        [event] = self.events()
+        self.assertEqual(event['event'], 'export')
+        self.assertEqual(event['format'], 'csv')
+        self.assertGreaterEqual(event['duration_ms'], 10)
+        self.assertNotIn('error', event)
+
+    def test_decorator_records_exceptions(self):
+        """Test that a decorated function reports the exception type and still raises."""
+        @self.logger.timed('parse')
+        def parse(text):
+            return int(text)
+
+        self.assertEqual(parse('4'), 4)
+        self.assertEqual(parse.__name__, 'parse')
+        with self.assertRaises(ValueError):
+            parse('x')
+        ok, failed = self.events()
+        self.assertNotIn('error', ok)
+        self.assertEqual(failed['error'], 'ValueError')
+
+    def test_async(self):
+        """Test the decorator on coroutine functions and use with async with."""
+        @self.logger.timed('fetch', source='api')
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return 'done'
+
+        async def main():
+            self.assertEqual(await fetch(), 'done')
+            async with self.logger.timed('block'):
+                await asyncio.sleep(0)
+
+        asyncio.run(main())
+        fetched, block = self.events()
+        self.assertEqual(fetched['source'], 'api')
+        self.assertGreaterEqual(fetched['duration_ms'], 10)
+        self.assertEqual(block['event'], 'block')
+
+    def test_sampling_is_decided_on_entry(self):
+        """Test that sampled out calls are not timed or sent, and kept ones carry a weight."""
+        logger = ScarfEventLogger(
+            ENDPOINT,
+            transport=self.transport,
+            sampler=Sampler(event_rates={'hot': 0.0, 'warm': 0.5}),
+        )
+
+        @logger.timed('hot')
+        def hot():
+            return 1
+
+        with patch('scarf.timing.time.perf_counter_ns') as clock:
+            self.assertEqual(hot(), 1)
+            clock.assert_not_called()
+        with patch('scarf.sampling.random.random', return_value=0.1):
+            with logger.timed('warm'):
+                pass
+        [event] = self.events()
+        self.assertEqual(event['event'], 'warm')
+        self.assertEqual(event['sample_weight'], 2.0)
+        self.assertEqual(logger.stats()['events_sampled_out'], 1)
+
+    def test_sampler_removed_while_timing(self):
+        """Test that a reload removing the sampler mid-call doesn't break the timed code."""
+        logger = ScarfEventLogger(
+            ENDPOINT, transport=self.transport, sampler=Sampler(event_rates={'warm': 0.5}),
+        )
+
+        @logger.timed('warm')
+        def warm():
+            logger.sampler = None
+            return 'ok'
+
+        with patch('scarf.sampling.random.random', return_value=0.1):
+            with logger.timed('warm'):
+                logger.sampler = None
+            logger.sampler = Sampler(event_rates={'warm': 0.5})
+            self.assertEqual(warm(), 'ok')
+        self.assertEqual([e['sample_weight'] for e in self.events()], [2.0, 2.0])
+
+    def test_aggregator(self):
+        """Test that durations can be folded into aggregated summaries."""
+        aggregator = EventAggregator(self.logger)
+        timed = self.logger.timed('query', aggregator=aggregator, table='users')
+        for _ in range(3):
+            with timed:
+                pass
+        with self.assertRaises(KeyError):
+            with timed:
+                raise KeyError('x')
+        self.assertEqual(self.events(), [])
+
+        aggregator.close()
+        summaries = {e.get('error'): e for e in self.events()}
+        self.assertEqual(summaries[None]['count'], 3)
+        self.assertEqual(summaries[None]['table'], 'users')
+        self.assertEqual(summaries['KeyError']['count'], 1)
+
+    def test_send_failures_do_not_fail_the_timed_code(self):
+        """Test that an unreachable endpoint doesn't break the timed function."""
+        logger = ScarfEventLogger(ENDPOINT, transport=InMemoryTransport(status_code=500))
+
+        @logger.timed('op')
+        def op():
+            return 'ok'
+
+        self.assertEqual(op(), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import json
+import socket
+import threading
+import unittest
+
+from scarf import HTTPStatusError, ScarfEventLogger, TransportError
+from scarf.transport import (
+    HTTPClientTransport,
+    InMemoryTransport,
+    NullTransport,
+    RequestsTransport,
+)
+
+from .stub_server import StubScarfServer
+
+HEADERS = {'Content-Type': 'application/json'}
+
+
+class TestHTTPClientTransport(unittest.TestCase):
+
+    def test_reuses_connections(self):
+        """Test that sequential sends share one keep-alive connection."""
+        transport = HTTPClientTransport()
+        with StubScarfServer() as server:
+            for i in range(5):
+                response = transport.send(server.url, json.dumps({'n': i}).encode(), HEADERS, 5)
+                self.assertEqual(response.status_code, 200)
+            transport.close()
+            self.assertEqual([e['n'] for e in server.events()], list(range(5)))
+            self.assertEqual(len(server.clients), 1)
+
+    def test_error_status_raises(self):
+        """Test that non-2xx responses raise HTTPStatusError with the status."""
+        transport = HTTPClientTransport()
+        with StubScarfServer(status=503) as server:
+            with self.assertRaises(HTTPStatusError) as cm:
+                transport.send(server.url, b'{}', HEADERS, 5)
+            self.assertEqual(cm.exception.status_code, 503)
+            transport.close()
+
+    def test_connection_failure_raises_transport_error(self):
+        """Test that an unreachable endpoint raises TransportError."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(TransportError):
+            HTTPClientTransport().send(f'http://127.0.0.1:{port}/', b'{}', HEADERS, 1)
+
+    def test_retries_stale_connection(self):
+        """Test that a keep-alive connection closed by the server is replaced."""
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(2)
+        port = listener.getsockname()[1]
+
+        def serve_one_request_per_connection():
+            for _ in range(2):
+                conn, _ = listener.accept()
+                with conn:
+                    conn.recv(65536)
+                    conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+
+        server = threading.Thread(target=serve_one_request_per_connection, daemon=True)
+        server.start()
+        transport = HTTPClientTransport()
+        try:
+            url = f'http://127.0.0.1:{port}/'
+            self.assertEqual(transport.send(url, b'{}', HEADERS, 5).status_code, 200)
+            server.join(0.1)  # let the server close the first connection
+            self.assertEqual(transport.send(url, b'{}', HEADERS, 5).status_code, 200)
+        finally:
+            transport.close()
+            server.join(5)
+            listener.close()
+
+    def test_pool_size_validation(self):
+        """Test that the pool must hold at least one connection."""
+        with self.assertRaises(ValueError):
+            HTTPClientTransport(pool_size=0)
+
+    def test_logger_with_http_client_transport(self):
+        """Test that single and batched events reach the endpoint."""
+        with StubScarfServer() as server:
+            logger = ScarfEventLogger(
+                endpoint_url=server.url,
+                transport=HTTPClientTransport(),
+                background=True,
+                batch_size=10,
+                linger=0.01,
+            )
+            for i in range(20):
+                logger.log_event({'n': i})
+            self.assertTrue(logger.close(timeout=5))
+
+            single = ScarfEventLogger(endpoint_url=server.url, transport=HTTPClientTransport())
+            self.assertTrue(single.log_event({'n': 20}))
+            single.close()
+
+            self.assertCountEqual([e['n'] for e in server.events()], range(21))
+            headers, _ = server.requests[-1]
+            self.assertEqual(headers['User-Agent'], single.user_agent)
+
+
+class TestRequestsTransport(unittest.TestCase):
+
+    def test_pool_size(self):
+        """Test that the session keeps pool_size connections per origin."""
+        transport = RequestsTransport(pool_size=32)
+        adapter = transport.session.get_adapter('https://scarf.sh/api/v1')
+        self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'], 32)
+        with self.assertRaises(ValueError):
+            RequestsTransport(pool_size=0)
+
+
+class TestInMemoryTransports(unittest.TestCase):
+
+    def test_in_memory_transport_records_requests(self):
+        """Test that payloads are recorded instead of sent."""
+        transport = InMemoryTransport()
+        logger = ScarfEventLogger(endpoint_url='https://scarf.sh/api/v1', transport=transport)
+        self.assertTrue(logger.log_event({'event': 'test'}))
+        url, body, headers = transport.requests[0]
+        self.assertEqual(url, 'https://scarf.sh/api/v1')
+        self.assertEqual(json.loads(body), {'event': 'test'})
+        self.assertEqual(headers['Content-Type'], 'application/json')
+
+    def test_in_memory_transport_status(self):
+        """Test that a configured error status raises like a real endpoint."""
+        logger = ScarfEventLogger(
+            endpoint_url='https://scarf.sh/api/v1',
+            transport=InMemoryTransport(status_code=500),
+        )
+        with self.assertRaises(HTTPStatusError):
+            logger.log_event({'event': 'test'})
+
+    def test_null_transport(self):
+        """Test that the null transport accepts everything."""
+        logger = ScarfEventLogger(endpoint_url='https://scarf.sh/api/v1', transport=NullTransport())
+        self.assertTrue(logger.log_event({'event': 'test'}))
+        self.assertTrue(logger.log_events([{'event': 'a'}, {'event': 'b'}]))
+
+
+if __name__ == '__main__':
+    unittest.main()